@@ -6,11 +6,10 @@ import sys
 import argparse
 import simplejson as json
 
-from modules.convert.converter import LIBSVMConverter
-from modules.generate.data_generator import SampleDataGenerator
-from modules.pseudonymize.feature_extractor import FeatureExtractor
-from modules.hardening.hardening import HardeningModule
-from modules.predict.predict import PredictionModule
+from modules.utils import file_io
+
+# the modules of the subcommands (and numpy, scipy and scikit-learn) are
+# imported by the respective _cmd_ methods to keep the startup fast
 
 
 DESCRIPTION = """
@@ -24,6 +23,34 @@ DESCRIPTION = """
 """
 
 
+def _add_filter_arguments(parser, short_options=True, filter_type=True):
+    """
+    add arguments configuring the filters created from orders. Short
+    options are omitted for commands which use them otherwise, the
+    filter type for commands which provide their own option for it.
+    """
+    def _options(short, long):
+        return (short, long) if short_options else (long,)
+
+    parser.add_argument(*_options('-m', '--bloom_filter_size'), type=int, default=1024,
+                        help="Number of bits in Bloom Filter")
+    parser.add_argument(*_options('-d', '--decomposition'), type=str,
+                        choices=['entities', 'colored', 'ngrams', 'words'],
+                        default='words', help="Type of decomposition")
+    parser.add_argument(*_options('-n', '--ngram_len'), type=int, default=2,
+                        help="Length of ngrams")
+    parser.add_argument(*_options('-k', '--hash_num'), type=int, default=3,
+                        help="Number of hash functions used in Bloom Filter")
+    if filter_type:
+        parser.add_argument(*_options('-t', '--bloom_filter_type'), type=str,
+                            choices=['murmur', 'keyed', 'count', 'keyedcount'], default='murmur',
+                            help="Use Bloomfilters or Count-Min-Sketches")
+    parser.add_argument(*_options('-e', '--encryption_key'), type=str, default='',
+                        help="Set encryption key for keyed hash functions")
+    parser.add_argument(*_options('-b', '--bin_sizes'), type=json.loads, default=dict(),
+                        help="Set bin sizes for feature discretization.")
+
+
 class ABBOCommandLineInterface(object):
 
     def __init__(self):
@@ -31,7 +58,7 @@ class ABBOCommandLineInterface(object):
 
     def run(self):
         self._parse()
-        self._run()
+        return self._run()
 
     def _parse(self):
         # sub command functions
@@ -50,9 +77,24 @@ class ABBOCommandLineInterface(object):
         def _predict(args):
             self.command = 'predict'
 
+        def _stats(args):
+            self.command = 'stats'
+
+        def _train(args):
+            self.command = 'train'
+
+        def _serve(args):
+            self.command = 'serve'
+
+        def _loadgen(args):
+            self.command = 'loadgen'
+
         # create top level parser
         parser = argparse.ArgumentParser(description=DESCRIPTION,
                                          formatter_class=argparse.RawTextHelpFormatter)
+        parser.add_argument('--no_compression_thread', action='store_true', default=False,
+                            help="Compress output files (.gz, .bz2, .xz) in the main thread "
+                                 "instead of a background thread")
         subparsers = parser.add_subparsers(help="Available commands")
         subparsers.required = True
 
@@ -60,9 +102,18 @@ class ABBOCommandLineInterface(object):
         convert = subparsers.add_parser('convert', help="convert input file to LIBSVM format")
         convert.set_defaults(func=_convert)
         convert.add_argument('input_file', type=str,
-                             help="file containing orders in JSON format")
+                             help="file containing filters (Base64 encoded or binary filter store)")
         convert.add_argument('output_file', type=str,
                              help="File with orders in LIBSVM format")
+        convert.add_argument('-t', '--filter_type', type=str,
+                             choices=['murmur', 'keyed', 'count', 'keyedcount'], default=None,
+                             help="Set filter type (bloom filter or count-min sketch). Detected if not set.")
+        convert.add_argument('-f', '--format', type=str, choices=['libsvm', 'npz', 'binary'], default='libsvm',
+                             help="Set output format (LIBSVM, sparse CSR matrix in npz format or binary filter store)")
+        convert.add_argument('-s', '--batch_size', type=int, default=1000,
+                             help="Set number of filters converted at once")
+        convert.add_argument('-j', '--jobs', type=int, default=None,
+                             help="Set number of worker processes (default: number of cores)")
 
         # generate sample data
         generate = subparsers.add_parser('generate', help="Generate artificial data")
@@ -83,6 +134,23 @@ class ABBOCommandLineInterface(object):
                               help="Generate orders only containing billing address information.")
         generate.add_argument('--unique_customers', action='store_true', default=None,
                               help="Customers are sampled without replacement.")
+        generate.add_argument('--fraud_rings', type=int, default=0,
+                              help="Assign fraudulent orders to fraud rings sharing drop addresses, "
+                                   "name variants and articles.")
+        generate.add_argument('--ring_addresses', type=int, default=2,
+                              help="Set number of drop addresses per fraud ring.")
+        generate.add_argument('--ring_name_variants', type=int, default=4,
+                              help="Set number of name variants per fraud ring.")
+        generate.add_argument('--shards', type=int, default=1,
+                              help="Set number of shards sampled from independent random streams.")
+        generate.add_argument('-j', '--jobs', type=int, default=1,
+                              help="Set number of worker processes generating shards (0: number of cores).")
+        generate.add_argument('--shard_files', action='store_true', default=False,
+                              help="Write each shard to a separate file instead of concatenating the shards.")
+        generate.add_argument('--filters', type=str, choices=['text', 'binary'], default=None,
+                              help="Pseudonymize the orders in-process and write their filters "
+                                   "(Base64 encoded or binary filter store) instead of JSON.")
+        _add_filter_arguments(generate, short_options=False)
 
         # pseudonymize input data
         pseudonymize = subparsers.add_parser('pseudonymize', help="Pseudonymize orders")
@@ -91,22 +159,7 @@ class ABBOCommandLineInterface(object):
                                   help="File containing orders in JSON format")
         pseudonymize.add_argument('output_file', type=str,
                                   help="Output file to store pseudonymized orders")
-        pseudonymize.add_argument('-m', '--bloom_filter_size', type=int, default=1024,
-                                  help="Number of bits in Bloom Filter")
-        pseudonymize.add_argument('-d', '--decomposition', type=str,
-                                  choices=['entities', 'colored', 'ngrams', 'words'],
-                                  default='words', help="Type of decomposition")
-        pseudonymize.add_argument('-n', '--ngram_len', type=int, default=2,
-                                  help="Length of ngrams")
-        pseudonymize.add_argument('-k', '--hash_num', type=int, default=3,
-                                  help="Number of hash functions used in Bloom Filter")
-        pseudonymize.add_argument('-t', '--bloom_filter_type', type=str,
-                                  choices=['murmur', 'keyed', 'count', 'keyedcount'], default='murmur',
-                                  help="Use Bloomfilters or Count-Min-Sketches")
-        pseudonymize.add_argument('-e', '--encryption_key', type=str, default='',
-                                  help="Set encryption key for keyed hash functions")
-        pseudonymize.add_argument('-b', '--bin_sizes', type=json.loads, default=dict(),
-                                  help="Set bin sizes for feature discretization.")
+        _add_filter_arguments(pseudonymize)
         pseudonymize.add_argument('--logging', type=str, default=None,
                                   help="Set file to log debug messages.")
         pseudonymize.add_argument('--mapping_file', type=str, default=None,
@@ -130,6 +183,8 @@ class ABBOCommandLineInterface(object):
                                help="Set filter type (bloom filter or count-min sketch)")
         hardening.add_argument('-l', '--merging_level', type=int, default=1,
                                help="Set merge level (default k=1, i.e. no merging)")
+        hardening.add_argument('-f', '--fold', type=int, default=0,
+                               help="XOR-fold filters N times, i.e. reduce their size to m/2^N bits")
         hardening.add_argument('-v', '--verbose_mode', action='store_true', default=False,
                                help="Output list of merged filters")
         hardening.add_argument('-s', '--chunk_size', type=int, default=100,
@@ -138,27 +193,130 @@ class ABBOCommandLineInterface(object):
         # prediction
         predict = subparsers.add_parser('predict', help="Predict class labels for unknown orders")
         predict.set_defaults(func=_predict)
-        predict.add_argument('input_file', type=str, help="File containing data in LIBSVM format.")
-        predict.add_argument('-m', '--model_file', type=str, default=None,
-                             help="Set custom LIBLINEAR model.")
+        predict.add_argument('input_file', type=str,
+                             help="File containing data in LIBSVM or npz format, filters (Base64 encoded "
+                                  "or binary filter store) or orders in JSON format.")
+        predict.add_argument('-m', '--model_file', type=str, action='append', default=None,
+                             help="Set custom LIBLINEAR model. Repeat to score several models at once.")
+        predict.add_argument('--no_model_cache', action='store_true',
+                             help="Do not cache the weights of the model in a .npy file next to the model.")
         predict.add_argument('-o', '--output_file', type=str, default=None,
                              help="Store detailed results in output file.")
+        predict.add_argument('-s', '--batch_size', type=int, default=10000,
+                             help="Set number of orders scored at once")
+        predict.add_argument('-t', '--filter_type', type=str,
+                             choices=['murmur', 'keyed', 'count', 'keyedcount'], default=None,
+                             help="Set filter type. Detected if the input file contains filters, "
+                                  "'murmur' if not set for orders.")
         predict.add_argument('--mapping_and_patterns_file', type=str, nargs=2, default=None,
                              help="Provide files for retrieving explaination of classifier decisions.")
+        predict.add_argument('--mapping_and_order_patterns_file', type=str, nargs=2, default=None,
+                             help="Provide files for retrieving explaination of classifier decisions "
+                                  "for single orders.")
+        predict.add_argument('--threshold', type=float, default=0.0,
+                             help="Explain decisions for orders with a score above threshold.")
+        predict.add_argument('--metric_thresholds', type=float, nargs='+', default=[0.0],
+                             help="Set thresholds for precision and recall in the metrics file "
+                                  "(<output_file>_metrics.json).")
+        predict.add_argument('--top_k', type=int, default=None,
+                             help="Only output the k patterns mostly indicative for fraud (per order).")
+        _add_filter_arguments(predict, short_options=False, filter_type=False)
+
+        # training
+        train = subparsers.add_parser('train', help="Train linear model on filters")
+        train.set_defaults(func=_train)
+        train.add_argument('input_file', type=str,
+                           help="File containing filters (Base64 encoded or binary filter store)")
+        train.add_argument('model_file', type=str,
+                           help="File to store model in LIBLINEAR format")
+        train.add_argument('-t', '--filter_type', type=str,
+                           choices=['murmur', 'keyed', 'count', 'keyedcount'], default=None,
+                           help="Set filter type (bloom filter or count-min sketch). Detected if not set.")
+        train.add_argument('-s', '--batch_size', type=int, default=1000,
+                           help="Set number of filters learned at once")
+        train.add_argument('-e', '--epochs', type=int, default=5,
+                           help="Set number of passes over the input file")
+        train.add_argument('-l', '--loss', type=str, choices=['hinge', 'squared_hinge', 'log'], default='hinge',
+                           help="Set loss function (linear SVM or logistic regression)")
+        train.add_argument('-a', '--alpha', type=float, default=1e-4,
+                           help="Set strength of L2 regularization")
+        train.add_argument('--bias', action='store_true', default=False,
+                           help="Learn intercept (stored as bias feature)")
+        train.add_argument('-j', '--jobs', type=int, default=1,
+                           help="Set number of worker processes whose models are averaged after each epoch")
+        train.add_argument('--seed', type=int, default=None,
+                           help="Set seed for shuffling the filters of each batch")
+
+        # statistics
+        stats = subparsers.add_parser('stats', help="Compute bit frequencies and fill levels of filters")
+        stats.set_defaults(func=_stats)
+        stats.add_argument('input_file', type=str,
+                           help="File containing filters (Base64 encoded or binary filter store)")
+        stats.add_argument('output_prefix', type=str,
+                           help="Prefix of output files (<prefix>.json, <prefix>_*.npy)")
+        stats.add_argument('-t', '--filter_type', type=str,
+                           choices=['murmur', 'keyed', 'count', 'keyedcount'], default=None,
+                           help="Set filter type (bloom filter or count-min sketch). Detected if not set.")
+        stats.add_argument('-s', '--batch_size', type=int, default=1000,
+                           help="Set number of filters processed at once")
+        stats.add_argument('-j', '--jobs', type=int, default=None,
+                           help="Set number of worker processes (default: number of cores)")
+
+        # scoring daemon
+        serve = subparsers.add_parser('serve', help="Score orders sent over localhost HTTP or a Unix socket")
+        serve.set_defaults(func=_serve)
+        _add_filter_arguments(serve)
+        serve.add_argument('--model_file', type=str, default=None,
+                           help="Set custom LIBLINEAR model.")
+        serve.add_argument('--no_model_cache', action='store_true',
+                           help="Do not cache the weights of the model in a .npy file next to the model.")
+        serve.add_argument('--socket', type=str, default=None,
+                           help="Listen on Unix socket instead of localhost HTTP.")
+        serve.add_argument('--host', type=str, default='127.0.0.1',
+                           help="Set address of the HTTP server")
+        serve.add_argument('--port', type=int, default=8765,
+                           help="Set port of the HTTP server")
+        serve.add_argument('--max_batch_size', type=int, default=64,
+                           help="Set maximal number of orders scored at once")
+        serve.add_argument('--max_delay', type=float, default=0.0,
+                           help="Set maximal time in ms to wait for further orders of a batch")
+
+        # load generator for the scoring daemon
+        loadgen = subparsers.add_parser('loadgen', help="Send orders to scoring daemon and measure latency")
+        loadgen.set_defaults(func=_loadgen)
+        loadgen.add_argument('input_file', type=str,
+                             help="File containing orders in JSON format")
+        loadgen.add_argument('--socket', type=str, default=None,
+                             help="Connect to Unix socket instead of localhost HTTP.")
+        loadgen.add_argument('--host', type=str, default='127.0.0.1',
+                             help="Set address of the HTTP server")
+        loadgen.add_argument('--port', type=int, default=8765,
+                             help="Set port of the HTTP server")
+        loadgen.add_argument('-c', '--concurrency', type=int, default=4,
+                             help="Set number of concurrent connections")
+        loadgen.add_argument('-n', '--num_requests', type=int, default=1000,
+                             help="Set number of requests")
 
         self.args = parser.parse_args()
         self.args.func(self.args)
 
     def _run(self):
-        getattr(self, '_cmd_{}'.format(self.command))()
+        file_io.set_background_compression(not self.args.no_compression_thread)
+        return getattr(self, '_cmd_{}'.format(self.command))()
 
     def _cmd_convert(self):
+        from modules.convert.converter import LIBSVMConverter
         converter = LIBSVMConverter()
         converter.set_input_file(self.args.input_file)
         converter.set_output_file(self.args.output_file)
+        converter.set_filter_type(self.args.filter_type)
+        converter.set_output_format(self.args.format)
+        converter.set_batch_size(self.args.batch_size)
+        converter.set_num_jobs(self.args.jobs)
         converter.run()
 
     def _cmd_generate(self):
+        from modules.generate.data_generator import SampleDataGenerator
         s = SampleDataGenerator(self.args.output_file, self.args.seed)
         s.set_num_of_orders(self.args.num_orders)
         s.set_num_of_customers(self.args.num_customers)
@@ -166,44 +324,114 @@ class ABBOCommandLineInterface(object):
         s.set_simple_mode(self.args.simple)
         s.set_fraud_probability(self.args.fraud_probability)
         s.set_unique_customers(self.args.unique_customers)
+        s.set_fraud_rings(self.args.fraud_rings, self.args.ring_addresses, self.args.ring_name_variants)
+        s.set_num_shards(self.args.shards)
+        s.set_num_jobs(self.args.jobs)
+        s.set_shard_files(self.args.shard_files)
+        if self.args.filters is not None:
+            s.set_filter_output(self._create_feature_extractor(), self.args.filters)
         s.run()
 
-    def _cmd_pseudonymize(self):
+    def _create_feature_extractor(self, bloom_filter_type=None):
+        from modules.pseudonymize.feature_extractor import FeatureExtractor
         feat_extr = FeatureExtractor()
-        feat_extr.set_input(self.args.input_file)
-        feat_extr.set_output(self.args.output_file)
-        feat_extr.set_bloomfilter_type(self.args.bloom_filter_type)
+        feat_extr.set_bloomfilter_type(bloom_filter_type or self.args.bloom_filter_type)
         feat_extr.set_encryption_key(self.args.encryption_key)
         feat_extr.set_decomposition_type(self.args.decomposition)
         feat_extr.set_bloomfilter_size(self.args.bloom_filter_size)
         feat_extr.set_ngram_length(self.args.ngram_len)
         feat_extr.set_num_of_hash_funcs(self.args.hash_num)
         feat_extr.set_bin_sizes(self.args.bin_sizes)
+        return feat_extr
+
+    def _cmd_pseudonymize(self):
+        feat_extr = self._create_feature_extractor()
+        feat_extr.set_input(self.args.input_file)
+        feat_extr.set_output(self.args.output_file)
         feat_extr.set_log_file(self.args.logging)
         feat_extr.set_mapping_file(self.args.mapping_file)
         feat_extr.run()
 
     def _cmd_hardening(self):
+        from modules.hardening.hardening import HardeningModule
         hardening = HardeningModule()
         hardening.set_input(self.args.input_file)
         hardening.set_output(self.args.output_file)
         hardening.set_filter_type(self.args.filter_type)
         hardening.set_merging_level(self.args.merging_level)
         hardening.set_noise_level(self.args.noise_level)
+        hardening.set_folding_level(self.args.fold)
         hardening.set_chunk_size(self.args.chunk_size)
         hardening.set_merging_mode(self.args.merging_mode)
         hardening.run()
 
     def _cmd_predict(self):
+        from modules.predict.predict import PredictionModule
         prediction_module = PredictionModule()
         prediction_module.set_input(self.args.input_file)
         prediction_module.set_output(self.args.output_file)
-        prediction_module.set_model(self.args.model_file)
+        prediction_module.set_models(self.args.model_file)
+        prediction_module.set_model_cache(not self.args.no_model_cache)
+        prediction_module.set_batch_size(self.args.batch_size)
+        prediction_module.set_filter_type(self.args.filter_type)
+        prediction_module.set_feature_extractor(self._create_feature_extractor(self.args.filter_type or 'murmur'))
         if self.args.mapping_and_patterns_file:
             prediction_module.set_explaination_files(self.args.mapping_and_patterns_file[0],
                                                      self.args.mapping_and_patterns_file[1])
+        if self.args.mapping_and_order_patterns_file:
+            prediction_module.set_order_explaination_files(self.args.mapping_and_order_patterns_file[0],
+                                                           self.args.mapping_and_order_patterns_file[1])
+            prediction_module.set_threshold(self.args.threshold)
+        prediction_module.set_metric_thresholds(self.args.metric_thresholds)
+        prediction_module.set_top_k(self.args.top_k)
         prediction_module.run()
 
+    def _cmd_stats(self):
+        from modules.stats.statistics import StatisticsModule
+        stats = StatisticsModule()
+        stats.set_input(self.args.input_file)
+        stats.set_output(self.args.output_prefix)
+        stats.set_filter_type(self.args.filter_type)
+        stats.set_batch_size(self.args.batch_size)
+        stats.set_num_jobs(self.args.jobs)
+        stats.run()
+
+    def _cmd_train(self):
+        from modules.train.trainer import TrainingModule
+        trainer = TrainingModule()
+        trainer.set_input(self.args.input_file)
+        trainer.set_output(self.args.model_file)
+        trainer.set_filter_type(self.args.filter_type)
+        trainer.set_batch_size(self.args.batch_size)
+        trainer.set_num_epochs(self.args.epochs)
+        trainer.set_loss(self.args.loss)
+        trainer.set_regularization(self.args.alpha)
+        trainer.set_bias(self.args.bias)
+        trainer.set_num_jobs(self.args.jobs)
+        trainer.set_seed(self.args.seed)
+        trainer.run()
+
+    def _cmd_serve(self):
+        from modules.serve.server import ScoringServer
+        server = ScoringServer()
+        server.set_feature_extractor(self._create_feature_extractor())
+        server.set_model(self.args.model_file, not self.args.no_model_cache)
+        server.set_socket(self.args.socket)
+        server.set_address(self.args.host, self.args.port)
+        server.set_batching(self.args.max_batch_size, self.args.max_delay / 1000.0)
+        server.run()
+
+    def _cmd_loadgen(self):
+        from modules.serve.loadgen import LoadGenerator
+        loadgen = LoadGenerator()
+        loadgen.set_input(self.args.input_file)
+        loadgen.set_socket(self.args.socket)
+        loadgen.set_address(self.args.host, self.args.port)
+        loadgen.set_concurrency(self.args.concurrency)
+        loadgen.set_num_requests(self.args.num_requests)
+        if loadgen.run() > 0:
+            return 1
+
 
 def main_func():
     sys.exit(ABBOCommandLineInterface().run())
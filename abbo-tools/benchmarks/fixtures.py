@@ -0,0 +1,93 @@
+import os
+import simplejson as json
+from modules.generate.data_generator import SampleDataGenerator
+from modules.pseudonymize.feature_extractor import FeatureExtractor
+
+"""
+fixtures of the benchmarks: generated orders and their filters. The
+fixtures of each size are created once and reused by later runs.
+"""
+
+# number of orders of each fixture size
+SIZES = {'small': 1000,
+         'medium': 10000,
+         'large': 100000}
+
+SEED = 42
+FRAUD_PROBABILITY = 0.1
+
+# filter parameters, the size matches the toy model of the predict module
+BLOOM_FILTER_SIZE = 4000
+DECOMPOSITION = 'colored'
+
+
+def parse_size(size):
+    """
+    returns the number of orders of a fixture size, which is either
+    the name of a size or a number of orders
+
+    :param size: str
+    :return: int
+    """
+    if size in SIZES:
+        return SIZES[size]
+    if not size.isdigit() or int(size) < 1:
+        raise ValueError("Unknown fixture size '{}'.".format(size))
+    return int(size)
+
+
+def create_feature_extractor(bloom_filter_type='murmur', decomposition=DECOMPOSITION):
+    """
+    :param bloom_filter_type: str
+    :param decomposition: str
+    :return: FeatureExtractor
+    """
+    feat_extr = FeatureExtractor()
+    feat_extr.set_bloomfilter_type(bloom_filter_type)
+    feat_extr.set_encryption_key('benchmark')
+    feat_extr.set_decomposition_type(decomposition)
+    feat_extr.set_bloomfilter_size(BLOOM_FILTER_SIZE)
+    return feat_extr
+
+
+def get_fixtures(fixture_dir, num_orders):
+    """
+    returns the files of the fixture with the given number of orders,
+    which are created if they do not exist yet:
+
+    - 'orders': orders in JSON format
+    - 'filters': Base64 encoded Bloom filters
+    - 'store': the Bloom filters as binary filter store
+    - 'counts': Base64 encoded Count-Min sketches
+
+    :param fixture_dir: str
+    :param num_orders: int
+    :return: dict
+    """
+    directory = os.path.join(fixture_dir, str(num_orders))
+    fixtures = {'orders': os.path.join(directory, 'orders.json'),
+                'filters': os.path.join(directory, 'filters.dat'),
+                'store': os.path.join(directory, 'filters.bin'),
+                'counts': os.path.join(directory, 'counts.dat')}
+    # written last, hence the fixture is complete if it exists
+    done_file = os.path.join(directory, 'done')
+    if os.path.exists(done_file):
+        return fixtures
+
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    generator = SampleDataGenerator(fixtures['orders'], SEED)
+    generator.set_num_of_orders(num_orders)
+    generator.set_num_of_customers(max(num_orders // 10, 1))
+    generator.set_fraud_probability(FRAUD_PROBABILITY)
+    generator.run()
+
+    with open(fixtures['orders']) as f:
+        orders = [json.loads(line) for line in f]
+    bloom_extr = create_feature_extractor()
+    bloom_extr.write_filters(orders, fixtures['filters'], 'text')
+    bloom_extr.write_filters(orders, fixtures['store'], 'binary')
+    create_feature_extractor('count').write_filters(orders, fixtures['counts'], 'text')
+
+    open(done_file, 'w').close()
+    return fixtures
@@ -0,0 +1,200 @@
+#!/usr/bin/env python
+from __future__ import print_function
+import os
+import re
+import sys
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import resource
+import traceback
+import multiprocessing
+import simplejson as json
+from benchmarks.fixtures import get_fixtures, parse_size
+from benchmarks.suite import BENCHMARKS
+
+"""
+runs the benchmarks on fixtures of several sizes and reports their
+throughput and the increase of the peak memory during the measured
+work (excluding the preparation of its input) in JSON format. Each
+benchmark is run in a separate process, such that its memory is not
+affected by the others.
+
+    cd abbo-tools
+    python -m benchmarks.run -s small medium -o results.json
+    python -m benchmarks.run -s small -o new.json --baseline results.json
+"""
+
+DEFAULT_FIXTURE_DIR = os.path.join(tempfile.gettempdir(), 'abbo_benchmarks')
+
+
+def run_benchmarks(sizes, fixture_dir=DEFAULT_FIXTURE_DIR, pattern=None, repeat=3):
+    """
+    run the benchmarks whose names match the regular expression
+    'pattern' (all if None) on the fixtures of the given sizes. The
+    time of a benchmark is the minimum of 'repeat' runs.
+
+    :param sizes: list of str
+        names of fixture sizes or numbers of orders
+    :param fixture_dir: str
+    :param pattern: str or None
+    :param repeat: int
+    :return: dict
+    """
+    benchmarks = [b for b in BENCHMARKS if pattern is None or re.search(pattern, b[0])]
+    results = list()
+    for size in sizes:
+        num_orders = parse_size(size)
+        fixtures = _run_in_process(get_fixtures, fixture_dir, num_orders)
+        for name, unit, func in benchmarks:
+            result = _run_in_process(_measure, func, fixtures, repeat)
+            result.update({'name': name, 'size': size, 'num_orders': num_orders, 'unit': unit,
+                           'throughput': result['num_items'] / result['seconds'] if result['seconds'] > 0 else None})
+            results.append(result)
+            print('{:<28} {:>8} {:>14.1f} {}/s {:>9.1f} MB'.format(
+                name, size, result['throughput'] or 0.0, unit, result['peak_memory_increase_mb']), file=sys.stderr)
+
+    return {'python': platform.python_version(),
+            'platform': platform.platform(),
+            'processor': platform.processor(),
+            'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'repeat': repeat,
+            'results': results}
+
+
+def compare_results(results, baseline, tolerance=0.1):
+    """
+    compare the throughput of the benchmarks with a baseline, e.g.
+    the results of the previous release
+
+    :param results: dict
+    :param baseline: dict
+    :param tolerance: float
+        relative decrease of the throughput considered as regression
+    :return: list of tuples (name, size, ratio of the throughputs, is regression)
+    """
+    baseline_throughputs = dict(((r['name'], r['size']), r['throughput']) for r in baseline['results'])
+    comparison = list()
+    for r in results['results']:
+        old = baseline_throughputs.get((r['name'], r['size']))
+        if not old or not r['throughput']:
+            continue
+        ratio = r['throughput'] / old
+        comparison.append((r['name'], r['size'], ratio, ratio < 1.0 - tolerance))
+    return comparison
+
+
+def _measure(func, fixtures, repeat):
+    """
+    run benchmark 'repeat' times with output files in a temporary
+    directory. The output of the modules (e.g. the accuracy printed by
+    the predict module) is discarded.
+
+    :return: dict
+    """
+    output_dir = tempfile.mkdtemp()
+    devnull = open(os.devnull, 'w')
+    stdout = sys.stdout
+    sys.stdout = devnull
+    try:
+        times, increases = list(), list()
+        for _ in range(repeat):
+            # release the input of the previous run before preparing the next one
+            run = None
+            run, num_items = func(fixtures, output_dir)
+            _reset_peak_memory()
+            before = _peak_memory_mb()
+            start = time.time()
+            run()
+            times.append(time.time() - start)
+            increases.append(_peak_memory_mb() - before)
+    finally:
+        sys.stdout = stdout
+        devnull.close()
+        shutil.rmtree(output_dir)
+    return {'seconds': min(times), 'num_items': num_items, 'peak_memory_increase_mb': max(increases)}
+
+
+def _peak_memory_mb():
+    # ru_maxrss is given in kilobytes (Linux)
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def _reset_peak_memory():
+    """
+    reset the peak memory of the process to its current memory
+    (Linux >= 4.0). Otherwise, the increase of the peak memory
+    during a run is underestimated if the preparation of its input
+    temporarily needed more memory.
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except (IOError, OSError):
+        pass
+
+
+def _call(queue, func, args):
+    try:
+        queue.put((True, func(*args)))
+    except Exception:
+        queue.put((False, traceback.format_exc()))
+
+
+def _run_in_process(func, *args):
+    """
+    call function in a new process and return its result
+
+    :param func: function
+    :return: result of func(*args)
+    """
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_call, args=(queue, func, args))
+    process.start()
+    success, result = queue.get()
+    process.join()
+    if not success:
+        raise RuntimeError("Benchmark failed:\n{}".format(result))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks of the ABBO toolbox")
+    parser.add_argument('-s', '--sizes', type=str, nargs='+', default=['small', 'medium'],
+                        help="Fixture sizes (small, medium, large or number of orders)")
+    parser.add_argument('-k', '--pattern', type=str, default=None,
+                        help="Run only benchmarks whose names match the regular expression")
+    parser.add_argument('-r', '--repeat', type=int, default=3,
+                        help="Number of runs of each benchmark (the fastest is reported)")
+    parser.add_argument('-o', '--output_file', type=str, default=None,
+                        help="Write results to file instead of stdout")
+    parser.add_argument('--fixture_dir', type=str, default=DEFAULT_FIXTURE_DIR,
+                        help="Directory of the generated fixtures")
+    parser.add_argument('-b', '--baseline', type=str, default=None,
+                        help="Compare the throughput with results of a previous run")
+    parser.add_argument('-t', '--tolerance', type=float, default=0.1,
+                        help="Relative decrease of the throughput considered as regression")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.sizes, args.fixture_dir, args.pattern, args.repeat)
+    if args.output_file is None:
+        print(json.dumps(results, indent=2))
+    else:
+        with open(args.output_file, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            comparison = compare_results(results, json.load(f), args.tolerance)
+        for name, size, ratio, regression in comparison:
+            print('{:<28} {:>8} {:>7.2f}x{}'.format(name, size, ratio, '  REGRESSION' if regression else ''),
+                  file=sys.stderr)
+        if any(regression for _, _, _, regression in comparison):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
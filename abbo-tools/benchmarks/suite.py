@@ -0,0 +1,215 @@
+import os
+import re
+import functools
+import numpy as np
+import simplejson as json
+from modules.convert.converter import LIBSVMConverter
+from modules.generate.data_generator import SampleDataGenerator
+from modules.hardening.hardening import HardeningModule
+from modules.predict.predict import PredictionModule
+from modules.pseudonymize.filter.bloom_factory import BloomFilter
+from benchmarks.fixtures import BLOOM_FILTER_SIZE, FRAUD_PROBABILITY, create_feature_extractor
+
+"""
+benchmarks of the hot paths of the toolbox. Each benchmark is a
+function of the fixtures (see fixtures.get_fixtures) and a directory
+for output files, which prepares its input and returns a function
+performing the measured work along with the number of items (tokens,
+orders or filters) it processes.
+"""
+
+FILTER_TYPES = ['murmur', 'keyed', 'count', 'keyedcount']
+DECOMPOSITIONS = ['entities', 'colored', 'ngrams', 'words']
+# filter files of the fixtures and the filter type used to read them
+FILTER_KINDS = {'bloom': ('filters', 'murmur'),
+                'count': ('counts', 'count')}
+NOISE_LEVEL = 50
+MERGING_LEVEL = 3
+
+
+def read_orders(fixtures):
+    with open(fixtures['orders']) as f:
+        return [json.loads(line) for line in f]
+
+
+def decompose(orders):
+    """
+    returns the elements of the orders as inserted into the filters
+
+    :param orders: list of dict
+    :return: list of lists of unicode
+    """
+    feat_extr = create_feature_extractor()
+    return [re.split(" ", feat_extr._json_to_str(order).strip()) for order in orders]
+
+
+def read_filters(fixtures, kind):
+    """
+    :param fixtures: dict
+    :param kind: str ('bloom' or 'count')
+    :return: list of AbstractFilter objects
+    """
+    name, filter_type = FILTER_KINDS[kind]
+    filters = list()
+    with open(fixtures[name]) as f:
+        for line in f:
+            b = BloomFilter.factory(filter_type, 0)
+            b.read_from_line(line)
+            filters.append(b)
+    return filters
+
+
+def hashing(fixtures, output_dir, filter_type):
+    tokens = [token for elements in decompose(read_orders(fixtures)) for token in elements]
+    b = BloomFilter.factory(filter_type, BLOOM_FILTER_SIZE, 'benchmark')
+    b.set_num_hash_functions(3)
+
+    def run():
+        for token in tokens:
+            b.get_positions(token)
+    return run, len(tokens)
+
+
+def decomposition(fixtures, output_dir, decomposition_type):
+    orders = read_orders(fixtures)
+    feat_extr = create_feature_extractor(decomposition=decomposition_type)
+
+    def run():
+        for order in orders:
+            feat_extr._json_to_str(order)
+    return run, len(orders)
+
+
+def pseudonymize(fixtures, output_dir):
+    feat_extr = create_feature_extractor()
+    feat_extr.set_input(fixtures['orders'])
+    feat_extr.set_output(os.path.join(output_dir, 'filters.dat'))
+    return feat_extr.run, _count_lines(fixtures['orders'])
+
+
+def filter_add(fixtures, output_dir, kind):
+    elements = decompose(read_orders(fixtures))
+    filter_type = FILTER_KINDS[kind][1]
+
+    def run():
+        for order_elements in elements:
+            b = BloomFilter.factory(filter_type, BLOOM_FILTER_SIZE)
+            b.set_num_hash_functions(3)
+            for element in order_elements:
+                b.add(element)
+    return run, sum(len(order_elements) for order_elements in elements)
+
+
+def filter_add_all(fixtures, output_dir, kind):
+    elements = decompose(read_orders(fixtures))
+    filter_type = FILTER_KINDS[kind][1]
+
+    def run():
+        for order_elements in elements:
+            b = BloomFilter.factory(filter_type, BLOOM_FILTER_SIZE)
+            b.set_num_hash_functions(3)
+            b.add_all(order_elements)
+    return run, sum(len(order_elements) for order_elements in elements)
+
+
+def filter_merge(fixtures, output_dir, kind):
+    filters = read_filters(fixtures, kind)
+
+    def run():
+        for i in range(0, len(filters) - 1, 2):
+            filters[i].merge(filters[i + 1])
+    return run, len(filters) // 2
+
+
+def filter_noise(fixtures, output_dir, kind):
+    filters = read_filters(fixtures, kind)
+    np.random.seed(0)
+
+    def run():
+        for b in filters:
+            b.fill_with_noise(NOISE_LEVEL)
+    return run, len(filters)
+
+
+def filter_similarity(fixtures, output_dir, kind):
+    filters = read_filters(fixtures, kind)
+
+    def run():
+        for i in range(0, len(filters) - 1, 2):
+            filters[i].calc_similarity(filters[i + 1])
+    return run, len(filters) // 2
+
+
+def hardening(fixtures, output_dir):
+    hardening_module = HardeningModule()
+    hardening_module.set_input(fixtures['filters'])
+    hardening_module.set_output(os.path.join(output_dir, 'harden.dat'))
+    hardening_module.set_filter_type('murmur')
+    hardening_module.set_merging_level(MERGING_LEVEL)
+    hardening_module.set_noise_level(NOISE_LEVEL)
+    return hardening_module.run, _count_lines(fixtures['filters'])
+
+
+def conversion(fixtures, output_dir, output_format):
+    converter = LIBSVMConverter()
+    converter.set_input_file(fixtures['filters'])
+    converter.set_output_file(os.path.join(output_dir, 'filters.' + output_format))
+    converter.set_output_format(output_format)
+    converter.set_num_jobs(1)
+    return converter.run, _count_lines(fixtures['filters'])
+
+
+def prediction(fixtures, output_dir, input_name):
+    prediction_module = PredictionModule()
+    prediction_module.set_input(fixtures[input_name])
+    prediction_module.set_output(os.path.join(output_dir, 'results.csv'))
+    # the cache would be written next to the toy model of the package
+    prediction_module.set_model_cache(False)
+    if input_name == 'orders':
+        prediction_module.set_feature_extractor(create_feature_extractor())
+    return prediction_module.run, _count_lines(fixtures['orders'])
+
+
+def generation(fixtures, output_dir, filter_format):
+    num_orders = _count_lines(fixtures['orders'])
+    generator = SampleDataGenerator(os.path.join(output_dir, 'orders'), 1)
+    generator.set_num_of_orders(num_orders)
+    generator.set_num_of_customers(max(num_orders // 10, 1))
+    generator.set_fraud_probability(FRAUD_PROBABILITY)
+    if filter_format is not None:
+        generator.set_filter_output(create_feature_extractor(), filter_format)
+    return generator.run, num_orders
+
+
+def _count_lines(filename):
+    with open(filename) as f:
+        return sum(1 for _ in f)
+
+
+def _benchmarks():
+    benchmarks = list()
+    for filter_type in FILTER_TYPES:
+        benchmarks.append(('hashing/' + filter_type, 'tokens', functools.partial(hashing, filter_type=filter_type)))
+    for decomposition_type in DECOMPOSITIONS:
+        benchmarks.append(('decomposition/' + decomposition_type, 'orders',
+                           functools.partial(decomposition, decomposition_type=decomposition_type)))
+    benchmarks.append(('pseudonymize', 'orders', pseudonymize))
+    for kind in sorted(FILTER_KINDS):
+        benchmarks.append(('filter/add/' + kind, 'tokens', functools.partial(filter_add, kind=kind)))
+        benchmarks.append(('filter/add_all/' + kind, 'tokens', functools.partial(filter_add_all, kind=kind)))
+        benchmarks.append(('filter/merge/' + kind, 'pairs', functools.partial(filter_merge, kind=kind)))
+        benchmarks.append(('filter/noise/' + kind, 'filters', functools.partial(filter_noise, kind=kind)))
+        benchmarks.append(('filter/similarity/' + kind, 'pairs', functools.partial(filter_similarity, kind=kind)))
+    benchmarks.append(('hardening', 'filters', hardening))
+    for output_format in ['libsvm', 'npz', 'binary']:
+        benchmarks.append(('convert/' + output_format, 'filters',
+                           functools.partial(conversion, output_format=output_format)))
+    for input_name in ['filters', 'store', 'orders']:
+        benchmarks.append(('predict/' + input_name, 'orders', functools.partial(prediction, input_name=input_name)))
+    benchmarks.append(('generate/json', 'orders', functools.partial(generation, filter_format=None)))
+    benchmarks.append(('generate/filters', 'orders', functools.partial(generation, filter_format='binary')))
+    return benchmarks
+
+
+# list of tuples (name, unit of the items, benchmark function)
+BENCHMARKS = _benchmarks()
@@ -1,4 +1,14 @@
-from modules.pseudonymize.filter.bloom_factory import BloomFilter
+import os
+import shutil
+import tempfile
+import multiprocessing
+from modules.pseudonymize.filter.filter_batch import read_filter_batches, split_filter_file, detect_counting
+from modules.pseudonymize.filter.filter_store import FilterStoreWriter
+from modules.convert.formats import LIBSVMWriter, SparseMatrixWriter
+
+WRITERS = {'libsvm': LIBSVMWriter,
+           'npz': SparseMatrixWriter,
+           'binary': FilterStoreWriter}
 
 
 class LIBSVMConverter(object):
@@ -7,6 +17,10 @@ class LIBSVMConverter(object):
         self.__label = None
         self.__input = None
         self.__output = None
+        self.__type = None  # detect filter type
+        self.__format = 'libsvm'
+        self.__batch_size = 1000
+        self.__num_jobs = multiprocessing.cpu_count()
 
     def set_input_file(self, input_file):
         self.__input = input_file
@@ -14,10 +28,98 @@ class LIBSVMConverter(object):
     def set_output_file(self, output_file):
         self.__output = output_file
 
+    def set_filter_type(self, filter_type):
+        """
+        set type of the filters in the input file. If None, the type
+        is derived from the header of binary filter stores or from the
+        payload of Base64 encoded filters.
+
+        :param filter_type: str ('murmur', 'keyed', 'count', 'keyedcount') or None
+        :return: None
+        """
+        self.__type = filter_type
+
+    def set_output_format(self, output_format):
+        """
+        set format of the output file, i.e. LIBSVM text format, a sparse
+        CSR matrix in npz format (scipy.sparse.load_npz) or a binary
+        filter store
+
+        :param output_format: str ('libsvm', 'npz', 'binary')
+        :return: None
+        """
+        if output_format not in WRITERS:
+            raise ValueError("Unknown output format '{}'.".format(output_format))
+        self.__format = output_format
+
+    def set_batch_size(self, batch_size):
+        """
+        filters are converted in batches of 'batch_size' filters
+
+        :param batch_size: int
+        :return: None
+        """
+        self.__batch_size = batch_size
+
+    def set_num_jobs(self, num_jobs):
+        """
+        set number of worker processes (default: number of cores)
+
+        :param num_jobs: int or None
+        :return: None
+        """
+        self.__num_jobs = num_jobs or multiprocessing.cpu_count()
+
     def run(self):
-        with open(self.__output, 'w') as outfile:
-            with open(self.__input, 'r') as infile:
-                for line in infile:
-                    b = BloomFilter.factory("", 16)
-                    b.read_from_line(line)
-                    outfile.write('{}\n'.format(b.get_libsvm_str()))
+        if self.__type is None:
+            counting = detect_counting(self.__input)
+        else:
+            counting = self.__type in ('count', 'keyedcount')
+
+        ranges = split_filter_file(self.__input, self.__num_jobs)
+
+        writer = WRITERS[self.__format](self.__output)
+        try:
+            if self.__num_jobs == 1 or len(ranges) == 1:
+                for batch in read_filter_batches(self.__input, counting, self.__batch_size):
+                    writer.add_batch(batch)
+            else:
+                self.__run_parallel(writer, counting, ranges)
+        finally:
+            writer.close()
+
+    def __run_parallel(self, writer, counting, ranges):
+        """
+        convert byte ranges of the input file in worker processes
+        and append the converted parts to the output in order
+
+        :param writer: output writer
+        :param counting: bool
+        :param ranges: list of tuples (start, stop)
+        :return: None
+        """
+        tmp_dir = tempfile.mkdtemp(dir=os.path.dirname(os.path.abspath(self.__output)))
+        tasks = [(self.__input, counting, self.__batch_size, byte_range,
+                  self.__format, os.path.join(tmp_dir, 'part{}'.format(i)))
+                 for i, byte_range in enumerate(ranges)]
+
+        pool = multiprocessing.Pool(self.__num_jobs)
+        try:
+            for part in pool.imap(_convert_range, tasks):
+                writer.append_part(part)
+                os.remove(part)
+            pool.close()
+        finally:
+            pool.terminate()
+            shutil.rmtree(tmp_dir)
+
+
+def _convert_range(task):
+    filename, counting, batch_size, byte_range, output_format, part = task
+    writer = WRITERS[output_format](part)
+    try:
+        for batch in read_filter_batches(filename, counting, batch_size, byte_range):
+            writer.add_batch(batch)
+    finally:
+        writer.close()
+    return part
@@ -0,0 +1,284 @@
+import os
+import shutil
+import struct
+import tempfile
+import zipfile
+import numpy as np
+import scipy.sparse as sp
+from modules.utils.file_io import open_file
+
+"""
+output formats of the converter. Each writer consumes batches of
+filters (see filter_batch.FilterBatch) and writes them to a file.
+"""
+
+# size of the headers of npy files written by SparseMatrixWriter. The
+# header is written last, hence the space is reserved in advance.
+_NPY_HEADER_SIZE = 128
+
+
+class LIBSVMWriter(object):
+    """
+    writes filters in LIBSVM format (one filter per line)
+    """
+
+    def __init__(self, filename):
+        self.__file = open_file(filename, 'w')
+        self.__index_strs = np.array([], dtype=object)
+
+    def add_batch(self, batch):
+        """
+        append batch of filters to the output file
+
+        :param batch: FilterBatch
+        :return: None
+        """
+        self.__file.write(self.__libsvm_lines(batch))
+
+    def append_part(self, filename):
+        """
+        append the lines of another LIBSVM file, e.g. written by
+        a worker process
+
+        :param filename: str
+        :return: None
+        """
+        with open_file(filename, 'r') as f:
+            shutil.copyfileobj(f, self.__file, 1 << 24)
+
+    def close(self):
+        self.__file.close()
+
+    def __libsvm_lines(self, batch):
+        """
+        converts a batch of filters to lines in LIBSVM format
+
+        :param batch: FilterBatch
+        :return: str
+        """
+        rows, cols, values = batch.nonzero()
+        if batch.counting:
+            tokens = self.__get_index_strs(batch.num_features)[cols] + values.astype(str).astype(object)
+        else:
+            tokens = self.__get_index_strs(batch.num_features, '1')[cols]
+
+        # tokens are ordered by row, hence each filter is a slice
+        bounds = np.searchsorted(rows, np.arange(len(batch) + 1))
+        lines = ['{} {}\n'.format(label, ' '.join(tokens[bounds[i]:bounds[i+1]]))
+                 for i, label in enumerate(batch.labels.tolist())]
+        return ''.join(lines)
+
+    def __get_index_strs(self, num_features, value=''):
+        """
+        returns cached strings 'index:value' for all features
+
+        :param num_features: int
+        :param value: str
+        :return: np.ndarray (object)
+        """
+        if num_features == 0:
+            return np.array([], dtype=object)
+        if len(self.__index_strs) != num_features or self.__index_strs[0] != '1:{}'.format(value):
+            self.__index_strs = np.array(['{}:{}'.format(i+1, value) for i in range(num_features)], dtype=object)
+        return self.__index_strs
+
+
+class SparseMatrixWriter(object):
+    """
+    writes filters as sparse matrix in CSR format to a npz file which
+    can be loaded with scipy.sparse.load_npz. The labels of the filters
+    are stored in the same file ('labels'). The components of the matrix
+    are streamed into temporary files, so only a single batch of filters
+    is kept in memory.
+    """
+
+    def __init__(self, filename):
+        self.__filename = filename
+        self.__tmp_dir = tempfile.mkdtemp(dir=os.path.dirname(os.path.abspath(filename)))
+        self.__arrays = dict()  # name -> (file object, dtype, length)
+        self.__num_rows = 0
+        self.__num_nnz = 0
+        self.__num_features = None
+        self.__append('indptr', np.zeros(1, dtype=np.int64))
+
+    def add_batch(self, batch):
+        """
+        append batch of filters to the matrix
+
+        :param batch: FilterBatch
+        :return: None
+        """
+        _, cols, values = batch.nonzero()
+        self.__add(cols, values, batch.row_nnz(), batch.labels, batch.num_features)
+
+    def append_part(self, filename):
+        """
+        append the matrix of another npz file, e.g. written by
+        a worker process
+
+        :param filename: str
+        :return: None
+        """
+        X, y = load_sparse_matrix(filename)
+        if X.shape[0] > 0:
+            self.__add(X.indices, X.data, np.diff(X.indptr), y, X.shape[1])
+
+    def __add(self, cols, values, row_nnz, labels, num_features):
+        if self.__num_features is None:
+            self.__num_features = num_features
+        elif self.__num_features != num_features:
+            raise ValueError("All filters in a file have to be of the same size.")
+
+        indptr = self.__num_nnz + np.cumsum(row_nnz)
+        self.__append('indptr', indptr)
+        self.__append('indices', cols.astype(np.int32))
+        self.__append('data', values)
+        self.__append('labels', labels.astype(np.int8))
+        self.__num_rows += len(row_nnz)
+        self.__num_nnz += len(cols)
+
+    def close(self):
+        """
+        assemble the npz file and remove temporary files
+
+        :return: None
+        """
+        try:
+            for name, dtype in [('indices', np.int32), ('data', np.uint8), ('labels', np.int8)]:
+                if name not in self.__arrays:
+                    self.__append(name, np.zeros(0, dtype=dtype))
+
+            with zipfile.ZipFile(self.__filename, 'w', zipfile.ZIP_STORED, allowZip64=True) as zf:
+                for name, (f, dtype, length) in sorted(self.__arrays.items()):
+                    f.seek(0)
+                    f.write(_npy_header(dtype, length))
+                    f.close()
+                    zf.write(f.name, name + '.npy')
+
+                shape = np.array([self.__num_rows, self.__num_features or 0], dtype=np.int64)
+                for name, array in [('format', np.array(b'csr')), ('shape', shape)]:
+                    filename = os.path.join(self.__tmp_dir, name + '.npy')
+                    np.save(filename, array)
+                    zf.write(filename, name + '.npy')
+        finally:
+            for f, _, _ in self.__arrays.values():
+                f.close()
+            shutil.rmtree(self.__tmp_dir)
+
+    def __append(self, name, array):
+        if name not in self.__arrays:
+            f = open(os.path.join(self.__tmp_dir, name + '.npy'), 'wb')
+            f.write(b'\x00' * _NPY_HEADER_SIZE)
+            self.__arrays[name] = (f, array.dtype, 0)
+
+        f, dtype, length = self.__arrays[name]
+        f.write(array.astype(dtype).tobytes())
+        self.__arrays[name] = (f, dtype, length + len(array))
+
+
+def _npy_header(dtype, length):
+    """
+    returns header of a npy file (format version 1.0) containing a
+    1-dimensional array, padded to _NPY_HEADER_SIZE bytes
+
+    :param dtype: np.dtype
+    :param length: int
+    :return: bytes
+    """
+    header = "{{'descr': {!r}, 'fortran_order': False, 'shape': ({},), }}".format(
+        str(np.lib.format.dtype_to_descr(dtype)), length)
+    header = header.ljust(_NPY_HEADER_SIZE - 11) + '\n'
+    return b'\x93NUMPY\x01\x00' + struct.pack('<H', len(header)) + header.encode('latin1')
+
+
+def load_sparse_matrix(filename):
+    """
+    load filters stored in npz format by SparseMatrixWriter
+
+    :param filename: str
+    :return: scipy.sparse.csr_matrix, np.ndarray (labels)
+    """
+    X = sp.load_npz(filename)
+    with np.load(filename) as npz:
+        if 'labels' in npz.files:
+            y = npz['labels']
+        else:
+            y = np.zeros(X.shape[0], dtype=np.int8)
+    return X, y
+
+
+def align_features(X, num_features):
+    """
+    truncate or pad sparse matrix X to num_features columns
+
+    :param X: scipy.sparse.csr_matrix
+    :param num_features: int
+    :return: scipy.sparse.csr_matrix
+    """
+    if X.shape[1] > num_features:
+        X = X[:, :num_features]
+    elif X.shape[1] < num_features:
+        X = sp.csr_matrix((X.data, X.indices, X.indptr), shape=(X.shape[0], num_features))
+    return X
+
+
+def read_sparse_matrix_batches(filename, batch_size=10000):
+    """
+    read filters stored in npz format by SparseMatrixWriter in batches
+    of rows. Arrays stored uncompressed are memory-mapped, so the matrix
+    does not need to fit into memory.
+
+    :param filename: str
+    :param batch_size: int
+    :return: generator of tuples (scipy.sparse.csr_matrix, np.ndarray)
+    """
+    arrays = _open_npz_arrays(filename)
+    num_rows, num_features = arrays['shape']
+    indptr, indices, data = arrays['indptr'], arrays['indices'], arrays['data']
+    labels = arrays.get('labels', np.zeros(num_rows, dtype=np.int8))
+
+    for start in range(0, num_rows, batch_size):
+        stop = min(start + batch_size, num_rows)
+        p0, p1 = indptr[start], indptr[stop]
+        X = sp.csr_matrix((np.array(data[p0:p1]), np.array(indices[p0:p1]), np.array(indptr[start:stop+1] - p0)),
+                          shape=(stop - start, num_features))
+        yield X, np.array(labels[start:stop])
+
+
+def _open_npz_arrays(filename):
+    """
+    returns the arrays of a npz file. Non-empty 1-dimensional arrays
+    which are stored uncompressed are memory-mapped.
+
+    :param filename: str
+    :return: dict
+    """
+    arrays = dict()
+    with zipfile.ZipFile(filename) as zf:
+        infos = zf.infolist()
+    with open(filename, 'rb') as f:
+        for info in infos:
+            name = os.path.splitext(info.filename)[0]
+            if info.compress_type != zipfile.ZIP_STORED:
+                with np.load(filename) as npz:
+                    arrays[name] = npz[name]
+                continue
+
+            # skip local file header of the zip entry
+            f.seek(info.header_offset)
+            header = f.read(zipfile.sizeFileHeader)
+            name_len, extra_len = struct.unpack('<HH', header[26:30])
+            f.seek(info.header_offset + zipfile.sizeFileHeader + name_len + extra_len)
+
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+
+            if len(shape) == 1 and shape[0] > 0 and not dtype.hasobject:
+                arrays[name] = np.memmap(filename, dtype=dtype, mode='r', offset=f.tell(), shape=shape)
+            else:
+                f.seek(info.header_offset + zipfile.sizeFileHeader + name_len + extra_len)
+                arrays[name] = np.lib.format.read_array(f)
+    return arrays
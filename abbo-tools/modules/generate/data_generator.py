@@ -1,20 +1,46 @@
 import os
+import shutil
+import string
+import hashlib
+import tempfile
+import itertools
+import multiprocessing
 from csv import DictReader
 from collections import defaultdict
-import string
 import numpy as np
 import simplejson as json
 import config
+try:
+    from numpy.random import SeedSequence
+except ImportError:  # numpy < 1.17
+    SeedSequence = None
+
+from order import Article, Customer, Address
+from sampler import load_sampler
+from fraud import FraudRings, name_variants
+from modules.pseudonymize.feature_extractor import FILTER_WRITERS
+from modules.utils.file_io import open_file, strip_compression
+
+# number of orders whose fields are sampled at once
+BATCH_SIZE = 10000
+
+# JSON encoding of orders with sorted keys (see Order.json_encode)
+ORDER_FORMAT = ('{"billingAddress": %s, "cartItems": [%s], "couponCode": %s, "customer": %s, '
+                '"grandTotal": "%.2f", "id": %d, "invoiceFraudLabel": %s, "iteration": %d, '
+                '"openAmount": "%.2f", "shippingAddress": %s, "solvencyScore": {"score": %d}}')
+SIMPLE_ORDER_FORMAT = '{"billingAddress": %s}'
+
+# generator of a worker process (see _init_worker)
+_generator = None
 
-from order import SimpleOrder, Article, Order, Customer, Address
+# range of the id of the first order
+MIN_ID, MAX_ID = 10000000000000, 10100000000000
 
 
 class SampleDataGenerator(object):
     """
     class which is used to create sample orders using given marginal distributions
     """
-    id = np.random.randint(10000000000000, 10100000000000)
-
     def __init__(self, output_file, seed=None):
         """
         sample orders using given marginal feature distributions provided
@@ -28,7 +54,6 @@ class SampleDataGenerator(object):
         self._num_orders = 100  # number of orders to create
         self._num_customers = 100  # number of possible customers to sample from
 
-        self._orders = list()
         self._customers = list()
         self._articles = dict()
 
@@ -37,8 +62,19 @@ class SampleDataGenerator(object):
         self._customers_unique = False  # if true, customers are sampled without replacement
         self._fraud_probability = 0.01
 
-        # set seeds for random number generators
-        np.random.seed(seed)
+        self._seed = seed
+        self._random = None
+        self._num_shards = 1
+        self._num_jobs = 1
+        self._shard_files = False
+        self._first_id = None
+        self._customer_idcs = None  # customers of the orders if sampled without replacement
+        self._num_fraud_rings = 0
+        self._num_ring_addresses = 2
+        self._num_ring_name_variants = 4
+        self._fraud_rings = None
+        self._feature_extractor = None  # if set, filters are written instead of JSON
+        self._filter_format = 'text'
 
     def run(self):
         """
@@ -48,15 +84,125 @@ class SampleDataGenerator(object):
         customers/articles which are created in advance. Orders are written
         to file in JSON format.
 
+        The orders are split into shards, each of which is sampled
+        from an independent random stream derived from the seed. The
+        customers are shared by all shards. Hence, the output only
+        depends on the seed and the number of shards, but not on the
+        number of worker processes.
+
         :return: None
         """
+        if self._simple_mode and self._num_fraud_rings > 0:
+            # simple orders have no shipping address and articles
+            raise ValueError("Fraud rings cannot be injected into orders in simple mode.")
+
+        # streams of the customers and of each shard
+        seeds = _spawn_seeds(self._seed, self._num_shards + 1)
+        self._random = np.random.RandomState(seeds[0])
+
         # create set of customers
         self.__create_customers()
         self.__load_articles()
+        self._first_id = int(self._random.randint(MIN_ID, MAX_ID))
+        if self._customers_unique:
+            self._customer_idcs = self._random.permutation(len(self._customers))[:self._num_orders]
+        if self._num_fraud_rings > 0:
+            self._fraud_rings = self.__create_fraud_rings()
 
         # create orders
-        outfile = os.path.join(self._output_file)
-        self.__create_orders(outfile)
+        bounds = [self._num_orders * i // self._num_shards for i in range(self._num_shards + 1)]
+        shards = [(bounds[i], bounds[i + 1], seeds[i + 1]) for i in range(self._num_shards)]
+        if self._shard_files:
+            # e.g. orders.json.gz -> orders-00000-of-00004.json.gz
+            base = strip_compression(self._output_file)
+            root, ext = os.path.splitext(base)
+            ext += self._output_file[len(base):]
+            outputs = ['{}-{:05d}-of-{:05d}{}'.format(root, i, self._num_shards, ext)
+                       for i in range(self._num_shards)]
+            self.__create_shards(shards, outputs)
+        elif self._num_jobs == 1 or self._num_shards == 1:
+            if self.writes_filters:
+                self.write_filters(self._output_file, shards)
+                return
+            with open_file(self._output_file, 'w') as f:
+                for begin, end, seed in shards:
+                    self.write_orders(f, begin, end, seed)
+        else:
+            self.__create_shards_and_concatenate(shards)
+
+    def set_filter_output(self, feature_extractor, filter_format='text'):
+        """
+        pseudonymize the orders in-process: the orders are passed as
+        dicts to the feature extractor and their filters are written
+        to the output file instead of the orders in JSON format. The
+        filters are identical to those obtained by pseudonymizing the
+        JSON output with the same configuration.
+
+        :param feature_extractor: FeatureExtractor or None
+        :param filter_format: str ('text': Base64 encoded, 'binary': binary filter store)
+        :return: None
+        """
+        if filter_format not in FILTER_WRITERS:
+            raise ValueError("Unknown filter format '{}'.".format(filter_format))
+        self._feature_extractor = feature_extractor
+        self._filter_format = filter_format
+
+    @property
+    def writes_filters(self):
+        """
+        returns whether filters are written instead of orders
+
+        :return: bool
+        """
+        return self._feature_extractor is not None
+
+    def set_fraud_rings(self, num_rings, num_addresses=2, num_name_variants=4):
+        """
+        inject fraud rings: each fraudulent order is assigned to one of
+        'num_rings' rings. Its items are articles of the ring and it is
+        shipped to one of the 'num_addresses' drop addresses of the
+        ring, addressed to one of 'num_name_variants' variants of the
+        name of the ring.
+
+        :param num_rings: int (0 disables fraud rings)
+        :param num_addresses: int
+        :param num_name_variants: int
+        :return: None
+        """
+        self._num_fraud_rings = num_rings
+        self._num_ring_addresses = max(1, num_addresses)
+        self._num_ring_name_variants = max(1, num_name_variants)
+
+    def set_num_shards(self, num_shards):
+        """
+        set number of shards, i.e. of independent random streams
+        the orders are sampled from
+
+        :param num_shards: int
+        :return: None
+        """
+        self._num_shards = max(1, num_shards)
+
+    def set_num_jobs(self, num_jobs):
+        """
+        set number of worker processes generating shards
+        (default: 1, all cores if None)
+
+        :param num_jobs: int or None
+        :return: None
+        """
+        self._num_jobs = num_jobs or multiprocessing.cpu_count()
+
+    def set_shard_files(self, shard_files):
+        """
+        write each shard to a separate file
+        (<output>-<shard>-of-<num_shards>.<ext>) instead of
+        concatenating the shards
+
+        :param shard_files: bool
+        :return: None
+        """
+        self._shard_files = shard_files
 
     def set_num_of_orders(self, num_orders):
         """
@@ -109,9 +255,7 @@ class SampleDataGenerator(object):
             male_names = map(self.__clean_string, male_names)
             surnames = map(self.__clean_string, surnames)
 
-        providers, frequencies = SampleDataGenerator.__load_name_frequencies(config.EMAIL_PROVIDERS)
-        probabilities = frequencies / np.sum(frequencies)
-        email_suffixes = list(np.random.choice(providers, self._num_customers, p=probabilities))
+        email_suffixes = load_sampler(config.EMAIL_PROVIDERS).sample(self._random, self._num_customers)
 
         for i in range(len(female_names)):
             forename, surname = female_names[i], surnames.pop()
@@ -140,7 +284,7 @@ class SampleDataGenerator(object):
             customer = self._customers[i]
             street = streets[i]
             city = cities[i]
-            zip_code = str(np.random.randint(plz[city][0], plz[city][1])).zfill(5)
+            zip_code = str(self._random.randint(plz[city][0], plz[city][1])).zfill(5)
             address = Address(firstname=customer.get_firstname(),
                               lastname=customer.get_lastname(),
                               street=street,
@@ -149,10 +293,8 @@ class SampleDataGenerator(object):
             customer.set_address(address)
 
     def __sample_street_names(self, street_names_file):
-        names, frequencies = self.__load_name_frequencies(street_names_file)
-        probabilities = frequencies / np.sum(frequencies)
-        street_names = np.random.choice(names, self._num_customers, p=probabilities)
-        house_numbers = map(abs, map(int, np.random.normal(1, 50, self._num_customers)))
+        street_names = load_sampler(street_names_file).sample(self._random, self._num_customers)
+        house_numbers = map(abs, map(int, self._random.normal(1, 50, self._num_customers)))
 
         sampled_streets = [u'{} {}'.format(e1, e2) for e1, e2 in zip(street_names, house_numbers)]
 
@@ -166,10 +308,7 @@ class SampleDataGenerator(object):
         :param num_items:
         :return:
         """
-        names, frequencies = self.__load_name_frequencies(real_names_file)
-        probabilities = frequencies / np.sum(frequencies)
-        forenames = np.random.choice(names, num_items, p=probabilities)
-        return list(forenames)
+        return load_sampler(real_names_file).sample(self._random, num_items)
 
     def __sample_surnames(self, surname_file):
         """
@@ -178,10 +317,7 @@ class SampleDataGenerator(object):
         :param surname_file:
         :return:
         """
-        names, frequencies = self.__load_name_frequencies(surname_file)
-        probabilities = frequencies / np.sum(frequencies)
-        surnames = np.random.choice(names, self._num_customers, p=probabilities)
-        return list(surnames)
+        return load_sampler(surname_file).sample(self._random, self._num_customers)
 
     def __sample_cities(self, cities_file):
         """
@@ -190,10 +326,7 @@ class SampleDataGenerator(object):
         :param cities_file:
         :return:
         """
-        names, frequencies = self.__load_name_frequencies(cities_file)
-        probabilities = frequencies / np.sum(frequencies)
-        cities = np.random.choice(names, self._num_customers, p=probabilities)
-        return list(cities)
+        return load_sampler(cities_file).sample(self._random, self._num_customers)
 
     def __get_plz_ranges(self, plz_file):
         """
@@ -207,22 +340,6 @@ class SampleDataGenerator(object):
             plz_ranges[u'{}'.format(row['name'].decode('utf-8'))] = (int(row['start']), int(row['end']))
         return plz_ranges
 
-    @staticmethod
-    def __load_name_frequencies(frequency_file):
-        """
-        read actual names and their respective frequencies from csv file.
-        Return list of names and list of frequencies.
-
-        :param frequency_file: name of csv file
-        :return: list of names, list of frequencies
-        """
-        names, frequencies = list(), list()
-        cr = DictReader(open(frequency_file, 'r'))
-        for row in cr:
-            names.append(row['name'].decode('utf-8'))
-            frequencies.append(float(row['frequency']))
-        return names, frequencies
-
     def __load_articles(self):
         """
         returns dictionary with articles and their respective prices and probabilities
@@ -234,10 +351,11 @@ class SampleDataGenerator(object):
 
         prices_mean = self._distributions['cartItems.price']['mean']
         prices_std = self._distributions['cartItems.price']['std']
-        prices = map(SampleDataGenerator.__sample_article_price, np.random.normal(prices_mean, prices_std, size=len(article_skus)))
+        prices = map(SampleDataGenerator.__sample_article_price, self._random.normal(prices_mean, prices_std, size=len(article_skus)))
 
         self._articles = {'article_skus': article_skus,
                           'article_probabilities': article_probabilities,
+                          'article_cdf': np.cumsum(article_probabilities),
                           'prices': prices}
 
     @staticmethod
@@ -247,85 +365,330 @@ class SampleDataGenerator(object):
             price -= 0.05
         return price
 
-    def __create_orders(self, output):
-
-        idcs = np.random.choice(range(len(self._customers)),
-                                size=self._num_orders,
-                                replace=(not self._customers_unique))
-        with open(output, 'w') as f:
-            for i in range(self._num_orders):
-                # select customer
-                customer = self._customers[idcs[i]]
-
-                order = self.__create_order(customer)
-                self._orders.append(order)
-
-                # store/print orders
-                json_str = json.dumps(order.json_encode(), sort_keys=True)
-                f.write(json_str + '\n')
-
-    def __create_order(self, customer):
-
-        # sample solvency score
-        solvency_score = float(np.random.normal(float(self._distributions['solvencyScore.score']['mean']),
-                                                float(self._distributions['solvencyScore.score']['std'])))
-
-        # sample number of iterations
-        iteration = int(np.round(np.random.normal(float(self._distributions['iteration']['mean']),
-                                                  float(self._distributions['iteration']['std']))))
-
-        # sample open amount
-        open_amount = np.abs(float(np.random.normal(float(self._distributions['openAmount']['mean']),
-                                                    float(self._distributions['openAmount']['std'])))/100.0)
-
-        # sample coupon code
-        cc_prob = float(self._distributions['couponCode']['True'])
-        coupon_code = np.random.choice([True, False], p=[cc_prob, 1-cc_prob])
-
-        # sample label
-        label = self.__sample_label()
-
-        # increment global id
-        SampleDataGenerator.id += 1
-
-        # create new order
-        order = Order(id=SampleDataGenerator.id,
-                      customer=customer,
-                      shipping_address=customer.get_address(),
-                      billing_address=customer.get_address(),
-                      solvency_score=solvency_score,
-                      iteration=iteration,
-                      open_amount=open_amount,
-                      coupon_code=coupon_code,
-                      label=label)
-
-        # add cart items
-        # sample open amount
-        num_cart_items = int(np.abs(np.random.normal(float(self._distributions['numCartItems']['mean']),
-                                                     float(self._distributions['numCartItems']['std']))))
-        num_cart_items = max(1, num_cart_items)  # ensure that cart is not empty
-
-        # sample articles
-        article_idcs = np.random.choice(range(len(self._articles['article_skus'])),
-                                        size=num_cart_items,
-                                        p=self._articles['article_probabilities'])
-        for i in article_idcs:
-            article = Article(self._articles['article_skus'][i], self._articles['prices'][i])
-            order.add_cart_item(article)
+    def __create_shards(self, shards, outputs):
+        """
+        write each shard to its output file
 
-        if self._simple_mode:
-            order = SimpleOrder(billing_address=customer.get_address())
+        :param shards: list of tuples (begin, end, seed)
+        :param outputs: list of str
+        :return: None
+        """
+        tasks = [(output,) + shard for shard, output in zip(shards, outputs)]
+        if self._num_jobs == 1:
+            for task in tasks:
+                _write_shard(task, self)
+            return
 
-        return order
+        pool = multiprocessing.Pool(min(self._num_jobs, len(tasks)), _init_worker, (self,))
+        try:
+            pool.map(_write_shard, tasks)
+            pool.close()
+        finally:
+            pool.terminate()
 
-    def __sample_label(self):
+    def __create_shards_and_concatenate(self, shards):
         """
-        returns random label (True, False) according to fraud probability
+        write shards in worker processes and append them to the
+        output file in order
 
-        :return: bool
+        :param shards: list of tuples (begin, end, seed)
+        :return: None
+        """
+        tmp_dir = tempfile.mkdtemp(dir=os.path.dirname(os.path.abspath(self._output_file)))
+        tasks = [(os.path.join(tmp_dir, 'part{}'.format(i)),) + shard for i, shard in enumerate(shards)]
+
+        pool = multiprocessing.Pool(min(self._num_jobs, len(tasks)), _init_worker, (self,))
+        try:
+            parts = pool.imap(_write_shard, tasks)
+            if self.writes_filters:
+                # binary filter stores are appended without their header
+                writer = FILTER_WRITERS[self._filter_format](self._output_file)
+                try:
+                    for part in parts:
+                        writer.append_part(part)
+                        os.remove(part)
+                finally:
+                    writer.close()
+            else:
+                with open_file(self._output_file, 'wb') as f:
+                    for part in parts:
+                        with open(part, 'rb') as fin:
+                            shutil.copyfileobj(fin, f, 1 << 20)
+                        os.remove(part)
+            pool.close()
+        finally:
+            pool.terminate()
+            shutil.rmtree(tmp_dir)
+
+    def write_orders(self, f, begin, end, seed):
+        """
+        create the orders begin, ..., end - 1 of the data set and
+        write them to a file
+
+        :param f: file object
+        :param begin: int
+        :param end: int
+        :param seed: np.ndarray
+            The seed of the random stream of the orders
+        :return: None
+        """
+        self._random = np.random.RandomState(seed)
+
+        # the JSON encodings of articles and of customers sampled with
+        # replacement are computed once and shared by all orders
+        # containing them. Customers sampled without replacement occur
+        # in a single order and are encoded per batch.
+        articles = [json.dumps(Article(sku, price).json_encode(), sort_keys=True)
+                    for sku, price in zip(self._articles['article_skus'], self._articles['prices'])]
+        if not self._customers_unique:
+            customers = [_encode_customer(c) for c in self._customers]
+
+        for start in range(begin, end, BATCH_SIZE):
+            stop = min(start + BATCH_SIZE, end)
+            # select customers
+            if self._customers_unique:
+                batch = [_encode_customer(self._customers[i]) for i in self._customer_idcs[start:stop].tolist()]
+            else:
+                batch = [customers[i] for i in self._random.randint(0, len(customers), stop - start).tolist()]
+            f.write(''.join(self.__encode_order_batch(batch, articles, self._first_id + start)))
+
+    def iter_orders(self, begin, end, seed):
+        """
+        create the orders begin, ..., end - 1 of the data set like
+        write_orders, but yield them as dicts (equal to the decoded
+        JSON lines) instead of encoding them. Orders of the same
+        customer share the dicts of the customer and its address.
+
+        :param begin: int
+        :param end: int
+        :param seed: np.ndarray
+            The seed of the random stream of the orders
+        :return: generator of dicts
+        """
+        self._random = np.random.RandomState(seed)
+
+        articles = [Article(sku, price).json_encode()
+                    for sku, price in zip(self._articles['article_skus'], self._articles['prices'])]
+        ring_addresses = dict()
+        if self._fraud_rings is not None:
+            for addresses in self._fraud_rings.addresses:
+                ring_addresses.update((a, json.loads(a)) for a in addresses)
+        if not self._customers_unique:
+            customers = [_customer_dicts(c) for c in self._customers]
+
+        for start in range(begin, end, BATCH_SIZE):
+            stop = min(start + BATCH_SIZE, end)
+            if self._customers_unique:
+                batch = [_customer_dicts(self._customers[i]) for i in self._customer_idcs[start:stop].tolist()]
+            else:
+                batch = [customers[i] for i in self._random.randint(0, len(customers), stop - start).tolist()]
+            for order in self.__create_order_batch(batch, articles, self._first_id + start, ring_addresses):
+                yield order
+
+    def write_filters(self, output, shards):
+        """
+        create the orders of several shards and write their filters
+        created by the feature extractor (see set_filter_output) to
+        a file
+
+        :param output: str
+        :param shards: list of tuples (begin, end, seed)
+        :return: None
+        """
+        orders = itertools.chain.from_iterable(self.iter_orders(*shard) for shard in shards)
+        self._feature_extractor.write_filters(orders, output, self._filter_format)
+
+    def __sample_order_fields(self, num_orders):
+        """
+        sample the fields of a batch of orders at once
+
+        :param num_orders: int
+        :return: dict of np.ndarray, the articles of order i are
+                 articles[offsets[i]:offsets[i + 1]]
+        """
+        d = self._distributions
+        fields = dict()
+        fields['solvency_score'] = self._random.normal(d['solvencyScore.score']['mean'],
+                                                    d['solvencyScore.score']['std'], num_orders)
+        fields['iteration'] = np.round(self._random.normal(d['iteration']['mean'],
+                                                        d['iteration']['std'], num_orders)).astype(np.int64)
+        fields['open_amount'] = np.abs(self._random.normal(d['openAmount']['mean'],
+                                                        d['openAmount']['std'], num_orders)) / 100.0
+        fields['coupon_code'] = self._random.random_sample(num_orders) < d['couponCode']['True']
+        fields['label'] = self._random.random_sample(num_orders) < self._fraud_probability
+
+        # ensure that carts are not empty
+        num_cart_items = np.abs(self._random.normal(d['numCartItems']['mean'],
+                                                 d['numCartItems']['std'], num_orders)).astype(np.int64)
+        num_cart_items = np.maximum(num_cart_items, 1)
+        fields['offsets'] = np.concatenate([[0], np.cumsum(num_cart_items)])
+
+        fields['articles'] = self.__sample_articles(fields['offsets'][-1])
+        return fields
+
+    def __sample_articles(self, num_articles):
+        """
+        sample articles by inverting their cumulative distribution
+
+        :param num_articles: int
+        :return: np.ndarray
+        """
+        cdf = self._articles['article_cdf']
+        u = self._random.random_sample(num_articles) * cdf[-1]
+        return np.minimum(np.searchsorted(cdf, u, side='right'), len(cdf) - 1)
+
+    def __create_fraud_rings(self):
+        """
+        create the drop addresses, name variants and articles of
+        the fraud rings
+
+        :return: FraudRings
+        """
+        num_rings, num_addresses = self._num_fraud_rings, self._num_ring_addresses
+        female = self._random.random_sample(num_rings) < self._distributions['customer.gender']['f']
+        female_names = load_sampler(config.FEMALE_NAMES).sample(self._random, num_rings)
+        male_names = load_sampler(config.MALE_NAMES).sample(self._random, num_rings)
+        surnames = load_sampler(config.SURNAMES).sample(self._random, num_rings)
+        streets = load_sampler(config.STREET_NAMES).sample(self._random, num_rings * num_addresses)
+        house_numbers = self._random.randint(1, 100, num_rings * num_addresses).tolist()
+        cities = load_sampler(config.CITIES).sample(self._random, num_rings * num_addresses)
+        plz = self.__get_plz_ranges(config.PLZ)
+
+        addresses = list()
+        for i in range(num_rings):
+            forename = female_names[i] if female[i] else male_names[i]
+            forenames = name_variants(forename, self._num_ring_name_variants, self._random)
+            names = [(forenames[j % len(forenames)], surname)
+                     for j, surname in enumerate(name_variants(surnames[i], self._num_ring_name_variants,
+                                                               self._random))]
+            ring_addresses = list()
+            for j in range(i * num_addresses, (i + 1) * num_addresses):
+                street = u'{} {}'.format(streets[j], house_numbers[j])
+                zip_code = str(self._random.randint(plz[cities[j]][0], plz[cities[j]][1])).zfill(5)
+                for forename, surname in names:
+                    if self._upper:
+                        forename, surname, street = map(self.__clean_string, (forename, surname, street))
+                    address = Address(firstname=forename, lastname=surname, street=street,
+                                      zip_code=zip_code, city=cities[j])
+                    ring_addresses.append(json.dumps(address.json_encode(), sort_keys=True))
+            addresses.append(ring_addresses)
+
+        # each ring orders two articles
+        articles = self.__sample_articles(2 * num_rings).reshape(num_rings, 2)
+        return FraudRings(addresses, articles)
+
+    def __sample_order_batch(self, num_orders):
+        """
+        sample the fields of a batch of orders and assign the
+        fraudulent orders to fraud rings
+
+        :param num_orders: int
+        :return: dict of lists (see __sample_order_fields) with the
+                 prices of the articles ('prices') and the JSON encoded
+                 shipping address of each order ('shipping_address',
+                 None if shipped to the billing address)
+        """
+        fields = self.__sample_order_fields(num_orders)
+        shipping_addresses = [None] * num_orders
+        if self._fraud_rings is not None:
+            self._fraud_rings.apply(self._random, fields)
+            shipping_addresses = fields['shipping_address']
+        batch = dict((k, v.tolist()) for k, v in fields.items() if k != 'shipping_address')
+        batch['shipping_address'] = shipping_addresses
+        batch['prices'] = [self._articles['prices'][i] for i in batch['articles']]
+        return batch
+
+    def __encode_order_batch(self, customers, articles, first_id):
+        """
+        create orders for a batch of customers and encode them in
+        JSON format (as json.dumps(order.json_encode(), sort_keys=True))
+
+        :param customers: list of tuples (customer JSON, address JSON)
+        :param articles: list of article JSONs
+        :param first_id: int
+            The id of the first order of the batch minus one
+        :return: list of str, one line per order
+        """
+        if self._simple_mode:
+            return [SIMPLE_ORDER_FORMAT % address + '\n' for _, address in customers]
+
+        fields = self.__sample_order_batch(len(customers))
+        solvency_scores = fields['solvency_score']
+        iterations = fields['iteration']
+        open_amounts = fields['open_amount']
+        coupon_codes = fields['coupon_code']
+        labels = fields['label']
+        offsets = fields['offsets']
+        article_idcs = fields['articles']
+        prices = fields['prices']
+        shipping_addresses = fields['shipping_address']
+
+        lines = list()
+        for i, (customer, address) in enumerate(customers):
+            begin, end = offsets[i], offsets[i + 1]
+            cart_items = ', '.join([articles[j] for j in article_idcs[begin:end]])
+            grand_total = 0.0
+            for price in prices[begin:end]:
+                grand_total += price
+
+            lines.append(ORDER_FORMAT % (address, cart_items,
+                                         '"coupon_code"' if coupon_codes[i] else '""',
+                                         customer, grand_total, first_id + i + 1,
+                                         'true' if labels[i] else 'false', iterations[i],
+                                         open_amounts[i], shipping_addresses[i] or address,
+                                         int(solvency_scores[i])) + '\n')
+        return lines
+
+    def __create_order_batch(self, customers, articles, first_id, ring_addresses):
+        """
+        create orders for a batch of customers as dicts, which are
+        equal to the decoded lines of __encode_order_batch. Orders
+        with the same solvency score share its dict.
+
+        :param customers: list of tuples (customer dict, address dict)
+        :param articles: list of article dicts
+        :param first_id: int
+            The id of the first order of the batch minus one
+        :param ring_addresses: dict
+            decoded shipping addresses of the fraud rings by their JSON encoding
+        :return: list of dict
         """
-        p_benign = 1.0 - self._fraud_probability
-        return bool(np.random.choice([True, False], p=[self._fraud_probability, p_benign]))
+        if self._simple_mode:
+            return [{'billingAddress': address} for _, address in customers]
+
+        fields = self.__sample_order_batch(len(customers))
+        solvency_scores = fields['solvency_score']
+        iterations = fields['iteration']
+        open_amounts = fields['open_amount']
+        coupon_codes = fields['coupon_code']
+        labels = fields['label']
+        offsets = fields['offsets']
+        article_idcs = fields['articles']
+        prices = fields['prices']
+        shipping_addresses = fields['shipping_address']
+
+        orders, scores = list(), dict()
+        for i, (customer, address) in enumerate(customers):
+            begin, end = offsets[i], offsets[i + 1]
+            grand_total = 0.0
+            for price in prices[begin:end]:
+                grand_total += price
+            score = int(solvency_scores[i])
+            if score not in scores:
+                scores[score] = {'score': score}
+
+            orders.append({'billingAddress': address,
+                           'cartItems': [articles[j] for j in article_idcs[begin:end]],
+                           'couponCode': 'coupon_code' if coupon_codes[i] else '',
+                           'customer': customer,
+                           'grandTotal': '%.2f' % grand_total,
+                           'id': first_id + i + 1,
+                           'invoiceFraudLabel': labels[i],
+                           'iteration': iterations[i],
+                           'openAmount': '%.2f' % open_amounts[i],
+                           'shippingAddress': ring_addresses.get(shipping_addresses[i], address),
+                           'solvencyScore': scores[score]})
+        return orders
 
     @staticmethod
     def __read_marginal_distributions(distr_file):
@@ -374,3 +737,70 @@ class SampleDataGenerator(object):
             raise Exception(err_msg)
         self._customers_unique = unique_customers
 
+
+def _encode_customer(customer):
+    """
+    :param customer: Customer
+    :return: tuple (customer JSON, address JSON)
+    """
+    return (json.dumps(customer.json_encode(), sort_keys=True),
+            json.dumps(customer.get_address().json_encode(), sort_keys=True))
+
+
+def _customer_dicts(customer):
+    """
+    :param customer: Customer
+    :return: tuple (customer dict, address dict)
+    """
+    return customer.json_encode(), customer.get_address().json_encode()
+
+
+def _init_worker(generator):
+    """
+    store the generator in the worker process, such that it is
+    transferred once per worker instead of once per shard
+
+    :param generator: SampleDataGenerator
+    :return: None
+    """
+    global _generator
+    _generator = generator
+
+
+def _write_shard(task, generator=None):
+    """
+    write a shard of orders (or their filters) to a file
+
+    :param task: tuple (output file, begin, end, seed)
+    :param generator: SampleDataGenerator (default: the generator of the worker process)
+    :return: str, the output file
+    """
+    output, begin, end, seed = task
+    if generator is None:
+        generator = _generator
+    if generator.writes_filters:
+        generator.write_filters(output, [(begin, end, seed)])
+        return output
+    with open_file(output, 'w') as f:
+        generator.write_orders(f, begin, end, seed)
+    return output
+
+
+def _spawn_seeds(seed, num_children):
+    """
+    derive seeds of independent random streams from a seed (see
+    numpy.random.SeedSequence.spawn). For NumPy versions without
+    SeedSequence, the seeds are derived by hashing the seed and the
+    index of the stream.
+
+    :param seed: int or None
+    :param num_children: int
+    :return: list of np.ndarray (uint32)
+    """
+    if SeedSequence is not None:
+        return [child.generate_state(4) for child in SeedSequence(seed).spawn(num_children)]
+
+    if seed is None:
+        seed = int(os.urandom(16).encode('hex'), 16)
+    return [np.frombuffer(hashlib.sha256('{}:{}'.format(seed, i)).digest(), dtype=np.uint32)
+            for i in range(num_children)]
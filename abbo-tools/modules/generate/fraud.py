@@ -0,0 +1,86 @@
+import numpy as np
+
+"""
+fraud rings for the data generator: groups of fraudulent orders sharing
+drop shipping addresses, variants of the same name and articles
+"""
+
+# vowels replaced by name variants
+VOWELS = u'aeiou'
+
+
+class FraudRings(object):
+    """
+    the shipping addresses of ring i are addresses[i] (JSON encoded),
+    the articles ordered by ring i are articles[i] (article indices)
+    """
+
+    def __init__(self, addresses, articles):
+        self.addresses = addresses
+        self.articles = articles
+
+    def __len__(self):
+        return len(self.addresses)
+
+    def apply(self, random, fields):
+        """
+        assign the fraudulent orders of a batch (see
+        SampleDataGenerator.__sample_order_fields) to random rings,
+        i.e. replace their articles by articles of the ring and add
+        the JSON encoded shipping address of each order to the fields
+        ('shipping_address', None for legitimate orders)
+
+        :param random: np.random.RandomState
+        :param fields: dict of np.ndarray
+        :return: None
+        """
+        labels, offsets = fields['label'], fields['offsets']
+        num_orders, num_items = len(labels), offsets[-1]
+        rings = random.randint(0, len(self), num_orders)
+        address_idcs = random.random_sample(num_orders)
+        article_idcs = random.randint(0, self.articles.shape[1], num_items)
+
+        item_orders = np.repeat(np.arange(num_orders), np.diff(offsets))
+        fraud_items = labels[item_orders]
+        fields['articles'] = np.where(fraud_items, self.articles[rings[item_orders], article_idcs],
+                                      fields['articles'])
+
+        shipping_addresses = [None] * num_orders
+        for i in np.flatnonzero(labels).tolist():
+            addresses = self.addresses[rings[i]]
+            shipping_addresses[i] = addresses[int(address_idcs[i] * len(addresses))]
+        fields['shipping_address'] = shipping_addresses
+
+
+def name_variants(name, num_variants, random):
+    """
+    returns the name followed by up to num_variants - 1 distinct
+    variants of the name with a typo (swapped, missing, doubled or
+    replaced letter)
+
+    :param name: unicode
+    :param num_variants: int
+    :param random: np.random.RandomState
+    :return: list of unicode
+    """
+    variants = [name]
+    for _ in range(10 * num_variants):
+        if len(variants) >= num_variants or len(name) < 2:
+            break
+        i = random.randint(1, len(name))
+        operation = random.randint(4)
+        if operation == 0:
+            # the first letter is kept
+            if i + 1 >= len(name):
+                continue
+            variant = name[:i] + name[i + 1] + name[i] + name[i + 2:]
+        elif operation == 1:
+            variant = name[:i] + name[i + 1:]
+        elif operation == 2:
+            variant = name[:i] + name[i] + name[i:]
+        else:
+            vowel = VOWELS[random.randint(len(VOWELS))]
+            variant = name[:i] + (vowel.upper() if name[i].isupper() else vowel) + name[i + 1:]
+        if variant not in variants:
+            variants.append(variant)
+    return variants
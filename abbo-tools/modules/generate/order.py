@@ -2,6 +2,9 @@
 
 class Order(object):
 
+    __slots__ = ('__id', '__cart_items', 'customer', 'shipping_address', 'billing_address',
+                 'solvency_score', 'iteration', 'open_amount', 'coupon_code', 'label')
+
     def __init__(self, id, customer, shipping_address, billing_address,
                  solvency_score, iteration, open_amount, coupon_code, label):
         super(Order, self).__init__()
@@ -50,6 +53,8 @@ class Order(object):
 
 class SimpleOrder(Order):
 
+    __slots__ = ()
+
     def __init__(self, billing_address):
         super(Order, self).__init__()
         self.billing_address = billing_address
@@ -68,6 +73,8 @@ class SimpleOrder(Order):
 
 class Customer(object):
 
+    __slots__ = ('firstname', 'lastname', 'email', 'gender', 'address')
+
     def __init__(self, firstname, lastname, email, gender):
         self.firstname = firstname
         self.lastname = lastname
@@ -99,6 +106,8 @@ class Customer(object):
 
 class Article(object):
 
+    __slots__ = ('article_sku', 'price')
+
     def __init__(self, article_sku, price):
         self.article_sku = article_sku
         self.price = price
@@ -110,6 +119,8 @@ class Article(object):
 
 class Address(object):
 
+    __slots__ = ('firstname', 'lastname', 'street', 'zip_code', 'city')
+
     def __init__(self, firstname, lastname, street, zip_code, city=None):
         self.firstname = firstname
         self.lastname = lastname
@@ -0,0 +1,137 @@
+from csv import DictReader
+import numpy as np
+from modules.utils import cache
+
+"""
+sampling from the name distributions stored in CSV files ('name,frequency')
+with Walker's alias method. The alias table of a distribution is cached in
+a .npz file next to the CSV file, which is rebuilt when the CSV file changes
+(see utils.cache).
+"""
+
+
+class AliasSampler(object):
+    """
+    draws names with probabilities proportional to their frequencies
+    in constant time per draw: draw a column i uniformly and keep it
+    with probability prob[i], otherwise take its alias[i]
+    """
+
+    def __init__(self, names, prob, alias):
+        self.names = names
+        self.prob = prob
+        self.alias = alias
+
+    def __len__(self):
+        return len(self.names)
+
+    @classmethod
+    def from_frequencies(cls, names, frequencies):
+        """
+        build alias table of a distribution (Vose's algorithm)
+
+        :param names: list of unicode
+        :param frequencies: list of float
+        :return: AliasSampler
+        """
+        n = len(frequencies)
+        scaled = np.asarray(frequencies, dtype=np.float64)
+        scaled = scaled * n / scaled.sum()
+        prob = np.ones(n, dtype=np.float64)
+        alias = np.arange(n, dtype=np.int64)
+
+        small = np.flatnonzero(scaled < 1.0).tolist()
+        large = np.flatnonzero(scaled >= 1.0).tolist()
+        scaled = scaled.tolist()
+        while small and large:
+            s, l = small.pop(), large.pop()
+            prob[s], alias[s] = scaled[s], l
+            # the large column fills the remainder of the small one
+            scaled[l] -= 1.0 - scaled[s]
+            if scaled[l] < 1.0:
+                small.append(l)
+            else:
+                large.append(l)
+        # columns left over due to rounding errors are kept with probability 1
+        return cls(np.array(names, dtype=np.unicode_), prob, alias)
+
+    def sample_indices(self, random, size):
+        """
+        :param random: np.random.RandomState
+        :param size: int
+        :return: np.ndarray
+        """
+        idcs = random.randint(0, len(self), size)
+        return np.where(random.random_sample(size) < self.prob[idcs], idcs, self.alias[idcs])
+
+    def sample(self, random, size):
+        """
+        :param random: np.random.RandomState
+        :param size: int
+        :return: list of unicode
+        """
+        return self.names[self.sample_indices(random, size)].tolist()
+
+    def probabilities(self):
+        """
+        returns the probabilities of the names encoded by the table
+
+        :return: np.ndarray
+        """
+        p = self.prob / len(self)
+        p += np.bincount(self.alias, weights=(1.0 - self.prob) / len(self), minlength=len(self))
+        return p
+
+
+def load_sampler(frequency_file, use_cache=True):
+    """
+    load sampler of the names in a CSV file. If use_cache is True, the
+    alias table is read from the cache file of the CSV file, which is
+    created if it does not exist yet or if the CSV file has changed.
+
+    :param frequency_file: str
+    :param use_cache: bool
+    :return: AliasSampler
+    """
+    if not use_cache:
+        return _build_sampler(frequency_file)
+    return cache.load_cached(frequency_file, '.npz', _build_sampler, _load_sampler, _save_sampler)
+
+
+def read_frequencies(frequency_file):
+    """
+    read names and their respective frequencies from csv file
+
+    :param frequency_file: name of csv file
+    :return: list of names, list of frequencies
+    """
+    names, frequencies = list(), list()
+    with open(frequency_file, 'r') as f:
+        for row in DictReader(f):
+            names.append(row['name'].decode('utf-8'))
+            frequencies.append(float(row['frequency']))
+    return names, frequencies
+
+
+def get_cache_file(frequency_file):
+    """
+    returns name of the cache file of the current version
+    of a CSV file
+
+    :param frequency_file: str
+    :return: str
+    """
+    return cache.get_cache_file(frequency_file, '.npz')
+
+
+def _build_sampler(frequency_file):
+    return AliasSampler.from_frequencies(*read_frequencies(frequency_file))
+
+
+def _load_sampler(cache_file):
+    with np.load(cache_file) as d:
+        return AliasSampler(d['names'], d['prob'], d['alias'])
+
+
+def _save_sampler(f, sampler):
+    np.savez(f, names=sampler.names, prob=sampler.prob, alias=sampler.alias)
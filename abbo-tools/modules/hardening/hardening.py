@@ -2,6 +2,7 @@ from __future__ import print_function
 import sys
 import numpy as np
 from modules.pseudonymize.filter.bloom_factory import BloomFilter
+from modules.utils.file_io import open_file
 
 
 class HardeningModule(object):
@@ -13,6 +14,7 @@ class HardeningModule(object):
         self.__anon_level = 1
         self.__type = 'bloom'  # set filter type (bloom or count)
         self.__noise_level = 0  # noise level in percent
+        self.__fold_level = 0  # number of XOR-folds
         self.__merge_mode = 'train'
         self.__verbose = False
 
@@ -35,7 +37,8 @@ class HardeningModule(object):
         self.__output = output
 
     def set_filter_type(self, filter_type):
-        if filter_type != 'count':
+        # the filters are only read, hence keys are not needed
+        if filter_type not in ('count', 'keyedcount'):
             filter_type = 'murmur'
         self.__type = filter_type
 
@@ -44,6 +47,18 @@ class HardeningModule(object):
             raise ValueError("Noise level has to be in range [0, 100].")
         self.__noise_level = noise_level
 
+    def set_folding_level(self, fold_level):
+        """
+        fold filters fold_level times, i.e. the size of
+        the filters is reduced to m / 2^fold_level bits
+
+        :param fold_level: int
+        :return: None
+        """
+        if fold_level < 0:
+            raise ValueError("Folding level has to be non-negative.")
+        self.__fold_level = fold_level
+
     def set_merging_level(self, anon_level):
         self.__anon_level = anon_level if self.__anon_level > 0 else 1
         while (self.__chunk_size % self.__anon_level) != 0:
@@ -84,15 +99,21 @@ class HardeningModule(object):
         self.__verbose = verbose
 
     def run(self):
-        self.__empty_output_file()
-        for chunk in self.__filters():
-            if (self.__anon_level > 1) and (len(chunk) >= self.__anon_level):
-                chunk = self.__merge_filters(chunk)
+        if self.__fold_level > 0 and self.__type in ('count', 'keyedcount'):
+            raise ValueError("Folding is only supported for Bloom filters.")
+
+        with open_file(self.__output, 'w') as f:
+            for chunk in self.__filters():
+                if (self.__anon_level > 1) and (len(chunk) >= self.__anon_level):
+                    chunk = self.__merge_filters(chunk)
 
-            if self.__noise_level > 0:
-                chunk = self.__noise_filters(chunk)
+                if self.__fold_level > 0:
+                    chunk = self.__fold_filters(chunk)
 
-            self.__save_chunk(chunk)
+                if self.__noise_level > 0:
+                    chunk = self.__noise_filters(chunk)
+
+                self.__save_chunk(f, chunk)
 
     def __merge_filters(self, bflist):
         """
@@ -119,6 +140,11 @@ class HardeningModule(object):
         
         return anon_bfs
 
+    def __fold_filters(self, bflist):
+        for b in bflist:
+            b.fold(self.__fold_level)
+        return bflist
+
     def __noise_filters(self, bflist):
         noise_blooms = list()
         for b in bflist:
@@ -126,13 +152,12 @@ class HardeningModule(object):
             noise_blooms.append(b)
         return noise_blooms
 
-    def __save_chunk(self, bflist):
-        with open(self.__output, 'a') as f:
-            for b in bflist:
-                b.add_to_file(f)
+    def __save_chunk(self, f, bflist):
+        for b in bflist:
+            b.add_to_file(f)
 
     def __filters(self):
-        with open(self.__input, 'r') as f:
+        with open_file(self.__input, 'r') as f:
             chunk_list = list()
             chunk_positive = list()
             chunk_negative = list()
@@ -167,7 +192,3 @@ class HardeningModule(object):
                         yield chunk_list
                         chunk_list = list()
 
-    def __empty_output_file(self):
-        with open(self.__output, 'w'):
-            pass
-
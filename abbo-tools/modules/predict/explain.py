@@ -0,0 +1,153 @@
+import numpy as np
+import scipy.sparse as sp
+from modules.convert.formats import align_features
+from modules.utils.file_io import open_file
+
+"""
+explanation of the decisions of a linear model by scoring the
+elements (words, n-grams) of orders. The positions of the elements
+in the filters are given by the mapping file written during
+pseudonymization (see FeatureExtractor.set_mapping_file).
+"""
+
+# number of header lines of mapping files
+NUM_HEADER_LINES = 3
+
+
+class ElementMapping(object):
+    """
+    positions of elements in the filters stored as ragged array, i.e.
+    the positions of element i are positions[offsets[i]:offsets[i + 1]]
+    """
+
+    def __init__(self, elements, positions, offsets):
+        self.elements = elements
+        self.positions = positions
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.elements)
+
+    @classmethod
+    def read(cls, mapping_file):
+        """
+        read mapping file with lines 'element:[pos_1, pos_2, ...]'
+
+        :param mapping_file: str
+        :return: ElementMapping
+        """
+        elements, position_strs, lengths = list(), list(), list()
+        with open_file(mapping_file, 'rb') as f:
+            for i, line in enumerate(f):
+                if i < NUM_HEADER_LINES:
+                    continue
+                line = line.rstrip(b'\r\n')
+                if not line:
+                    continue
+                element, positions = line.rsplit(b':', 1)
+                positions = positions.strip(b'[] ')
+                elements.append(element)
+                lengths.append(positions.count(b',') + 1 if positions else 0)
+                if positions:
+                    position_strs.append(positions)
+
+        positions = np.fromstring(b','.join(position_strs).replace(b'L', b''), dtype=np.int64, sep=',')
+        offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        if offsets[-1] != len(positions):
+            raise ValueError("Could not parse positions in mapping file {}.".format(mapping_file))
+        return cls(elements, positions, offsets)
+
+    def scores(self, w):
+        """
+        returns the score of each element, i.e. the sum of the weights
+        at its positions. Positions unknown to the model are ignored.
+
+        :param w: np.ndarray
+        :return: np.ndarray
+        """
+        element_ids = np.repeat(np.arange(len(self)), np.diff(self.offsets))
+        known = self.positions < len(w)
+        return np.bincount(element_ids[known], weights=w[self.positions[known]], minlength=len(self))
+
+    def to_matrix(self):
+        """
+        returns inverted index from positions to elements as sparse
+        binary matrix with one row per element and one column per
+        position (duplicate positions of an element are merged)
+
+        :return: scipy.sparse.csr_matrix
+        """
+        num_features = int(self.positions.max()) + 1 if len(self.positions) else 0
+        M = sp.csr_matrix((np.ones(len(self.positions), dtype=np.int32), self.positions, self.offsets),
+                          shape=(len(self), num_features))
+        M.sum_duplicates()
+        M.data[:] = 1
+        return M
+
+
+class OrderExplainer(object):
+    """
+    explains the scores of single orders by the elements which are
+    contained in an order and contribute most to its score. An element
+    is considered as contained in an order if all of its positions are
+    set in the filter of the order. Its contribution is the sum of the
+    weights at its (distinct) positions.
+    """
+
+    def __init__(self, mapping, w):
+        self.elements = mapping.elements
+        self.__M = mapping.to_matrix()
+        self.__num_positions = np.diff(self.__M.indptr)
+
+        # weights at positions unknown to the model are zero
+        num_known = min(len(w), self.__M.shape[1])
+        w_aligned = np.zeros(self.__M.shape[1], dtype=np.float64)
+        w_aligned[:num_known] = w[:num_known]
+        self.__contributions = self.__M.dot(w_aligned)
+
+    def explain(self, X, k=None):
+        """
+        returns the k elements contributing most to the scores of
+        each order (all contained elements if k is None), ordered by
+        order and descending contribution
+
+        :param X: scipy.sparse.csr_matrix
+            The orders, one filter per row
+        :param k: int
+        :return: rows (np.ndarray), element ids (np.ndarray), contributions (np.ndarray)
+        """
+        X = align_features(sp.csr_matrix(X, dtype=np.int32, copy=True), self.__M.shape[1])
+        X.data[:] = X.data != 0
+
+        # number of positions of each element set in each order
+        H = X.dot(self.__M.T).tocoo()
+        contained = H.data == self.__num_positions[H.col]
+        rows, element_ids = H.row[contained], H.col[contained]
+        contributions = self.__contributions[element_ids]
+
+        order = np.lexsort((element_ids, -contributions, rows))
+        rows, element_ids, contributions = rows[order], element_ids[order], contributions[order]
+        if k is not None:
+            starts = np.searchsorted(rows, rows)
+            selected = np.arange(len(rows)) - starts < k
+            rows, element_ids, contributions = rows[selected], element_ids[selected], contributions[selected]
+        return rows, element_ids, contributions
+
+
+def top_k(scores, k=None):
+    """
+    returns the indices of the k highest scores in descending order
+    of the scores (all indices if k is None)
+
+    :param scores: np.ndarray
+    :param k: int
+    :return: np.ndarray
+    """
+    if k is None or k >= len(scores):
+        idcs = np.arange(len(scores))
+    elif k <= 0:
+        return np.zeros(0, dtype=np.intp)
+    else:
+        idcs = np.argpartition(-scores, k - 1)[:k]
+    return idcs[np.argsort(-scores[idcs], kind='mergesort')]
@@ -0,0 +1,135 @@
+import numpy as np
+
+"""
+evaluation metrics of a binary classifier accumulated in a single
+pass over batches of scores, such that the scores of arbitrarily
+large data sets do not need to be kept in memory
+"""
+
+# number of histogram bins of the scores used for the ROC-AUC
+NUM_BINS = 1 << 16
+# number of scores from which the scale of the scores is estimated
+SCALE_SAMPLE_SIZE = 1000
+# range of the log-transformed scores covered by the histograms
+LOG_RANGE = 50.0
+
+
+class MetricsAccumulator(object):
+    """
+    accumulates the confusion matrix at the decision threshold 0,
+    the number of orders scored above fixed thresholds and histograms
+    of the scores of positive and negative orders. Orders without
+    label (0) are ignored.
+
+    The scores s are mapped to sign(s) * log(1 + |s| / scale) before
+    binning, where the scale is the median absolute value of the first
+    SCALE_SAMPLE_SIZE scores. Hence, the bins are independent of the
+    scale of the scores and finest around the decision threshold. The
+    ROC-AUC is computed from the histograms, where pairs of orders in
+    the same bin count as ties.
+    """
+
+    def __init__(self, thresholds=(0.0,), num_bins=NUM_BINS):
+        self.__thresholds = np.unique(np.asarray(thresholds, dtype=np.float64))
+        self.__num_bins = num_bins
+        # counts of negative (row 0) and positive (row 1) orders
+        self.__histograms = np.zeros((2, num_bins), dtype=np.int64)
+        self.__above = np.zeros((2, len(self.__thresholds)), dtype=np.int64)
+        self.__confusion = np.zeros((2, 2), dtype=np.int64)
+        self.__scale = None
+        # scores and labels kept until the scale is known
+        self.__pending = list()
+        self.__num_pending = 0
+
+    def update(self, scores, labels):
+        """
+        add a batch of scores
+
+        :param scores: np.ndarray
+        :param labels: np.ndarray
+            The true labels (1, -1 or 0 if unknown)
+        :return: None
+        """
+        for c, label in enumerate((-1, 1)):
+            s = scores[labels == label]
+            # number of thresholds below each score
+            num_below = np.searchsorted(self.__thresholds, s, side='left')
+            counts = np.bincount(num_below, minlength=len(self.__thresholds) + 1)
+            self.__above[c] += np.cumsum(counts[1:][::-1])[::-1]
+            self.__confusion[c] += [np.sum(s <= 0), np.sum(s > 0)]
+
+        labeled = labels != 0
+        if self.__scale is not None:
+            self.__add_to_histograms(scores[labeled], labels[labeled])
+            return
+        self.__pending.append((np.array(scores[labeled], dtype=np.float64), labels[labeled]))
+        self.__num_pending += np.sum(labeled)
+        if self.__num_pending >= SCALE_SAMPLE_SIZE:
+            self.__set_scale()
+
+    def __set_scale(self):
+        """
+        estimate scale of the scores from the first scores (in the order
+        of the input, hence independent of the batch size) and add the
+        pending scores to the histograms
+        """
+        scores = np.concatenate([s for s, _ in self.__pending]) if self.__pending else np.zeros(0)
+        sample = np.abs(scores[:SCALE_SAMPLE_SIZE])
+        sample = sample[sample > 0]
+        self.__scale = float(np.median(sample)) if len(sample) > 0 else 1.0
+        for s, y in self.__pending:
+            self.__add_to_histograms(s, y)
+        self.__pending, self.__num_pending = list(), 0
+
+    def __add_to_histograms(self, scores, labels):
+        t = np.sign(scores) * np.log1p(np.abs(scores) / self.__scale)
+        bins = ((t / LOG_RANGE + 1.0) * 0.5 * self.__num_bins).astype(np.intp)
+        bins = np.clip(bins, 0, self.__num_bins - 1)
+        for c, label in enumerate((-1, 1)):
+            self.__histograms[c] += np.bincount(bins[labels == label], minlength=self.__num_bins)
+
+    def auc(self):
+        """
+        returns the area under the ROC curve (None if one of
+        the classes is missing)
+
+        :return: float or None
+        """
+        if self.__scale is None:
+            self.__set_scale()
+        negatives, positives = self.__histograms
+        num_negatives, num_positives = negatives.sum(), positives.sum()
+        if num_negatives == 0 or num_positives == 0:
+            return None
+        # negatives with lower scores than the positives of each bin
+        lower = np.cumsum(negatives) - negatives
+        pairs = np.sum(positives * (lower + 0.5 * negatives), dtype=np.float64)
+        return pairs / (float(num_negatives) * num_positives)
+
+    def to_dict(self):
+        """
+        returns all metrics as dict, e.g. for storing them as JSON
+
+        :return: dict
+        """
+        (tn, fp), (fn, tp) = self.__confusion.tolist()
+        num_negatives, num_positives = tn + fp, fn + tp
+        thresholds = list()
+        for t, (fp_t, tp_t) in zip(self.__thresholds.tolist(), self.__above.T.tolist()):
+            thresholds.append({'threshold': t,
+                               'true_positives': tp_t,
+                               'false_positives': fp_t,
+                               'precision': _ratio(tp_t, tp_t + fp_t),
+                               'recall': _ratio(tp_t, num_positives)})
+        return {'num_orders': num_negatives + num_positives,
+                'num_positive': num_positives,
+                'num_negative': num_negatives,
+                'accuracy': _ratio(tp + tn, num_negatives + num_positives),
+                'auc': self.auc(),
+                'confusion_matrix': {'true_positives': tp, 'false_positives': fp,
+                                     'true_negatives': tn, 'false_negatives': fn},
+                'thresholds': thresholds}
+
+
+def _ratio(a, b):
+    return float(a) / b if b > 0 else None
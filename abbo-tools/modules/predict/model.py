@@ -0,0 +1,156 @@
+import io
+import numpy as np
+from modules.utils import cache
+
+"""
+loading of linear models in LIBLINEAR format. The weights of a model
+are cached in a .npy file next to the model file, such that they can
+be memory-mapped instead of being parsed again (see utils.cache).
+"""
+
+
+class LinearModel(object):
+    """
+    linear model with weights w and intercept b. The weights are
+    oriented such that a positive score w^T x + b predicts label 1.
+    """
+
+    def __init__(self, w, intercept=0.0):
+        self.w = w
+        self.intercept = intercept
+
+    @property
+    def num_features(self):
+        return len(self.w)
+
+
+def load_liblinear_model(model_file, use_cache=True):
+    """
+    load LIBLINEAR model of a binary classifier. If use_cache is True, the weights are
+    read from the cache file of the model, which is created if it does
+    not exist yet or if the model file has changed.
+
+    :param model_file: str
+    :param use_cache: bool
+    :return: LinearModel
+    """
+    if not use_cache:
+        return _to_model(_parse_liblinear_model(model_file))
+    return _to_model(cache.load_cached(model_file, '.npy', _parse_liblinear_model,
+                                       lambda cache_file: np.load(cache_file, mmap_mode='r'), np.save))
+
+
+def stack_models(models):
+    """
+    stack several models into a single model with a weight matrix
+    (one column per model) and a vector of intercepts, such that all
+    models are scored by a single matrix multiplication. Models with
+    fewer features are padded with zero weights.
+
+    :param models: list of LinearModel objects
+    :return: LinearModel
+    """
+    num_features = max(model.num_features for model in models)
+    W = np.zeros((num_features, len(models)), dtype=np.float64)
+    for i, model in enumerate(models):
+        W[:model.num_features, i] = model.w
+    return LinearModel(W, np.array([model.intercept for model in models], dtype=np.float64))
+
+
+def write_liblinear_model(model_file, model, solver_type='L2R_L1LOSS_SVC_DUAL'):
+    """
+    write model in LIBLINEAR format. A non-zero intercept is stored
+    as weight of the bias feature (bias 1).
+
+    :param model_file: str
+    :param model: LinearModel
+    :param solver_type: str
+        LIBLINEAR solver with the same loss function as the model
+    :return: None
+    """
+    has_bias = model.intercept != 0.0
+    with open(model_file, 'w') as f:
+        f.write('solver_type {}\n'.format(solver_type))
+        f.write('nr_class 2\n')
+        f.write('label 1 -1\n')
+        f.write('nr_feature {}\n'.format(model.num_features))
+        f.write('bias {}\n'.format(1 if has_bias else -1))
+        f.write('w\n')
+        weights = np.asarray(model.w, dtype=np.float64).tolist()
+        if has_bias:
+            weights.append(float(model.intercept))
+        f.write(''.join(['{!r} \n'.format(v) for v in weights]))
+
+
+def get_cache_file(model_file):
+    """
+    returns name of the cache file of the current version
+    of a model
+
+    :param model_file: str
+    :return: str
+    """
+    return cache.get_cache_file(model_file, '.npy')
+
+
+def read_liblinear_header(f):
+    """
+    read header of a LIBLINEAR model up to the line 'w'
+
+    :param f: file object
+    :return: dict
+    """
+    header = dict()
+    for line in f:
+        fields = line.split()
+        if not fields:
+            continue
+        if fields[0] == b'w':
+            break
+        header[fields[0].decode('ascii')] = fields[1:]
+    else:
+        raise ValueError("Model file contains no weights.")
+
+    for key in ('nr_class', 'nr_feature', 'bias', 'label'):
+        if key not in header:
+            raise ValueError("Model file has no '{}' in its header.".format(key))
+    return header
+
+
+def _parse_liblinear_model(model_file):
+    """
+    parse LIBLINEAR model. Returns the weights of the model followed
+    by the intercept, oriented such that positive scores predict
+    label 1.
+
+    :param model_file: str
+    :return: np.ndarray
+    """
+    with io.open(model_file, 'rb') as f:
+        header = read_liblinear_header(f)
+        values = np.fromstring(f.read(), dtype=np.float64, sep=' ')
+
+    nr_class = int(header['nr_class'][0])
+    nr_feature = int(header['nr_feature'][0])
+    bias = float(header['bias'][0])
+    labels = [int(l) for l in header['label']]
+    if nr_class != 2 or len(labels) != 2:
+        raise ValueError("Only binary models are supported (nr_class is {}).".format(nr_class))
+
+    num_weights = nr_feature + (1 if bias >= 0 else 0)
+    if len(values) != num_weights:
+        raise ValueError("Model has {} weights, expected {}.".format(len(values), num_weights))
+
+    # LIBLINEAR predicts the first label for positive decision values
+    if labels[0] != 1:
+        values = -values
+
+    weights = np.zeros(nr_feature + 1, dtype=np.float64)
+    weights[:nr_feature] = values[:nr_feature]
+    if bias >= 0:
+        weights[nr_feature] = bias * values[nr_feature]
+    return weights
+
+
+def _to_model(weights):
+    return LinearModel(weights[:-1], float(weights[-1]))
@@ -1,38 +1,103 @@
+from __future__ import print_function
+import io
 import os
-import string
-import scipy.sparse as sp
+import sys
+import itertools
 import numpy as np
-from sklearn.datasets import load_svmlight_file
+import scipy.sparse as sp
+import simplejson
+from modules.convert.formats import read_sparse_matrix_batches, align_features
+from modules.pseudonymize.filter.filter_batch import FilterBatch, read_filter_batches
+from modules.pseudonymize.filter.filter_store import is_filter_store
+from modules.pseudonymize.feature_extractor import FeatureExtractor
+from modules.predict.scorer import FilterScorer
+from modules.predict.model import load_liblinear_model, stack_models
+from modules.predict.explain import ElementMapping, OrderExplainer, top_k
+from modules.predict.metrics import MetricsAccumulator
+from modules.utils.file_io import open_file, strip_compression
 
 
 class PredictionModule(object):
 
     def __init__(self):
-        self.__model_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data/toy.model')
+        self.__model_files = [os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data/toy.model')]
         self.__input_file = None
         self.__output_file = None
         self.__mapping_file = None
         self.__explaination_file = None
+        self.__batch_size = 10000
+        self.__filter_type = None  # detect filter type
+        self.__use_cache = True
+        self.__top_k = None
+        self.__order_mapping_file = None
+        self.__order_explaination_file = None
+        self.__threshold = 0.0
+        self.__metric_thresholds = [0.0]
+        self.__feature_extractor = None
 
     def run(self):
         """
         output prediction scores for pseudonymized orders
         in a given file. File has to be in LIBSVM format
-        (one order per line).
+        (one order per line), a sparse matrix in npz format
+        or a file containing filters (Base64 encoded or
+        binary filter store). Orders in JSON format are
+        scored without creating filters.
+        The orders are scored in batches, hence the file does
+        not need to fit into memory. Several models are scored
+        at once with a single pass over the file. Evaluation
+        metrics are written to <output>_metrics.json.
 
-        :param input_file: file in LIBSVM format
         :return: None
         """
-        w = self.__load_liblinear_model()
-        X, y = self.__load_data()
-        pred_scores, pred_labels, results = self.__predict_fraud(w, X, y)
-        self.__output_results(pred_scores, pred_labels, results)
+        models = [load_liblinear_model(model_file, self.__use_cache) for model_file in self.__model_files]
+        model = models[0] if len(models) == 1 else stack_models(models)
+        # explainations refer to the first model
+        w = models[0].w
+        num_correct, num_total = 0, 0
+        metrics = [MetricsAccumulator(self.__metric_thresholds) for _ in models]
+
+        outfile, order_explainer, order_file = None, None, None
+        if self.__output_file is not None:
+            outfile = open_file(self.__output_file, 'w')
+            outfile.write(','.join(_result_columns(len(models))) + '\n')
+        if self.__order_explaination_file is not None:
+            order_explainer = OrderExplainer(ElementMapping.read(self.__order_mapping_file), w)
+            order_file = open_file(self.__order_explaination_file, 'wb')
+            order_file.write(b'order,score,item,contribution\n')
+
+        try:
+            for pred_scores, y, data in self.__score_batches(model.w):
+                pred_scores += model.intercept
+                pred_labels, results = self.__predict_fraud(pred_scores, y)
+                if outfile is not None:
+                    self.__write_results(outfile, pred_scores, pred_labels)
+                if order_explainer is not None:
+                    scores = pred_scores if pred_scores.ndim == 1 else pred_scores[:, 0]
+                    flagged = np.flatnonzero(scores > self.__threshold)
+                    explainations = order_explainer.explain(_select_rows(data, flagged), self.__top_k)
+                    self.__write_order_explainations(order_file, order_explainer.elements, explainations,
+                                                     flagged + num_total, scores[flagged])
+                for i, accumulator in enumerate(metrics):
+                    accumulator.update(pred_scores if pred_scores.ndim == 1 else pred_scores[:, i], y)
+                num_correct += np.sum(results, axis=0)
+                num_total += len(results)
+        finally:
+            if outfile is not None:
+                outfile.close()
+            if order_file is not None:
+                order_file.close()
+
+        self.__output_results(num_correct, num_total)
+        if self.__output_file is not None:
+            self.__write_metrics(metrics)
         if self.__explaination_file:
             self.__get_explainations(w)
 
     def set_input(self, input_file):
         """
-        Set file containing data set in LIBSVM format
+        Set file containing data set in LIBSVM or npz format
+        or filters
 
         :param input_file: str
         :return: None
@@ -57,7 +122,19 @@ class PredictionModule(object):
         :return: None
         """
         if model_file is not None:
-            self.__model_file = os.path.abspath(model_file)
+            self.set_models([model_file])
+
+    def set_models(self, model_files):
+        """
+        Set several custom LIBLINEAR models which are scored side by
+        side. The output file contains one score column per model.
+        Explainations refer to the first model.
+
+        :param model_files: list of str
+        :return: None
+        """
+        if model_files:
+            self.__model_files = [os.path.abspath(model_file) for model_file in model_files]
 
     def set_explaination_files(self, mapping_file, explaination_file):
         """
@@ -72,89 +149,336 @@ class PredictionModule(object):
         self.__mapping_file = os.path.abspath(mapping_file)
         self.__explaination_file = os.path.abspath(explaination_file)
 
-    def __load_liblinear_model(self):
+    def set_order_explaination_files(self, mapping_file, explaination_file):
+        """
+        Set files for deriving explainations for the decisions
+        of the classifier for single orders, i.e. the patterns
+        contained in an order which contributed most to its score.
+
+        :param mapping_file: str
+            File containing mapping between elements to positions in Bloom filter
+        :param explaination_file: str
+            File to store most relevant elements for each order
+        :return: None
+        """
+        self.__order_mapping_file = os.path.abspath(mapping_file)
+        self.__order_explaination_file = os.path.abspath(explaination_file)
+
+    def set_threshold(self, threshold):
+        """
+        explain decisions for orders with a score above 'threshold'
+
+        :param threshold: float
+        :return: None
+        """
+        self.__threshold = threshold
+
+    def set_metric_thresholds(self, thresholds):
+        """
+        set thresholds on the scores for which precision and
+        recall are computed (default: 0.0)
+
+        :param thresholds: list of float
+        :return: None
+        """
+        self.__metric_thresholds = thresholds
+
+    def set_top_k(self, top_k):
+        """
+        only output the 'top_k' patterns mostly indicative for
+        fraud (all patterns if None). For explainations of
+        single orders, this is the number of patterns per order.
+
+        :param top_k: int or None
+        :return: None
+        """
+        self.__top_k = top_k
+
+    def set_feature_extractor(self, feature_extractor):
         """
-        load liblinear model and store it
-        in Scipy sparse matrix
+        set feature extractor for scoring orders in JSON format. It
+        has to be configured as for pseudonymizing the training data
+        of the model.
 
-        :return: scipy.sparse.csr_matrix
+        :param feature_extractor: FeatureExtractor
+        :return: None
+        """
+        self.__feature_extractor = feature_extractor
+
+    def set_batch_size(self, batch_size):
+        """
+        orders are scored in batches of 'batch_size' orders
+
+        :param batch_size: int
+        :return: None
+        """
+        self.__batch_size = batch_size
+
+    def set_model_cache(self, use_cache):
+        """
+        cache weights of the model in a .npy file next to
+        the model file (see load_liblinear_model)
+
+        :param use_cache: bool
+        :return: None
         """
-        with open(self.__model_file, 'rb') as model:
-            w = map(float, map(string.strip, model.readlines()[6:]))
-        return sp.csr_matrix(w)
+        self.__use_cache = use_cache
+
+    def set_filter_type(self, filter_type):
+        """
+        set type of the filters if the input file contains filters
+        (detected if None)
+
+        :param filter_type: str ('murmur', 'keyed', 'count', 'keyedcount') or None
+        :return: None
+        """
+        self.__filter_type = filter_type
+
+    def __score_batches(self, w):
+        """
+        compute scores of the orders in the input file in batches.
+        Filters are scored directly without converting them to
+        LIBSVM format (see FilterScorer).
+
+        :param w: np.ndarray
+            The weights, one column per model for several models
+        :return: generator of tuples (scores (np.ndarray), labels (np.ndarray),
+                 data (FilterBatch or scipy.sparse.csr_matrix))
+        """
+        if _contains_orders(self.__input_file):
+            # as for LIBSVM files, but without creating filters
+            for X, y in self.__read_order_batches():
+                yield align_features(X, len(w)).dot(w), y, X
+        elif _contains_filters(self.__input_file):
+            counting = None
+            if self.__filter_type is not None:
+                counting = self.__filter_type in ('count', 'keyedcount')
+            scorer = FilterScorer(w)
+            for batch in read_filter_batches(self.__input_file, counting, self.__batch_size):
+                yield scorer.score(batch), batch.labels, batch
+        else:
+            # the number of features is aligned to the dimension of the
+            # model, since the highest index set in the data (e.g. of
+            # folded filters) may be smaller. As in LIBLINEAR, features
+            # unknown to the model are ignored.
+            for X, y in self.__load_data():
+                yield align_features(X, len(w)).dot(w), y, X
 
     def __load_data(self):
-        data = load_svmlight_file(self.__input_file)
-        return data[0], data[1]
+        """
+        load data set in LIBSVM format or as sparse matrix in npz
+        format (see 'abbo_cli convert --format npz') in batches.
 
-    def __predict_fraud(self, w, X, y):
+        :return: generator of tuples (scipy.sparse.csr_matrix, np.ndarray)
         """
-        Predict scores and labels for a given data
-        X using a classification model w. Comparison
-        with ground truth labels y.
+        if self.__input_file.endswith('.npz'):
+            return read_sparse_matrix_batches(self.__input_file, self.__batch_size)
+        return self.__read_libsvm_batches()
 
-        :param w: scipy.sparse.csr.csr_matrix
-            The linear SVM model
-        :param X: scipy.sparse.csr.csr_matrix
-            The dataset vectors
+    def __read_libsvm_batches(self):
+        # scikit-learn is slow to import and only needed for LIBSVM files
+        from sklearn.datasets import load_svmlight_file
+        with open_file(self.__input_file, 'rb') as f:
+            while True:
+                lines = list(itertools.islice(f, self.__batch_size))
+                if not lines:
+                    break
+                yield load_svmlight_file(io.BytesIO(b''.join(lines)), zero_based=False)
+
+    def __read_order_batches(self):
+        """
+        read orders in JSON format in batches and compute the non-zero
+        entries of their filters (see FeatureExtractor.get_positions).
+        Orders which cannot be pseudonymized are skipped.
+
+        :return: generator of tuples (scipy.sparse.csr_matrix, np.ndarray)
+        """
+        feature_extractor = self.__feature_extractor or FeatureExtractor()
+        num_features = feature_extractor.num_features
+        with open_file(self.__input_file, 'rb') as f:
+            for i, lines in enumerate(iter(lambda: list(itertools.islice(f, self.__batch_size)), [])):
+                labels, positions, values = list(), list(), list()
+                for j, line in enumerate(lines):
+                    try:
+                        order = simplejson.loads(line, encoding='utf-8')
+                        label = feature_extractor.get_label(order)
+                        order_positions, order_values = feature_extractor.get_positions(order)
+                    except Exception as e:
+                        print("An error occured while pseudonymizing order in line {}: {}".format(
+                            i * self.__batch_size + j + 1, e), file=sys.stderr)
+                        continue
+                    labels.append(label)
+                    positions.append(order_positions)
+                    values.append(order_values)
+
+                indptr = np.zeros(len(positions) + 1, dtype=np.int64)
+                np.cumsum([len(p) for p in positions], out=indptr[1:])
+                X = sp.csr_matrix((np.concatenate(values or [np.zeros(0)]),
+                                   np.concatenate(positions or [np.zeros(0, dtype=np.int64)]), indptr),
+                                  shape=(len(positions), num_features))
+                yield X, np.array(labels, dtype=np.float64)
+
+    def __predict_fraud(self, scores, y):
+        """
+        Predict labels for given scores of the
+        classification model. Comparison with
+        ground truth labels y.
+
+        :param scores: np.ndarray
+            The scores of the linear SVM model
+            (one column per model)
         :param y: numpy.ndarray
             The dataset labels
-        :return: scores (scipy sparse matrix),
-                 predicted labels (np.ndarray),
+        :return: predicted labels (np.ndarray),
                  detection results (np.ndarray)
 
         """
-        scores = w * X.T
-
         # calc labels
-        pred_y = -1.0 * np.ones(y.shape)
-        idcs = sp.find(scores > 0)[1]
-        pred_y[idcs] = 1.0
+        pred_y = np.where(scores > 0, 1.0, -1.0)
+        results = (pred_y == (y if scores.ndim == 1 else y[:, np.newaxis]))
 
-        results = (pred_y == y)
+        return pred_y, results
 
-        return scores, pred_y, results
+    def __write_results(self, f, pred_scores, pred_labels):
+        """
+        Write prediction results of a batch with a single write
 
-    def __output_results(self, pred_scores, pred_labels, results):
+        :param f: file object
+        :param pred_scores: np.ndarray
+        :param pred_labels: np.ndarray
+        :return: None
+        """
+        if pred_scores.ndim == 1:
+            pred_scores, pred_labels = pred_scores[:, np.newaxis], pred_labels[:, np.newaxis]
+        # label and score of each model (see _result_columns)
+        f.write(''.join([','.join(['{},{}'.format(label, score) for label, score in zip(labels, scores)]) + '\n'
+                         for labels, scores in zip(pred_labels.tolist(), pred_scores.tolist())]))
+
+    def __write_order_explainations(self, f, elements, explainations, orders, scores):
+        """
+        Write patterns contributing most to the scores of a
+        batch of orders with a single write
+
+        :param f: file object
+        :param elements: list of str
+        :param explainations: tuple (rows, element ids, contributions)
+            see OrderExplainer.explain
+        :param orders: np.ndarray
+            The indices of the orders in the input file
+        :param scores: np.ndarray
+        :return: None
+        """
+        rows, element_ids, contributions = explainations
+        f.write(b''.join([b'{},{},{},{}\n'.format(order, score, elements[element_id], contribution)
+                          for order, score, element_id, contribution
+                          in zip(orders[rows].tolist(), scores[rows].tolist(),
+                                 element_ids.tolist(), contributions.tolist())]))
+
+    def __output_results(self, num_correct, num_total):
         """
         Output prediction results
 
-        :param pred_scores:
-        :param pred_labels:
-        :param results: np.ndarray
+        :param num_correct: int or np.ndarray (one entry per model)
+        :param num_total: int
         :return: None
         """
-        accuracy = len(np.where(results == True)[0]) * 100.0 / len(results)
-        print("Accuracy = {}%".format(accuracy))
+        accuracy = np.asarray(num_correct) * 100.0 / max(num_total, 1)
+        if len(self.__model_files) == 1:
+            print("Accuracy = {}%".format(float(accuracy)))
+            return
+        for i, model_file in enumerate(self.__model_files):
+            print("Accuracy of model {} ({}) = {}%".format(i + 1, os.path.basename(model_file), accuracy[i]))
 
-        # write detailed results into output file if provided
-        if self.__output_file is not None:
-            with open(self.__output_file, 'w') as f:
-                f.write('label,score\n')
-                for i in range(len(pred_labels)):
-                    f.write('{},{}\n'.format(pred_labels[i], pred_scores[0, i]))
+    def __write_metrics(self, metrics):
+        """
+        Write evaluation metrics of each model to a JSON file
+        next to the output file
+
+        :param metrics: list of MetricsAccumulator objects
+        :return: None
+        """
+        results = list()
+        for model_file, accumulator in zip(self.__model_files, metrics):
+            result = accumulator.to_dict()
+            result['model'] = model_file
+            results.append(result)
+
+        root = os.path.splitext(strip_compression(self.__output_file))[0]
+        with open('{}_metrics.json'.format(root), 'w') as f:
+            simplejson.dump(results[0] if len(results) == 1 else results, f, indent=2, sort_keys=True)
 
     def __get_explainations(self, w):
         """
         Extract patterns mostly indicative for fraud
 
-        :param w: scipy.sparse.csr.csr_matrix
+        :param w: np.ndarray
             The linear SVM model
         :return: None
             Results are written to explainability files
         """
-        item2score = dict()
-        with open(self.__mapping_file, 'r') as fin:
-            for line in fin.readlines()[3:]:
-                item, hashes = line.strip().split(':')
-                score = 0.0
-                for hash in map(int, map(long, hashes[1:-1].split(','))):
-                    score += w[0, hash]
-                item2score[item] = score
+        mapping = ElementMapping.read(self.__mapping_file)
+        scores = mapping.scores(w)
+        score_list = scores.tolist()
+
+        with open_file(self.__explaination_file, 'wb') as fout:
+            fout.write(b'item,score\n')
+            fout.write(b''.join([b'{},{}\n'.format(mapping.elements[i], score_list[i])
+                                 for i in top_k(scores, self.__top_k)]))
+
+
+def _contains_orders(filename):
+    """
+    checks whether a file contains orders in JSON format
+
+    :param filename: str
+    :return: bool
+    """
+    if filename.endswith('.npz') or is_filter_store(filename):
+        return False
+    with open_file(filename, 'rb') as f:
+        return f.readline().lstrip().startswith(b'{')
+
+
+def _contains_filters(filename):
+    """
+    checks whether a file contains filters, i.e. is a binary filter
+    store or contains Base64 encoded filters ('label\tfilter') instead
+    of orders in LIBSVM format ('label index:value ...')
+
+    :param filename: str
+    :return: bool
+    """
+    if filename.endswith('.npz'):
+        return False
+    if is_filter_store(filename):
+        return True
+    with open_file(filename, 'rb') as f:
+        return b'\t' in f.readline()
+
+
+def _select_rows(data, rows):
+    """
+    select rows of a batch of orders
+
+    :param data: FilterBatch or scipy.sparse.csr_matrix
+    :param rows: np.ndarray
+    :return: scipy.sparse.csr_matrix
+    """
+    if isinstance(data, FilterBatch):
+        return FilterBatch(data.labels[rows], data.data[rows], data.counting).to_csr()
+    return data[rows]
 
-        with open(self.__explaination_file, 'w') as fout:
-            fout.write('item,score\n')
-            for k, v in sorted(item2score.items(), key=lambda x: x[1], reverse=True):
-                fout.write('{},{}\n'.format(k, v))
 
+def _result_columns(num_models):
+    """
+    returns the columns of the output file: label and score of the
+    first model, followed by label and score of each further model,
+    e.g. label,score,label_2,score_2 for two models
 
+    :param num_models: int
+    :return: list of str
+    """
+    columns = ['label', 'score']
+    for i in range(2, num_models + 1):
+        columns += ['label_{}'.format(i), 'score_{}'.format(i)]
+    return columns
@@ -0,0 +1,78 @@
+import numpy as np
+from modules.pseudonymize.filter.filter_batch import BIT_TABLE
+
+"""
+scoring of filters with a linear model without converting
+them to LIBSVM format first
+"""
+
+
+class FilterScorer(object):
+    """
+    computes the scores w^T x of batches of filters. For Bloom
+    filters, the weights of each byte position are precomputed for
+    all 256 byte values, such that the score of a packed filter is
+    the sum of one table lookup per byte. Count-Min sketches are
+    scored by a dense dot product of the counters and the weights.
+    As in LIBLINEAR, positions unknown to the model are ignored.
+
+    Several models are scored at once if w is a matrix with one
+    column per model.
+    """
+
+    def __init__(self, w):
+        self.__w = w
+        self.__tables = dict()
+
+    def score(self, batch):
+        """
+        returns the scores of a batch of filters
+
+        :param batch: FilterBatch
+        :return: np.ndarray
+            The scores, one column per model if w is a matrix
+        """
+        w = self.__aligned_weights(batch.num_features)
+        if batch.counting:
+            return batch.data.dot(w)
+
+        num_bytes = batch.data.shape[1]
+        table = self.__lookup_table(num_bytes)
+        idcs = batch.data + 256 * np.arange(num_bytes, dtype=np.intp)
+        if table.ndim == 1:
+            return np.take(table, idcs).sum(axis=1)
+        # the indices are shared by all models, while the lookups are
+        # done per model to keep the memory of a batch independent of
+        # the number of models
+        scores = np.empty((len(idcs), table.shape[1]), dtype=table.dtype)
+        for i in range(table.shape[1]):
+            scores[:, i] = np.take(table[:, i], idcs).sum(axis=1)
+        return scores
+
+    def __aligned_weights(self, num_features):
+        """
+        truncate or pad weights with zeros to num_features entries
+
+        :param num_features: int
+        :return: np.ndarray
+        """
+        w = self.__w[:num_features]
+        if len(w) < num_features:
+            w = np.concatenate([w, np.zeros((num_features - len(w),) + w.shape[1:], dtype=w.dtype)])
+        return w
+
+    def __lookup_table(self, num_bytes):
+        """
+        returns flattened table with the partial sums of the weights
+        of byte j for value v at index 256 * j + v (one column per
+        model if w is a matrix)
+
+        :param num_bytes: int
+        :return: np.ndarray
+        """
+        if num_bytes not in self.__tables:
+            w = self.__aligned_weights(8 * num_bytes)
+            w = w.reshape((num_bytes, 8) + w.shape[1:])
+            table = np.tensordot(BIT_TABLE.astype(w.dtype), w, axes=([1], [1]))
+            self.__tables[num_bytes] = np.swapaxes(table, 0, 1).reshape((256 * num_bytes,) + w.shape[2:])
+        return self.__tables[num_bytes]
@@ -5,14 +5,30 @@ import simplejson
 import itertools
 import urllib2
 from filter.bloom_factory import BloomFilter
+from filter.filter_batch import FilterBatch, TextFilterWriter
+from filter.filter_store import FilterStoreWriter
+from modules.utils.file_io import open_file
 import sys
 import logging
+import numpy as np
 
 """
 read relevant features from given orders in JSON format
 and store them in bloom filters
 """
 
+# labels of orders as stored in filters
+LABELS = {True: 1,
+          False: -1,
+          None: 0}
+
+# writers of the filter formats created by write_filters
+FILTER_WRITERS = {'text': TextFilterWriter,
+                  'binary': FilterStoreWriter}
+
+# maximal number of entries of the position cache of write_filters
+MAX_CACHE_SIZE = 1 << 20
+
 
 class FeatureExtractor(object):
 
@@ -42,6 +58,7 @@ class FeatureExtractor(object):
         self.__hash_num = 3
         self.__mapping_file = None
         self.__logger = None
+        self.__hasher = None
 
     def set_input(self, input):
         """
@@ -69,6 +86,7 @@ class FeatureExtractor(object):
         :return: None
         """
         self.__bloom_filter_size = size
+        self.__hasher = None
 
     def set_bloomfilter_type(self, bloom_filter_type):
         """
@@ -78,6 +96,7 @@ class FeatureExtractor(object):
         :return: None
         """
         self.__bloom_filter_type = bloom_filter_type
+        self.__hasher = None
 
     def set_encryption_key(self, encryption_key):
         """
@@ -87,6 +106,7 @@ class FeatureExtractor(object):
         :return: None
         """
         self.__encryption_key = encryption_key
+        self.__hasher = None
 
     def set_decomposition_type(self, decomposition_type):
         """
@@ -114,6 +134,7 @@ class FeatureExtractor(object):
         :return: None
         """
         self.__hash_num = hash_num
+        self.__hasher = None
 
     def set_bin_sizes(self, bin_sizes):
         """
@@ -144,31 +165,14 @@ class FeatureExtractor(object):
         self._pseudonymize()
 
     def _pseudonymize(self):
-        outfile = open(self.__output, 'w')
-        with open(self.__input, 'r') as in_file:
+        outfile = open_file(self.__output, 'w')
+        with open_file(self.__input, 'r') as in_file:
             mapping = dict()
-            i, num_lines = 1, sum(1 for line in open(self.__input, 'r'))
+            i = 1
             for line in in_file:
                 try:
                     order = simplejson.loads(line, encoding='utf-8')
-                    feat_str = self._json_to_str(order).strip()
-
-                    if self.__logger is not None:
-                        self.__logger.debug(feat_str)
-
-                    # create bloom filter
-                    b = BloomFilter.factory(self.__bloom_filter_type,
-                                            self.__bloom_filter_size,
-                                            self.__encryption_key)
-                    b.set_num_hash_functions(self.__hash_num)
-                    for word in re.split(" ", feat_str):
-                        hashes = b.add(word)
-
-                        if self.__mapping_file:
-                            if word not in mapping:
-                                mapping[word] = hashes
-
-                    b.set_label(order.get('invoiceFraudLabel'))
+                    b = self.create_filter(order, mapping if self.__mapping_file else None)
                     b.add_to_file(outfile)
                 except Exception as e:
                     outfile.write("NOT AVAILABLE\n")
@@ -179,8 +183,222 @@ class FeatureExtractor(object):
         if self.__mapping_file:
             self.__save_mapping(mapping)
 
+    def create_filter(self, order, mapping=None):
+        """
+        create filter for a single order using the current configuration
+
+        :param order: dict
+            order in JSON format
+        :param mapping: dict or None
+            if given, the hash positions of new elements are added
+        :return: AbstractFilter
+        """
+        feat_str = self._json_to_str(order).strip()
+
+        if self.__logger is not None:
+            self.__logger.debug(feat_str)
+
+        # create bloom filter
+        b = BloomFilter.factory(self.__bloom_filter_type,
+                                self.__bloom_filter_size,
+                                self.__encryption_key)
+        b.set_num_hash_functions(self.__hash_num)
+        words = re.split(" ", feat_str)
+        if mapping is None:
+            b.add_all(words)
+        else:
+            for word in words:
+                hashes = b.add(word)
+                if word not in mapping:
+                    mapping[word] = hashes
+
+        b.set_label(order.get('invoiceFraudLabel'))
+        return b
+
+    def get_positions(self, order):
+        """
+        returns the non-zero positions of the filter of an order and
+        their values without creating the filter, i.e. the union of
+        the hash positions of its elements (with the number of
+        increments for Count-Min sketches)
+
+        :param order: dict
+            order in JSON format
+        :return: positions (np.ndarray, sorted), values (np.ndarray)
+        """
+        words = re.split(" ", self._json_to_str(order).strip())
+        positions = self.__get_hasher().get_positions_all(words).ravel()
+        if self.counting:
+            positions, counts = np.unique(positions, return_counts=True)
+            return positions, counts.astype(np.float64)
+        positions = np.unique(positions)
+        return positions, np.ones(len(positions), dtype=np.float64)
+
+    def create_filter_batch(self, orders, cache=None):
+        """
+        create the filters of several orders at once without creating
+        filter objects. The hash positions are computed per field of an
+        order (per item for cart items) and stored in 'cache', such that
+        fields shared by several orders, e.g. customers and addresses,
+        are decomposed and hashed only once. The filters are identical
+        to those created by create_filter. Orders are decomposed as a
+        whole for the 'ngrams' decomposition, whose n-grams span several
+        fields, hence only the positions of the n-grams are cached.
+
+        :param orders: list of dict
+            orders in JSON format. Dicts within orders are cached by
+            their id, hence they must not be modified afterwards.
+        :param cache: dict or None
+            positions of fields, which can be shared by several calls
+        :return: FilterBatch
+        """
+        if cache is None:
+            cache = dict()
+        parts, rows = list(), list()
+        for i, order in enumerate(orders):
+            order_parts = self.__get_field_positions(order, cache)
+            parts.extend(order_parts)
+            rows.extend([i] * len(order_parts))
+
+        lengths = [len(p) for p in parts]
+        positions = np.concatenate(parts) if parts else np.zeros(0, dtype=np.int64)
+        labels = np.array([self.get_label(order) for order in orders], dtype=np.int64)
+        return FilterBatch.from_positions(labels, np.repeat(np.array(rows, dtype=np.int64), lengths),
+                                          positions, self.num_features, self.counting)
+
+    def write_filters(self, orders, output, filter_format='text', batch_size=1000):
+        """
+        create the filters of orders, e.g. yielded by the data
+        generator, and write them to a file in batches without
+        encoding the orders in JSON format first
+
+        :param orders: iterable of dict
+        :param output: str
+        :param filter_format: str ('text': Base64 encoded, 'binary': binary filter store)
+        :param batch_size: int
+        :return: None
+        """
+        writer = FILTER_WRITERS[filter_format](output)
+        try:
+            cache = dict()
+            orders = iter(orders)
+            while True:
+                batch = list(itertools.islice(orders, batch_size))
+                if not batch:
+                    break
+                if len(cache) > MAX_CACHE_SIZE:
+                    cache.clear()
+                writer.add_batch(self.create_filter_batch(batch, cache))
+        finally:
+            writer.close()
+
+    def __get_field_positions(self, order, cache):
+        """
+        returns the hash positions of the elements of each field of
+        an order (with repetitions)
+
+        :param order: dict
+        :param cache: dict
+        :return: list of np.ndarray
+        """
+        if self.__decomposition_type == 'ngrams':
+            return [self.__get_word_positions(self._json_to_str(order).strip(), cache)]
+
+        parts = list()
+        for field in self.__order_fields:
+            if field not in order:
+                continue
+            value = order[field]
+            # cart items are decomposed separately
+            entities = value if field == 'cartItems' and value else (value,)
+            for entity in entities:
+                entry = cache.get((field, id(entity)))
+                if entry is None:
+                    entry = (entity, self.__get_entity_positions(field, entity, entities is value, cache))
+                    if isinstance(entity, dict):
+                        # dicts are looked up by their id, since orders of the data
+                        # generator share them. The dict is kept alive by the cache,
+                        # such that its id is not reused.
+                        cache[(field, id(entity))] = entry
+                parts.append(entry[1])
+        return parts
+
+    def __get_entity_positions(self, field, entity, is_item, cache):
+        """
+        returns the hash positions of a field of an order
+
+        :param field: str
+        :param entity: field value or cart item
+        :param is_item: bool
+            whether the entity is a cart item
+        :param cache: dict
+        :return: np.ndarray
+        """
+        key = (field, _freeze(entity))
+        positions = cache.get(key)
+        if positions is None:
+            json_dict = {field: [entity] if is_item else entity}
+            positions = self.__get_word_positions(self._json_to_str(json_dict), cache)
+            cache[key] = positions
+        return positions
+
+    def __get_word_positions(self, feat_str, cache):
+        """
+        returns the hash positions of the elements of a decomposed
+        string, where the positions of each element are cached
+        """
+        words = re.split(" ", feat_str)
+        # the positions of new elements are computed at once
+        missing = [word for word in set(words) if word not in cache]
+        if missing:
+            cache.update(zip(missing, self.__get_hasher().get_positions_all(missing).tolist()))
+        positions = list()
+        for word in words:
+            positions.extend(cache[word])
+        return np.array(positions, dtype=np.int64)
+
+    @staticmethod
+    def get_label(order):
+        """
+        returns label of an order as stored in its filter
+
+        :param order: dict
+        :return: int
+        """
+        return LABELS[order.get('invoiceFraudLabel')]
+
+    @property
+    def num_features(self):
+        """
+        returns the number of bits (counters) of the filters
+
+        :return: int
+        """
+        return self.__get_hasher().size
+
+    def __get_hasher(self):
+        """
+        filter for computing hash positions, which is created
+        with the current configuration on first use
+        """
+        if self.__hasher is None:
+            self.__hasher = BloomFilter.factory(self.__bloom_filter_type,
+                                                self.__bloom_filter_size,
+                                                self.__encryption_key)
+            self.__hasher.set_num_hash_functions(self.__hash_num)
+        return self.__hasher
+
+    @property
+    def counting(self):
+        """
+        returns whether Count-Min sketches are created instead of Bloom filters
+
+        :return: bool
+        """
+        return self.__bloom_filter_type in ('count', 'keyedcount')
+
     def __save_mapping(self, mapping):
-        with open(self.__mapping_file, 'w') as fout:
+        with open_file(self.__mapping_file, 'w') as fout:
             fout.write('decomposition_type:{}\n'.format(self.__decomposition_type))
             fout.write('ngram_len:{}\n'.format(self.__ngram_len))
             fout.write('bin_sizes:{}\n'.format(self.__bin_sizes))
@@ -321,3 +539,22 @@ class FeatureExtractor(object):
         if logfile is not None:
             logging.basicConfig(filename=logfile, filemode='w', level=logging.DEBUG)
             self.__logger = logging.getLogger('feature_extractor')
+
+
+def _freeze(value):
+    """
+    returns hashable representation of a (JSON) value. Scalars are
+    kept with their type, since e.g. 1 and 1.0 are decomposed
+    differently. Nested values are represented by their JSON encoding.
+
+    :param value: dict, list or scalar
+    :return: hashable object
+    """
+    if isinstance(value, dict):
+        try:
+            return frozenset((k, type(v), v) for k, v in value.iteritems())
+        except TypeError:
+            return simplejson.dumps(value, sort_keys=True)
+    if isinstance(value, list):
+        return simplejson.dumps(value, sort_keys=True)
+    return type(value), value
@@ -4,7 +4,8 @@ import base64
 import numpy as np
 import bitarray
 import ctypes
-from doublehash import calc_double_hash
+from doublehash import calc_double_hash, calc_double_hashes, set_bits, UINT64_MASK
+from filter_batch import unpack_bits
 
 from abstract_filter import AbstractFilter
 
@@ -36,7 +37,8 @@ class AbstractDoubleHashBloomFilter(AbstractFilter):
         :return: str
         """
         label_str = str(self._label)
-        vector_str = ' '.join(['{}:1'.format(i+1) for i in range(len(self._bloom)) if self._bloom[i]])
+        packed = np.frombuffer(self._bloom.tobytes(), dtype=np.uint8).reshape(1, -1)
+        vector_str = ' '.join(['{}:1'.format(i+1) for i in np.flatnonzero(unpack_bits(packed))])
         return '{} {}'.format(label_str, vector_str)
 
     @property
@@ -94,6 +96,29 @@ class AbstractDoubleHashBloomFilter(AbstractFilter):
             self._bloom[k] = True
         return hashes
 
+    def add_all(self, elems):
+        """
+        add several strings to bloom filter with a single
+        call of the set_bits kernel
+
+        :param elems: list of str
+        :return: None
+        """
+        hash1, hash2 = self.__get_hash_arrays(elems)
+        packed = np.frombuffer(self._bloom.tobytes(), dtype=np.uint8).copy()
+        set_bits(hash1, hash2, self._num_bits, self._num_hash_funcs, packed)
+        self._bloom = bitarray.bitarray(endian='little')
+        self._bloom.frombytes(packed.tobytes())
+
+    def get_positions(self, elem):
+        return self.__get_hash_vals(elem)
+
+    def get_positions_all(self, elems):
+        hash1, hash2 = self.__get_hash_arrays(elems)
+        positions = np.empty((len(hash1), self._num_hash_funcs), dtype=np.int64)
+        calc_double_hashes(hash1, hash2, self._num_bits, self._num_hash_funcs, positions)
+        return positions
+
     def add_to_file(self, f):
         """
         append Base64 encoded representation of Bloom filter to file
@@ -101,7 +126,7 @@ class AbstractDoubleHashBloomFilter(AbstractFilter):
         :param f: file object
         :return: None
         """
-        bloom_str = str(self._label) + '\t' + base64.b64encode(self._bloom.tobytes()) + '\n'
+        bloom_str = str(self._label) + '\t' + base64.b64encode(self.to_bytes()) + '\n'
         f.write(bloom_str)
 
     def read_from_line(self, line):
@@ -115,6 +140,10 @@ class AbstractDoubleHashBloomFilter(AbstractFilter):
         self._label = int(label)
         self._bloom = bitarray.bitarray(endian='little')
         self._bloom.frombytes(base64.b64decode(bloom_str))
+        self._num_bits = len(self._bloom)
+
+    def to_bytes(self):
+        return self._bloom.tobytes()
 
     def get_sha256(self):
         """
@@ -158,6 +187,11 @@ class AbstractDoubleHashBloomFilter(AbstractFilter):
         hash_list = calc_double_hash(hash1, hash2, self._num_bits, self._num_hash_funcs)
         return hash_list
 
+    def __get_hash_arrays(self, elems):
+        hash1 = np.array([self._hash_func1(elem) & UINT64_MASK for elem in elems], dtype=np.uint64)
+        hash2 = np.array([self._hash_func2(elem) & UINT64_MASK for elem in elems], dtype=np.uint64)
+        return hash1, hash2
+
     def calc_similarity(self, other, simtype=None):
         v1 = self.to_numpy_array()
         v2 = other.to_numpy_array()
@@ -170,6 +204,29 @@ class AbstractDoubleHashBloomFilter(AbstractFilter):
     def merge(self, other):
         self.__logical_or(other)
 
+    def fold(self, num_folds):
+        """
+        XOR-folding as proposed by Schnell et al. ("XOR-Folding for
+        Bloom Encodings for Record Linkage", 2016). Each fold XORs the
+        first half of the filter with its second half. The folding
+        is performed on the packed bytes, hence the size of the
+        filter has to be a multiple of 8 * 2^num_folds bits.
+
+        :param num_folds: int
+        :return: None
+        """
+        packed = np.frombuffer(self._bloom.tobytes(), dtype=np.uint8)
+        if packed.shape[0] % (2 ** num_folds) != 0:
+            raise ValueError("Cannot fold filter of size {} {} times.".format(self._num_bits, num_folds))
+
+        for _ in range(num_folds):
+            half = packed.shape[0] // 2
+            packed = np.bitwise_xor(packed[:half], packed[half:])
+
+        self._bloom = bitarray.bitarray(endian='little')
+        self._bloom.frombytes(packed.tobytes())
+        self._num_bits = len(self._bloom)
+
     def __logical_or(self, other):
         """
         bitwise OR between two bloom filters
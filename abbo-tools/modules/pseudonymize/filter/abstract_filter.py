@@ -53,6 +53,16 @@ class AbstractFilter(object):
         """
         pass
 
+    def add_all(self, elems):
+        """
+        add several string elements to the filter
+
+        :param elems: list of str
+        :return: None
+        """
+        for elem in elems:
+            self.add(elem)
+
     @abc.abstractmethod
     def add_to_file(self, f):
         """
@@ -121,3 +131,35 @@ class AbstractFilter(object):
         :return: None
         """
         pass
+
+    @abc.abstractmethod
+    def get_positions(self, elem):
+        """
+        returns the positions of the filter which are incremented
+        when adding an element (without adding it)
+
+        :param elem: str
+        :return: list
+        """
+        pass
+
+    @abc.abstractmethod
+    def get_positions_all(self, elems):
+        """
+        returns the positions of several elements at once, i.e.
+        row j holds the positions returned by get_positions(elems[j])
+
+        :param elems: list of str
+        :return: np.ndarray (int64, shape (len(elems), number of hash functions))
+        """
+        pass
+
+    @abc.abstractmethod
+    def to_bytes(self):
+        """
+        returns the raw payload of the filter as stored (Base64
+        encoded) in filter files
+
+        :return: str
+        """
+        pass
@@ -1,3 +1,122 @@
+cimport cython
+
+# The positions of an element are (hash1 + i * hash2) % num_bits for
+# i < num_hashes. The kernels compute them incrementally modulo
+# num_bits, which yields the same positions as calc_double_hash without
+# overflowing 64 bits. They release the GIL, hence they can be called
+# from several threads (which must not write to the same buffer).
+
+# hash values are truncated to 64 bits as by ctypes.c_ulonglong
+UINT64_MASK = (1 << 64) - 1
+
+
 def calc_double_hash(unsigned long long hash1, unsigned long long hash2, int num_bits, int num_hashes):
     hash_list = [abs((hash1 + i*hash2) % num_bits) for i in range(num_hashes)]
-    return hash_list
\ No newline at end of file
+    return hash_list
+
+
+cdef int _check_args(const unsigned long long[::1] hash1, const unsigned long long[::1] hash2,
+                     long long num_bits, int num_hashes) except -1:
+    if hash1.shape[0] != hash2.shape[0]:
+        raise ValueError("Got {} first and {} second hash values.".format(hash1.shape[0], hash2.shape[0]))
+    if num_bits <= 0 or num_hashes < 0:
+        raise ValueError("Invalid number of bits ({}) or hash functions ({}).".format(num_bits, num_hashes))
+    return 0
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def calc_double_hashes(const unsigned long long[::1] hash1, const unsigned long long[::1] hash2,
+                       long long num_bits, int num_hashes, long long[:, ::1] positions):
+    """
+    compute the positions of several elements given by the pairs
+    (hash1[j], hash2[j]), i.e. positions[j] = calc_double_hash(hash1[j],
+    hash2[j], num_bits, num_hashes)
+
+    :param hash1: np.ndarray (uint64)
+    :param hash2: np.ndarray (uint64)
+    :param num_bits: int
+    :param num_hashes: int
+    :param positions: np.ndarray (int64, shape (len(hash1), num_hashes))
+    :return: None
+    """
+    _check_args(hash1, hash2, num_bits, num_hashes)
+    if positions.shape[0] != hash1.shape[0] or positions.shape[1] != num_hashes:
+        raise ValueError("Positions must be of shape ({}, {}).".format(hash1.shape[0], num_hashes))
+
+    cdef Py_ssize_t i, j
+    cdef unsigned long long m = num_bits, p, step
+    with nogil:
+        for j in range(hash1.shape[0]):
+            p = hash1[j] % m
+            step = hash2[j] % m
+            for i in range(num_hashes):
+                positions[j, i] = p
+                p += step
+                if p >= m:
+                    p -= m
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def set_bits(const unsigned long long[::1] hash1, const unsigned long long[::1] hash2,
+             long long num_bits, int num_hashes, unsigned char[::1] bits):
+    """
+    add several elements to a Bloom filter, i.e. set the bits at their
+    positions in the packed filter (bit k is bit k % 8 of byte k / 8)
+
+    :param hash1: np.ndarray (uint64)
+    :param hash2: np.ndarray (uint64)
+    :param num_bits: int
+    :param num_hashes: int
+    :param bits: writable buffer of at least num_bits / 8 bytes
+    :return: None
+    """
+    _check_args(hash1, hash2, num_bits, num_hashes)
+    if 8 * bits.shape[0] < num_bits:
+        raise ValueError("Buffer of {} bytes cannot hold {} bits.".format(bits.shape[0], num_bits))
+
+    cdef Py_ssize_t i, j
+    cdef unsigned long long m = num_bits, p, step
+    with nogil:
+        for j in range(hash1.shape[0]):
+            p = hash1[j] % m
+            step = hash2[j] % m
+            for i in range(num_hashes):
+                bits[p >> 3] |= 1 << (p & 7)
+                p += step
+                if p >= m:
+                    p -= m
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def increment_counters(const unsigned long long[::1] hash1, const unsigned long long[::1] hash2,
+                       long long num_bits, int num_hashes, short[:, ::1] counters):
+    """
+    add several elements to a Count-Min sketch, i.e. increment the
+    counter of each element in row i at its i-th position
+
+    :param hash1: np.ndarray (uint64)
+    :param hash2: np.ndarray (uint64)
+    :param num_bits: int
+        number of counters per row
+    :param num_hashes: int
+    :param counters: np.ndarray (int16, shape (num_hashes, num_bits))
+    :return: None
+    """
+    _check_args(hash1, hash2, num_bits, num_hashes)
+    if counters.shape[0] != num_hashes or counters.shape[1] != num_bits:
+        raise ValueError("Counters must be of shape ({}, {}).".format(num_hashes, num_bits))
+
+    cdef Py_ssize_t i, j
+    cdef unsigned long long m = num_bits, p, step
+    with nogil:
+        for j in range(hash1.shape[0]):
+            p = hash1[j] % m
+            step = hash2[j] % m
+            for i in range(num_hashes):
+                counters[i, p] += 1
+                p += step
+                if p >= m:
+                    p -= m
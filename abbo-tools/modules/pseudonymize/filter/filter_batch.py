@@ -0,0 +1,349 @@
+from __future__ import print_function
+import os
+import sys
+import base64
+import shutil
+import itertools
+import numpy as np
+import scipy.sparse as sp
+from filter_store import HEADER, is_filter_store, read_header, record_dtype
+from modules.utils.file_io import open_file, is_compressed
+
+"""
+batch-wise access to files containing filters, i.e. Base64 encoded
+filters (one filter per line, see AbstractFilter.add_to_file) or
+binary filter stores (see filter_store)
+"""
+
+# lookup table for unpacking bytes of Bloom filters. Bit i of a
+# filter is stored in bit (i % 8) of byte (i / 8), i.e. the bytes
+# are in little endian bit order (cf. bitarray endian='little').
+BIT_TABLE = np.unpackbits(np.arange(256, dtype=np.uint8).reshape(-1, 1), axis=1)[:, ::-1].copy()
+
+# bounds for the size of byte ranges processed by worker processes
+MIN_RANGE_SIZE = 1 << 20
+MAX_RANGE_SIZE = 1 << 26
+
+# number of bits set in each byte value
+POPCOUNT = BIT_TABLE.sum(axis=1).astype(np.uint8)
+
+# minimum number of set bits required to detect Count-Min sketches
+MIN_DETECTION_BITS = 256
+
+
+def unpack_bits(packed):
+    """
+    unpack a batch of Bloom filters
+
+    :param packed: np.ndarray (uint8) of shape (num_filters, num_bytes)
+    :return: np.ndarray (uint8) of shape (num_filters, 8 * num_bytes)
+    """
+    return BIT_TABLE[packed].reshape(packed.shape[0], 8 * packed.shape[1])
+
+
+class FilterBatch(object):
+    """
+    batch of filters stored in a single 2-dimensional numpy array
+    with one row per filter. Bloom filters are kept in their packed
+    representation (uint8), Count-Min sketches as int16 counters.
+    """
+
+    def __init__(self, labels, data, counting=False):
+        self.labels = labels
+        self.data = data
+        self.counting = counting
+
+    def __len__(self):
+        return self.data.shape[0]
+
+    @classmethod
+    def from_filters(cls, filters, counting=False):
+        """
+        create batch from filter objects
+
+        :param filters: list of AbstractFilter objects
+        :param counting: bool
+        :return: FilterBatch
+        """
+        dtype = np.int16 if counting else np.uint8
+        return _to_batch([f.get_label() for f in filters], [f.to_bytes() for f in filters], dtype, counting)
+
+    @classmethod
+    def from_positions(cls, labels, rows, positions, num_features, counting=False):
+        """
+        create batch from the hash positions of the elements added to
+        each filter, i.e. filter rows[i] contains positions[i]. The
+        counters of Count-Min sketches are incremented once per
+        occurrence of a position.
+
+        :param labels: np.ndarray
+        :param rows: np.ndarray
+        :param positions: np.ndarray
+        :param num_features: int
+        :param counting: bool
+        :return: FilterBatch
+        """
+        num_filters = len(labels)
+        if counting:
+            counts = np.bincount(rows * num_features + positions, minlength=num_filters * num_features)
+            return cls(labels, counts.astype(np.int16).reshape(num_filters, num_features), counting)
+
+        # Bloom filters are padded to whole bytes. The bits of each byte are
+        # reversed, since np.packbits expects the big endian bit order.
+        dense = np.zeros((num_filters, 8 * ((num_features + 7) // 8)), dtype=np.uint8)
+        dense[rows, positions ^ 7] = 1
+        return cls(labels, np.packbits(dense, axis=1), counting)
+
+    @property
+    def num_features(self):
+        """
+        returns the number of bits (counters) of each filter
+
+        :return: int
+        """
+        if self.counting:
+            return self.data.shape[1]
+        return 8 * self.data.shape[1]
+
+    def to_numpy_array(self):
+        """
+        converts batch to a dense matrix with one filter per row
+
+        :return: numpy.ndarray
+        """
+        if self.counting:
+            return self.data
+        return unpack_bits(self.data)
+
+    def nonzero(self):
+        """
+        returns the positions and values of all non-zero entries
+        ordered by filter and position
+
+        :return: rows (np.ndarray), columns (np.ndarray), values (np.ndarray)
+        """
+        dense = self.to_numpy_array()
+        rows, cols = np.nonzero(dense)
+        return rows, cols, dense[rows, cols]
+
+    def row_nnz(self):
+        """
+        returns the number of non-zero entries of each filter. For
+        Bloom filters, these are counted on the packed bytes.
+
+        :return: np.ndarray
+        """
+        if self.counting:
+            return np.count_nonzero(self.data, axis=1)
+        return POPCOUNT[self.data].sum(axis=1, dtype=np.int64)
+
+    def to_csr(self):
+        """
+        converts batch to a sparse matrix with one filter per row
+
+        :return: scipy.sparse.csr_matrix
+        """
+        _, cols, values = self.nonzero()
+        indptr = np.zeros(len(self) + 1, dtype=np.int64)
+        np.cumsum(self.row_nnz(), out=indptr[1:])
+        return sp.csr_matrix((values, cols, indptr), shape=(len(self), self.num_features))
+
+
+class TextFilterWriter(object):
+    """
+    writes batches of filters Base64 encoded to a text file
+    (see AbstractFilter.add_to_file)
+    """
+
+    def __init__(self, filename):
+        self.__file = open_file(filename, 'w')
+
+    def add_batch(self, batch):
+        """
+        append batch of filters to the file
+
+        :param batch: FilterBatch
+        :return: None
+        """
+        lines = ['{}\t{}\n'.format(label, base64.b64encode(row.tobytes()))
+                 for label, row in zip(batch.labels.tolist(), batch.data)]
+        self.__file.write(''.join(lines))
+
+    def append_part(self, filename):
+        """
+        append the filters of another file, e.g. written by a
+        worker process
+
+        :param filename: str
+        :return: None
+        """
+        with open_file(filename, 'r') as f:
+            shutil.copyfileobj(f, self.__file, 1 << 20)
+
+    def close(self):
+        self.__file.close()
+
+
+def read_filter_batches(filename, counting=None, batch_size=1000, byte_range=None):
+    """
+    read filters from a file and yield them in batches. The file is
+    either a binary filter store or a text file with Base64 encoded
+    filters. Lines which cannot be parsed are skipped.
+
+    :param filename: str
+    :param counting: bool
+        True for Count-Min sketches, False for Bloom filters. The type
+        is detected if None. Binary filter stores define their type.
+    :param batch_size: int
+    :param byte_range: tuple (start, stop)
+        only read filters starting within this range of bytes (see
+        split_filter_file)
+    :return: generator of FilterBatch objects
+    """
+    if is_filter_store(filename):
+        return _read_store_batches(filename, batch_size, byte_range)
+    if counting is None:
+        counting = detect_counting(filename)
+    return _read_text_batches(filename, counting, batch_size, byte_range)
+
+
+def detect_counting(filename, num_lines=100):
+    """
+    determine whether a file contains Count-Min sketches or Bloom
+    filters. The type of binary filter stores is given by their
+    header. Otherwise, the decoded payloads of the first lines are
+    read as int16 counters: Count-Min sketches consist of non-negative
+    counters, whereas every 16th bit of Bloom filters is a sign bit.
+    Hence, a negative counter indicates Bloom filters, while filters
+    with at least MIN_DETECTION_BITS set bits and no negative counter
+    are Bloom filters with a probability below (15/16)^256 < 1e-7.
+    A ValueError is raised if the payloads are too sparse to decide.
+
+    :param filename: str
+    :param num_lines: int
+    :return: bool
+    """
+    if is_filter_store(filename):
+        with open_file(filename, 'rb') as f:
+            return read_header(f)[0]
+
+    payloads = list()
+    with open_file(filename, 'rb') as f:
+        for line in itertools.islice(f, num_lines):
+            try:
+                payloads.append(base64.b64decode(line.strip().split('\t')[1]))
+            except (IndexError, ValueError, TypeError):
+                continue
+
+    if not payloads or any(len(p) % 2 for p in payloads):
+        return False
+    counters = np.frombuffer(b''.join(payloads), dtype='<i2')
+    if np.any(counters < 0):
+        return False
+    if np.sum(POPCOUNT[counters.view(np.uint8)], dtype=np.int64) >= MIN_DETECTION_BITS:
+        return True
+    raise ValueError("Cannot determine the type of the filters in '{}' (too few bits set), "
+                     "please set the filter type (-t).".format(filename))
+
+
+def split_filter_file(filename, num_jobs=1, range_size=None):
+    """
+    split a filter file into byte ranges, e.g. for processing them in
+    parallel. Unless range_size is given, the ranges are chosen such
+    that they are distributed evenly among num_jobs workers, but are
+    neither smaller than MIN_RANGE_SIZE nor larger than MAX_RANGE_SIZE
+    bytes. Ranges of binary filter stores are aligned to records,
+    ranges of text files are aligned to lines when reading them.
+    Compressed files cannot be split and are read as a single range
+    (0, None).
+
+    :param filename: str
+    :param num_jobs: int
+    :param range_size: int
+    :return: list of tuples (start, stop)
+    """
+    if is_compressed(filename):
+        return [(0, None)]
+
+    size = os.path.getsize(filename)
+    start, record_size = 0, 1
+    if is_filter_store(filename):
+        with open_file(filename, 'rb') as f:
+            start, record_size = HEADER.size, record_dtype(*read_header(f)).itemsize
+
+    if range_size is None:
+        range_size = min(MAX_RANGE_SIZE, max(MIN_RANGE_SIZE, size // num_jobs + 1))
+    num_ranges = max(1, int(np.ceil((size - start) / float(range_size))))
+    range_size = int(np.ceil((size - start) / float(record_size * num_ranges))) * record_size
+    bounds = [min(size, start + i * range_size) for i in range(num_ranges)] + [size]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def _read_text_batches(filename, counting, batch_size, byte_range):
+    dtype = np.int16 if counting else np.uint8
+    labels, payloads = list(), list()
+    with open_file(filename, 'rb') as f:
+        for offset, line in _read_lines(f, byte_range):
+            try:
+                label, payload = line.strip().split('\t')
+                labels.append(int(label))
+                payloads.append(base64.b64decode(payload))
+            except (ValueError, TypeError):
+                print('Could not parse filter at byte {} in file {}. Skipping.'.format(offset, filename),
+                      file=sys.stderr)
+                continue
+
+            if len(payloads) == batch_size:
+                yield _to_batch(labels, payloads, dtype, counting)
+                labels, payloads = list(), list()
+
+    if payloads:
+        yield _to_batch(labels, payloads, dtype, counting)
+
+
+def _read_lines(f, byte_range):
+    """
+    yield lines and their offsets. A line belongs to the byte range
+    which contains its first byte.
+    """
+    start, stop = byte_range or (0, None)
+    if start > 0:
+        f.seek(start - 1)
+        f.readline()
+
+    offset = f.tell()
+    while stop is None or offset < stop:
+        line = f.readline()
+        if not line:
+            break
+        yield offset, line
+        offset += len(line)
+
+
+def _read_store_batches(filename, batch_size, byte_range):
+    with open_file(filename, 'rb') as f:
+        counting, payload_size = read_header(f)
+        dtype = record_dtype(counting, payload_size)
+
+        start, stop = byte_range or (0, None)
+        start = max(start, HEADER.size)
+        if start > HEADER.size:
+            f.seek(start)
+        remaining = None if stop is None else max(0, stop - start) // dtype.itemsize
+        while remaining is None or remaining > 0:
+            count = batch_size if remaining is None else min(batch_size, remaining)
+            # compressed files do not support np.fromfile
+            data = f.read(count * dtype.itemsize)
+            records = np.frombuffer(data, dtype=dtype, count=len(data) // dtype.itemsize)
+            if len(records) == 0:
+                break
+            if remaining is not None:
+                remaining -= len(records)
+            yield FilterBatch(records['label'].astype(np.int64), np.ascontiguousarray(records['data']), counting)
+
+
+def _to_batch(labels, payloads, dtype, counting):
+    if len(set(len(p) for p in payloads)) > 1:
+        raise ValueError("All filters in a file have to be of the same size.")
+    data = np.frombuffer(b''.join(payloads), dtype=dtype).reshape(len(payloads), -1)
+    return FilterBatch(np.array(labels, dtype=np.int64), data, counting)
@@ -0,0 +1,116 @@
+import struct
+import numpy as np
+from modules.utils.file_io import open_file
+
+"""
+binary filter store. In contrast to the Base64 encoded text format,
+filters are stored as fixed-size records preceded by a header which
+describes the filters:
+
+    header: magic (8 bytes), filter kind (8 bytes, 'bloom' or 'count'),
+            payload size in bytes (uint32), reserved (12 bytes)
+    record: label (int8), payload (packed bits or int16 counters)
+"""
+
+MAGIC = b'ABBOFS01'
+HEADER = struct.Struct('<8s8sI12x')
+
+
+def is_filter_store(filename):
+    """
+    checks whether a file is a binary filter store
+
+    :param filename: str
+    :return: bool
+    """
+    with open_file(filename, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def read_header(f):
+    """
+    read header of a binary filter store
+
+    :param f: file object
+    :return: counting (bool), payload size (int)
+    """
+    return _parse_header(f.read(HEADER.size))
+
+
+def _parse_header(header):
+    if len(header) != HEADER.size:
+        raise ValueError("File is not a binary filter store.")
+    magic, kind, payload_size = HEADER.unpack(header)
+    if magic != MAGIC:
+        raise ValueError("File is not a binary filter store.")
+    return kind.rstrip(b'\x00') == b'count', payload_size
+
+
+def record_dtype(counting, payload_size):
+    """
+    returns numpy dtype of a single record
+
+    :param counting: bool
+    :param payload_size: int
+    :return: np.dtype
+    """
+    if counting:
+        return np.dtype([('label', 'i1'), ('data', '<i2', (payload_size // 2,))])
+    return np.dtype([('label', 'i1'), ('data', 'u1', (payload_size,))])
+
+
+class FilterStoreWriter(object):
+    """
+    writes batches of filters to a binary filter store
+    """
+
+    def __init__(self, filename):
+        self.__file = open_file(filename, 'wb')
+        self.__dtype = None
+
+    def add_batch(self, batch):
+        """
+        append batch of filters to the store
+
+        :param batch: FilterBatch
+        :return: None
+        """
+        payload_size = batch.data.shape[1] * batch.data.dtype.itemsize
+        if self.__dtype is None:
+            kind = b'count' if batch.counting else b'bloom'
+            self.__file.write(HEADER.pack(MAGIC, kind, payload_size))
+            self.__dtype = record_dtype(batch.counting, payload_size)
+        elif self.__dtype != record_dtype(batch.counting, payload_size):
+            raise ValueError("All filters in a file have to be of the same size.")
+
+        records = np.empty(len(batch), dtype=self.__dtype)
+        records['label'] = batch.labels
+        records['data'] = batch.data
+        self.__file.write(records.tobytes())
+
+    def append_part(self, filename):
+        """
+        append the filters of another store, e.g. written by a
+        worker process
+
+        :param filename: str
+        :return: None
+        """
+        with open_file(filename, 'rb') as f:
+            header = f.read(HEADER.size)
+            if not header:
+                return
+            dtype = record_dtype(*_parse_header(header))
+            if self.__dtype is None:
+                self.__file.write(header)
+                self.__dtype = dtype
+            elif self.__dtype != dtype:
+                raise ValueError("All filters in a file have to be of the same size.")
+            while True:
+                chunk = f.read(1 << 24)
+                if not chunk:
+                    break
+                self.__file.write(chunk)
+
+    def close(self):
+        self.__file.close()
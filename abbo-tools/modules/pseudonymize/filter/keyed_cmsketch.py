@@ -4,7 +4,7 @@ import mmh3
 import base64
 import simplejson as json
 from abstract_filter import AbstractFilter
-from doublehash import calc_double_hash
+from doublehash import calc_double_hash, calc_double_hashes, increment_counters, UINT64_MASK
 
 
 class CountMinSketchFilter(AbstractFilter):
@@ -34,6 +34,35 @@ class CountMinSketchFilter(AbstractFilter):
         for i in range(len(hashes)):
             self._filter[i, hashes[i]] += 1
 
+    def add_all(self, elems):
+        """
+        add several strings to filter with a single call
+        of the increment_counters kernel
+
+        :param elems: list of str
+        :return: None
+        """
+        hash1, hash2 = self.__get_hash_arrays(elems)
+        increment_counters(hash1, hash2, self._bits_per_sketch, self._num_hash_funcs, self._filter)
+
+    def get_positions(self, elem):
+        """
+        returns the positions of the flattened sketch which are
+        incremented when adding an element
+
+        :param elem: str
+        :return: list
+        """
+        hashes = self.__get_hash_vals(elem)
+        return [i * self._bits_per_sketch + hashes[i] for i in range(len(hashes))]
+
+    def get_positions_all(self, elems):
+        hash1, hash2 = self.__get_hash_arrays(elems)
+        positions = np.empty((len(hash1), self._num_hash_funcs), dtype=np.int64)
+        calc_double_hashes(hash1, hash2, self._bits_per_sketch, self._num_hash_funcs, positions)
+        positions += np.arange(self._num_hash_funcs, dtype=np.int64) * self._bits_per_sketch
+        return positions
+
     def get_num_of_inserts(self, elem):
         """
         returns how many times an element has (probably)
@@ -55,6 +84,11 @@ class CountMinSketchFilter(AbstractFilter):
         hash_list = calc_double_hash(hash1, hash2, self._bits_per_sketch, self._num_hash_funcs)
         return hash_list
 
+    def __get_hash_arrays(self, elems):
+        hash1 = np.array([self._hash_func1(elem) & UINT64_MASK for elem in elems], dtype=np.uint64)
+        hash2 = np.array([self._hash_func2(elem) & UINT64_MASK for elem in elems], dtype=np.uint64)
+        return hash1, hash2
+
     def _hash_func1(self, elem):
         return mmh3.hash(json.dumps(elem, ensure_ascii=True), 0)
 
@@ -69,7 +103,7 @@ class CountMinSketchFilter(AbstractFilter):
         """
         label_str = str(self._label)
         vector = self._filter.flatten()
-        vector_str = ' '.join(['{}:{}'.format(i+1, vector[i]) for i in range(len(vector)) if vector[i]])
+        vector_str = ' '.join(['{}:{}'.format(i+1, vector[i]) for i in np.flatnonzero(vector)])
         return '{} {}'.format(label_str, vector_str)
 
     def fill_with_noise(self, noise_level):
@@ -115,6 +149,9 @@ class CountMinSketchFilter(AbstractFilter):
         self._filter = np.frombuffer(dec_string, dtype=np.int16).reshape(-1, self._num_hash_funcs)
         self._bits_per_sketch = self._filter.shape[0]
 
+    def to_bytes(self):
+        return self._filter.astype('<i2').tobytes()
+
     def to_numpy_array(self):
         """
         converts count-min sketch to numpy column vector
@@ -143,7 +180,10 @@ class CountMinSketchFilter(AbstractFilter):
         return dist
 
     def set_label(self, label):
-        self._label = label
+        valid_labels = {True: 1,
+                        False: -1,
+                        None: 0}
+        self._label = valid_labels[label]
 
     def get_label(self):
         return self._label
@@ -0,0 +1,181 @@
+from __future__ import print_function
+import sys
+import time
+import socket
+import httplib
+import threading
+import numpy as np
+
+"""
+load generator for benchmarking the scoring daemon (see server)
+"""
+
+# exceptions of the clients indicating a failed request (socket.error
+# is a subclass of IOError)
+CLIENT_ERRORS = (IOError, httplib.HTTPException)
+
+
+class _HTTPClient(object):
+
+    def __init__(self, host, port):
+        self.__connection = httplib.HTTPConnection(host, port)
+
+    def score(self, payload):
+        self.__connection.request('POST', '/score', payload, {'Content-Type': 'application/json'})
+        response = self.__connection.getresponse()
+        return response.status == 200, response.read()
+
+    def close(self):
+        self.__connection.close()
+
+
+class _UnixClient(object):
+
+    def __init__(self, socket_file):
+        self.__socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.__socket.connect(socket_file)
+        self.__file = self.__socket.makefile('rwb')
+
+    def score(self, payload):
+        self.__file.write(payload + b'\n')
+        self.__file.flush()
+        response = self.__file.readline()
+        # an empty response means that the server closed the connection
+        return bool(response) and b'"error"' not in response, response
+
+    def close(self):
+        self.__file.close()
+        self.__socket.close()
+
+
+class LoadGenerator(object):
+
+    def __init__(self):
+        self.__input = None
+        self.__socket = None
+        self.__host = '127.0.0.1'
+        self.__port = 8765
+        self.__concurrency = 4
+        self.__num_requests = 1000
+
+    def set_input(self, input):
+        """
+        input file containing orders in JSON format separated by newline
+        characters. The orders are sent repeatedly if the number of
+        requests exceeds the number of orders.
+
+        :param input: name of file
+        :return: None
+        """
+        self.__input = input
+
+    def set_socket(self, socket_file):
+        """
+        connect to Unix socket instead of localhost HTTP
+
+        :param socket_file: str or None
+        :return: None
+        """
+        self.__socket = socket_file
+
+    def set_address(self, host, port):
+        """
+        set address of the HTTP server
+
+        :param host: str
+        :param port: int
+        :return: None
+        """
+        self.__host = host
+        self.__port = port
+
+    def set_concurrency(self, concurrency):
+        """
+        set number of concurrent connections
+
+        :param concurrency: int
+        :return: None
+        """
+        self.__concurrency = concurrency
+
+    def set_num_requests(self, num_requests):
+        """
+        set total number of requests (one order per request)
+
+        :param num_requests: int
+        :return: None
+        """
+        self.__num_requests = num_requests
+
+    def run(self):
+        """
+        send the requests and print the throughput and latencies of the
+        successful requests. Requests which fail or are answered with
+        an error are counted as errors.
+
+        :return: int, number of failed requests
+        """
+        with open(self.__input, 'rb') as f:
+            orders = [line.strip() for line in f if line.strip()]
+        if not orders:
+            raise ValueError("Input file {} contains no orders.".format(self.__input))
+
+        # latency of each successful request, NaN for failed requests
+        latencies = np.full(self.__num_requests, np.nan, dtype=np.float64)
+        failures = [None] * self.__concurrency
+        threads = [threading.Thread(target=self.__send, args=(orders, i, latencies, failures))
+                   for i in range(self.__concurrency)]
+
+        start = time.time()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        duration = time.time() - start
+
+        latencies = latencies[~np.isnan(latencies)]
+        num_errors = self.__num_requests - len(latencies)
+        self.__output_results(latencies, num_errors, duration, [f for f in failures if f is not None])
+        return num_errors
+
+    def __send(self, orders, worker, latencies, failures):
+        """
+        send every concurrency-th request starting with 'worker'. The
+        first exception of the worker is stored in failures[worker].
+        """
+        try:
+            client = self.__create_client()
+        except CLIENT_ERRORS as e:
+            failures[worker] = e
+            return
+
+        try:
+            for i in range(worker, self.__num_requests, self.__concurrency):
+                start = time.time()
+                try:
+                    success, _ = client.score(orders[i % len(orders)])
+                except CLIENT_ERRORS as e:
+                    if failures[worker] is None:
+                        failures[worker] = e
+                    continue
+                if success:
+                    latencies[i] = time.time() - start
+        finally:
+            client.close()
+
+    def __create_client(self):
+        if self.__socket is not None:
+            return _UnixClient(self.__socket)
+        return _HTTPClient(self.__host, self.__port)
+
+    @staticmethod
+    def __output_results(latencies, num_errors, duration, failures):
+        for failure in failures:
+            print("Request failed: {}".format(failure), file=sys.stderr)
+        latencies = 1000.0 * latencies
+        print("Requests: {}, errors: {}, duration: {:.2f}s, throughput: {:.1f} orders/s".format(
+            len(latencies) + num_errors, num_errors, duration, len(latencies) / duration))
+        if len(latencies) > 0:
+            print("Latency (ms): mean {:.2f}, p50 {:.2f}, p95 {:.2f}, p99 {:.2f}, max {:.2f}".format(
+                latencies.mean(), np.percentile(latencies, 50), np.percentile(latencies, 95),
+                np.percentile(latencies, 99), latencies.max()))
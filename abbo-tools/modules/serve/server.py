@@ -0,0 +1,365 @@
+from __future__ import print_function
+import os
+import sys
+import stat
+import errno
+import socket
+import Queue
+import threading
+import SocketServer
+import BaseHTTPServer
+import numpy as np
+import simplejson
+from modules.pseudonymize.filter.filter_batch import FilterBatch
+from modules.predict.scorer import FilterScorer
+from modules.predict.model import load_liblinear_model
+
+"""
+scoring daemon which keeps the configuration of the feature extractor
+and the model in memory and scores orders sent as JSON over localhost
+HTTP or a Unix socket
+"""
+
+
+class ScoringService(object):
+    """
+    creates filters for orders and scores them with a linear model
+    """
+
+    def __init__(self, feature_extractor, model):
+        self.__feature_extractor = feature_extractor
+        self.__model = model
+        self.__scorer = FilterScorer(model.w)
+
+    def create_filter(self, order):
+        """
+        :param order: dict
+        :return: AbstractFilter
+        """
+        return self.__feature_extractor.create_filter(order)
+
+    def score_filters(self, filters):
+        """
+        :param filters: list of AbstractFilter objects
+        :return: np.ndarray
+        """
+        batch = FilterBatch.from_filters(filters, self.__feature_extractor.counting)
+        return self.__scorer.score(batch) + self.__model.intercept
+
+
+class _Request(object):
+
+    def __init__(self, order):
+        self.order = order
+        self.result = None
+        self.done = threading.Event()
+
+
+class MicroBatcher(threading.Thread):
+    """
+    collects orders submitted by concurrent connections and scores
+    them in batches. A batch contains all orders waiting when the
+    previous batch is finished (at most max_batch_size orders). If
+    max_delay is positive, the batcher waits up to max_delay seconds
+    for further orders before scoring a batch.
+    """
+
+    def __init__(self, service, max_batch_size=64, max_delay=0.0):
+        super(MicroBatcher, self).__init__()
+        self.daemon = True
+        self.__service = service
+        self.__max_batch_size = max_batch_size
+        self.__max_delay = max_delay
+        self.__queue = Queue.Queue()
+
+    def submit(self, orders):
+        """
+        score orders and wait for the results
+
+        :param orders: list of dicts
+        :return: list of dicts ({'score': float, 'label': int} or {'error': str})
+        """
+        requests = [_Request(order) for order in orders]
+        for request in requests:
+            self.__queue.put(request)
+        for request in requests:
+            # wait with timeout, otherwise the wait cannot be interrupted in Python 2
+            while not request.done.wait(3600):
+                pass
+        return [request.result for request in requests]
+
+    def stop(self):
+        """
+        stop the batcher after scoring the orders submitted so far
+
+        :return: None
+        """
+        self.__queue.put(None)
+
+    def run(self):
+        stopped = False
+        while not stopped:
+            batch, stopped = self.__next_batch()
+            if batch:
+                self.__score(batch)
+
+    def __next_batch(self):
+        """
+        returns the next batch and whether the batcher was stopped
+        (None in the queue)
+        """
+        batch = list()
+        request = self.__queue.get()
+        try:
+            while request is not None:
+                batch.append(request)
+                if len(batch) >= self.__max_batch_size:
+                    break
+                if self.__max_delay > 0:
+                    request = self.__queue.get(timeout=self.__max_delay)
+                else:
+                    request = self.__queue.get_nowait()
+        except Queue.Empty:
+            pass
+        return batch, request is None
+
+    def __score(self, batch):
+        filters, valid = list(), list()
+        for request in batch:
+            try:
+                filters.append(self.__service.create_filter(request.order))
+                valid.append(request)
+            except Exception as e:
+                request.result = {'error': 'Could not pseudonymize order: {}'.format(e)}
+
+        try:
+            if valid:
+                scores = self.__service.score_filters(filters).tolist()
+                for request, score in zip(valid, scores):
+                    request.result = {'score': score, 'label': 1 if score > 0 else -1}
+        except Exception as e:
+            for request in valid:
+                request.result = {'error': 'Could not score order: {}'.format(e)}
+        finally:
+            for request in batch:
+                request.done.set()
+
+
+def _handle_payload(batcher, payload):
+    """
+    score orders of a request. The payload contains either a single
+    order or a list of orders in JSON format.
+
+    :param batcher: MicroBatcher
+    :param payload: str
+    :return: response (str), success (bool)
+    """
+    try:
+        orders = simplejson.loads(payload, encoding='utf-8')
+    except ValueError as e:
+        return simplejson.dumps({'error': 'Invalid JSON: {}'.format(e)}), False
+
+    if isinstance(orders, list):
+        results = batcher.submit(orders)
+        return simplejson.dumps(results), all('error' not in r for r in results)
+    elif isinstance(orders, dict):
+        result = batcher.submit([orders])[0]
+        return simplejson.dumps(result), 'error' not in result
+    return simplejson.dumps({'error': 'Expected order or list of orders.'}), False
+
+
+class _HTTPRequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """
+    POST /score with an order (or list of orders) as body
+    """
+
+    protocol_version = 'HTTP/1.1'
+    # send response in a single segment
+    disable_nagle_algorithm = True
+    wbufsize = -1
+
+    def do_POST(self):
+        if self.path.rstrip('/') != '/score':
+            self.__respond(404, simplejson.dumps({'error': 'Unknown path {}.'.format(self.path)}))
+            return
+        length = int(self.headers.getheader('Content-Length', 0))
+        response, success = _handle_payload(self.server.batcher, self.rfile.read(length))
+        self.__respond(200 if success else 400, response)
+
+    def do_GET(self):
+        if self.path.rstrip('/') == '/health':
+            self.__respond(200, simplejson.dumps({'status': 'ok'}))
+        else:
+            self.__respond(404, simplejson.dumps({'error': 'Unknown path {}.'.format(self.path)}))
+
+    def __respond(self, code, body):
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _UnixRequestHandler(SocketServer.StreamRequestHandler):
+    """
+    line-based protocol: each line contains an order (or list of
+    orders) in JSON format and is answered by a single line
+    """
+
+    def handle(self):
+        for line in iter(self.rfile.readline, b''):
+            if not line.strip():
+                continue
+            response, _ = _handle_payload(self.server.batcher, line)
+            self.wfile.write(response + b'\n')
+            self.wfile.flush()
+
+
+class _HTTPServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+
+class _UnixServer(SocketServer.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+class ScoringServer(object):
+
+    def __init__(self):
+        self.__feature_extractor = None
+        self.__model_file = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                         'predict', 'data', 'toy.model')
+        self.__use_cache = True
+        self.__socket = None
+        self.__host = '127.0.0.1'
+        self.__port = 8765
+        self.__max_batch_size = 64
+        self.__max_delay = 0.0
+
+    def set_feature_extractor(self, feature_extractor):
+        """
+        set feature extractor configured as for pseudonymizing the
+        training data of the model
+
+        :param feature_extractor: FeatureExtractor
+        :return: None
+        """
+        self.__feature_extractor = feature_extractor
+
+    def set_model(self, model_file, use_cache=True):
+        """
+        Set custom LIBLINEAR model
+
+        :param model_file: str
+        :param use_cache: bool
+        :return: None
+        """
+        if model_file is not None:
+            self.__model_file = os.path.abspath(model_file)
+        self.__use_cache = use_cache
+
+    def set_socket(self, socket_file):
+        """
+        listen on Unix socket instead of localhost HTTP
+
+        :param socket_file: str or None
+        :return: None
+        """
+        self.__socket = socket_file
+
+    def set_address(self, host, port):
+        """
+        set address of the HTTP server
+
+        :param host: str
+        :param port: int
+        :return: None
+        """
+        self.__host = host
+        self.__port = port
+
+    def set_batching(self, max_batch_size, max_delay):
+        """
+        set maximal number of orders scored at once and maximal
+        time in seconds to wait for further orders of a batch
+
+        :param max_batch_size: int
+        :param max_delay: float
+        :return: None
+        """
+        self.__max_batch_size = max_batch_size
+        self.__max_delay = max_delay
+
+    def run(self):
+        model = load_liblinear_model(self.__model_file, self.__use_cache)
+        # load the weights of memory-mapped models before the first request
+        model.w = np.array(model.w)
+
+        server = self.__create_server()
+        batcher = MicroBatcher(ScoringService(self.__feature_extractor, model),
+                               self.__max_batch_size, self.__max_delay)
+        batcher.start()
+        server.batcher = batcher
+        # identity of the socket file created by this process
+        socket_id = _file_id(self.__socket) if self.__socket is not None else None
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            batcher.stop()
+            if socket_id is not None and _file_id(self.__socket) == socket_id:
+                os.remove(self.__socket)
+
+    def __create_server(self):
+        if self.__socket is not None:
+            if os.path.lexists(self.__socket):
+                # stale socket of a previous run, other files are kept
+                if not stat.S_ISSOCK(os.lstat(self.__socket).st_mode):
+                    raise ValueError("'{}' exists and is not a socket.".format(self.__socket))
+                if not _is_stale(self.__socket):
+                    raise ValueError("Socket '{}' is already in use.".format(self.__socket))
+                os.remove(self.__socket)
+            server = _UnixServer(self.__socket, _UnixRequestHandler)
+            print("Listening on {}".format(self.__socket), file=sys.stderr)
+        else:
+            server = _HTTPServer((self.__host, self.__port), _HTTPRequestHandler)
+            print("Listening on http://{}:{}/score".format(*server.server_address[:2]), file=sys.stderr)
+        return server
+
+
+def _is_stale(path):
+    """
+    returns whether nobody listens on a Unix socket, i.e. the
+    connection is refused
+
+    :param path: str
+    :return: bool
+    """
+    s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        s.connect(path)
+    except socket.error as e:
+        return e.errno == errno.ECONNREFUSED
+    finally:
+        s.close()
+    return False
+
+
+def _file_id(path):
+    """
+    returns device and inode of a socket file (None if
+    the file does not exist or is not a socket)
+
+    :param path: str
+    :return: tuple or None
+    """
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return None
+    return (st.st_dev, st.st_ino) if stat.S_ISSOCK(st.st_mode) else None
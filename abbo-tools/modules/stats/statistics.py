@@ -0,0 +1,248 @@
+from __future__ import print_function
+import multiprocessing
+import numpy as np
+import simplejson as json
+from modules.pseudonymize.filter.filter_batch import BIT_TABLE, read_filter_batches, split_filter_file, detect_counting
+
+LABELS = (-1, 0, 1)
+
+
+class FilterStatistics(object):
+    """
+    accumulates per-bit set frequencies and fill levels of filters,
+    separately for each label. For Count-Min sketches, a counter is
+    considered as set if it is non-zero.
+    """
+
+    def __init__(self):
+        self.counting = None
+        self.num_features = None
+        self.num_filters = np.zeros(len(LABELS), dtype=np.int64)
+        self.bit_counts = None  # number of filters with bit i set per label
+        self.fill_counts = None  # number of filters with j bits set per label
+
+    def add_batch(self, batch):
+        """
+        add batch of filters to the statistics
+
+        :param batch: FilterBatch
+        :return: None
+        """
+        if self.num_features is None:
+            self.__init_counts(batch.counting, batch.num_features)
+        elif self.num_features != batch.num_features:
+            raise ValueError("All filters in a file have to be of the same size.")
+
+        row_nnz = batch.row_nnz()
+        for i, label in enumerate(LABELS):
+            idcs = np.flatnonzero(batch.labels == label)
+            if len(idcs) == 0:
+                continue
+            self.num_filters[i] += len(idcs)
+            self.bit_counts[i] += _bit_counts(batch.data[idcs], batch.counting)
+            self.fill_counts[i] += np.bincount(row_nnz[idcs], minlength=self.num_features + 1)
+
+    def merge(self, other):
+        """
+        merge with statistics of another (disjoint) set of filters
+
+        :param other: FilterStatistics
+        :return: None
+        """
+        if other.num_features is None:
+            return
+        if self.num_features is None:
+            self.__init_counts(other.counting, other.num_features)
+        elif self.num_features != other.num_features:
+            raise ValueError("All filters in a file have to be of the same size.")
+
+        self.num_filters += other.num_filters
+        self.bit_counts += other.bit_counts
+        self.fill_counts += other.fill_counts
+
+    def summary(self):
+        """
+        returns summary of the statistics
+
+        :return: dict
+        """
+        num_filters = int(self.num_filters.sum())
+        summary = {'filter_type': 'count' if self.counting else 'bloom',
+                   'num_features': self.num_features,
+                   'num_filters': num_filters,
+                   'num_filters_per_label': dict((str(l), int(n)) for l, n in zip(LABELS, self.num_filters))}
+        if num_filters == 0:
+            return summary
+
+        fill_levels = 100.0 * np.arange(self.num_features + 1) / self.num_features
+        summary['fill_level'] = _distribution_summary(fill_levels, self.fill_counts.sum(axis=0))
+
+        bit_counts = self.bit_counts.sum(axis=0)
+        summary['bit_frequency'] = _frequency_summary(bit_counts, num_filters)
+        summary['bit_frequency_per_label'] = dict((str(l), _frequency_summary(self.bit_counts[i], n))
+                                                  for i, (l, n) in enumerate(zip(LABELS, self.num_filters)) if n > 0)
+        return summary
+
+    def __init_counts(self, counting, num_features):
+        self.counting = counting
+        self.num_features = num_features
+        self.bit_counts = np.zeros((len(LABELS), num_features), dtype=np.int64)
+        self.fill_counts = np.zeros((len(LABELS), num_features + 1), dtype=np.int64)
+
+
+class StatisticsModule(object):
+
+    def __init__(self):
+        self.__input = None
+        self.__output = None
+        self.__type = None  # detect filter type
+        self.__batch_size = 1000
+        self.__num_jobs = multiprocessing.cpu_count()
+
+    def set_input(self, input):
+        """
+        input file containing filters (Base64 encoded or binary filter store)
+
+        :param input: name of file
+        :return: None
+        """
+        self.__input = input
+
+    def set_output(self, output):
+        """
+        prefix of the output files. The summary is written to
+        <output>.json, the raw counts to <output>_*.npy
+
+        :param output: str
+        :return: None
+        """
+        self.__output = output
+
+    def set_filter_type(self, filter_type):
+        """
+        set type of the filters in the input file (detected if None)
+
+        :param filter_type: str ('murmur', 'keyed', 'count', 'keyedcount') or None
+        :return: None
+        """
+        self.__type = filter_type
+
+    def set_batch_size(self, batch_size):
+        """
+        filters are processed in batches of 'batch_size' filters
+
+        :param batch_size: int
+        :return: None
+        """
+        self.__batch_size = batch_size
+
+    def set_num_jobs(self, num_jobs):
+        """
+        set number of worker processes (default: number of cores)
+
+        :param num_jobs: int or None
+        :return: None
+        """
+        self.__num_jobs = num_jobs or multiprocessing.cpu_count()
+
+    def run(self):
+        if self.__type is None:
+            counting = detect_counting(self.__input)
+        else:
+            counting = self.__type in ('count', 'keyedcount')
+
+        tasks = [(self.__input, counting, self.__batch_size, byte_range)
+                 for byte_range in split_filter_file(self.__input, self.__num_jobs)]
+
+        stats = FilterStatistics()
+        if self.__num_jobs == 1 or len(tasks) == 1:
+            for task in tasks:
+                stats.merge(_collect_statistics(task))
+        else:
+            pool = multiprocessing.Pool(self.__num_jobs)
+            try:
+                for shard_stats in pool.imap_unordered(_collect_statistics, tasks):
+                    stats.merge(shard_stats)
+                pool.close()
+            finally:
+                pool.terminate()
+
+        self.__save(stats)
+
+    def __save(self, stats):
+        summary = stats.summary()
+        print("Filters: {}, fill level: {:.2f}%".format(summary['num_filters'],
+                                                        summary.get('fill_level', {}).get('mean', 0.0)))
+
+        with open('{}.json'.format(self.__output), 'w') as f:
+            json.dump(summary, f, indent=2, sort_keys=True)
+
+        if stats.num_features is not None:
+            np.save('{}_bit_counts.npy'.format(self.__output), stats.bit_counts)
+            np.save('{}_fill_counts.npy'.format(self.__output), stats.fill_counts)
+            np.save('{}_num_filters.npy'.format(self.__output), stats.num_filters)
+
+
+def _collect_statistics(task):
+    filename, counting, batch_size, byte_range = task
+    stats = FilterStatistics()
+    for batch in read_filter_batches(filename, counting, batch_size, byte_range):
+        stats.add_batch(batch)
+    return stats
+
+
+def _bit_counts(data, counting):
+    """
+    count for each position how many filters have it set. For Bloom
+    filters, the values of each byte are counted first and then
+    expanded to the 8 bits of the byte.
+
+    :param data: np.ndarray (packed Bloom filters or Count-Min sketches)
+    :param counting: bool
+    :return: np.ndarray
+    """
+    if counting:
+        return np.count_nonzero(data, axis=0)
+
+    num_bytes = data.shape[1]
+    byte_values = data.astype(np.int64) + 256 * np.arange(num_bytes)
+    value_counts = np.bincount(byte_values.ravel(), minlength=256 * num_bytes).reshape(num_bytes, 256)
+    return value_counts.dot(BIT_TABLE.astype(np.int64)).ravel()
+
+
+def _distribution_summary(values, counts):
+    """
+    summarize distribution given as histogram
+
+    :param values: np.ndarray
+    :param counts: np.ndarray
+    :return: dict
+    """
+    n = float(counts.sum())
+    mean = np.dot(values, counts) / n
+    std = np.sqrt(np.dot((values - mean) ** 2, counts) / n)
+    cdf = np.cumsum(counts) / n
+    nonzero = np.flatnonzero(counts)
+    summary = {'mean': float(mean), 'std': float(std),
+               'min': float(values[nonzero[0]]), 'max': float(values[nonzero[-1]])}
+    for q in (5, 25, 50, 75, 95):
+        idx = min(len(values) - 1, np.searchsorted(cdf, q / 100.0))
+        summary['p{}'.format(q)] = float(values[idx])
+    return summary
+
+
+def _frequency_summary(bit_counts, num_filters):
+    """
+    summarize relative frequencies of the bits
+
+    :param bit_counts: np.ndarray
+    :param num_filters: int
+    :return: dict
+    """
+    freqs = bit_counts / float(num_filters)
+    return {'mean': float(freqs.mean()),
+            'std': float(freqs.std()),
+            'min': float(freqs.min()),
+            'max': float(freqs.max()),
+            'num_never_set': int(np.sum(bit_counts == 0)),
+            'num_always_set': int(np.sum(bit_counts == num_filters))}
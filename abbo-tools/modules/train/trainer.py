@@ -0,0 +1,216 @@
+from __future__ import print_function
+import multiprocessing
+import numpy as np
+from sklearn.linear_model import SGDClassifier
+from modules.pseudonymize.filter.filter_batch import read_filter_batches, split_filter_file, detect_counting
+from modules.predict.model import LinearModel, write_liblinear_model
+
+"""
+out-of-core training of linear models on filter files
+"""
+
+# LIBLINEAR solvers with the same loss functions
+SOLVER_TYPES = {'hinge': 'L2R_L1LOSS_SVC_DUAL',
+                'squared_hinge': 'L2R_L2LOSS_SVC_DUAL',
+                'log': 'L2R_LR'}
+
+CLASSES = np.array([-1, 1])
+
+
+class TrainingModule(object):
+
+    def __init__(self):
+        self.__input = None
+        self.__output = None
+        self.__type = None  # detect filter type
+        self.__batch_size = 1000
+        self.__num_epochs = 5
+        self.__loss = 'hinge'
+        self.__alpha = 1e-4
+        self.__fit_intercept = False
+        self.__num_jobs = 1
+        self.__seed = None
+
+    def set_input(self, input):
+        """
+        input file containing filters (Base64 encoded or binary filter store)
+
+        :param input: name of file
+        :return: None
+        """
+        self.__input = input
+
+    def set_output(self, output):
+        """
+        output file to store model in LIBLINEAR format
+
+        :param output: name of file
+        :return: None
+        """
+        self.__output = output
+
+    def set_filter_type(self, filter_type):
+        """
+        set type of the filters in the input file (detected if None)
+
+        :param filter_type: str ('murmur', 'keyed', 'count', 'keyedcount') or None
+        :return: None
+        """
+        self.__type = filter_type
+
+    def set_batch_size(self, batch_size):
+        """
+        filters are read and learned in batches of 'batch_size' filters
+
+        :param batch_size: int
+        :return: None
+        """
+        self.__batch_size = batch_size
+
+    def set_num_epochs(self, num_epochs):
+        """
+        set number of passes over the input file
+
+        :param num_epochs: int
+        :return: None
+        """
+        self.__num_epochs = num_epochs
+
+    def set_loss(self, loss):
+        """
+        set loss function of the linear model
+
+        :param loss: str ('hinge', 'squared_hinge', 'log')
+        :return: None
+        """
+        if loss not in SOLVER_TYPES:
+            raise ValueError("Unknown loss function '{}'.".format(loss))
+        self.__loss = loss
+
+    def set_regularization(self, alpha):
+        """
+        set strength of the L2 regularization
+
+        :param alpha: float
+        :return: None
+        """
+        self.__alpha = alpha
+
+    def set_bias(self, fit_intercept):
+        """
+        learn intercept of the model (stored as bias feature)
+
+        :param fit_intercept: bool
+        :return: None
+        """
+        self.__fit_intercept = fit_intercept
+
+    def set_num_jobs(self, num_jobs):
+        """
+        set number of worker processes (default: 1). With several
+        workers, each worker learns on a part of the file and the
+        models are averaged after each epoch.
+
+        :param num_jobs: int or None
+        :return: None
+        """
+        self.__num_jobs = num_jobs or multiprocessing.cpu_count()
+
+    def set_seed(self, seed):
+        """
+        set seed for shuffling the filters of a batch and of the
+        classifier (the seed of epoch i is seed + i)
+
+        :param seed: int or None
+        :return: None
+        """
+        self.__seed = seed
+
+    def run(self):
+        if self.__type is None:
+            counting = detect_counting(self.__input)
+        else:
+            counting = self.__type in ('count', 'keyedcount')
+
+        ranges = split_filter_file(self.__input, self.__num_jobs)
+        params = {'loss': self.__loss, 'alpha': self.__alpha, 'fit_intercept': self.__fit_intercept}
+        state = None
+
+        pool = None
+        if self.__num_jobs > 1 and len(ranges) > 1:
+            pool = multiprocessing.Pool(self.__num_jobs)
+        try:
+            for epoch in range(self.__num_epochs):
+                seed = None if self.__seed is None else self.__seed + epoch
+                if pool is None:
+                    # a single worker continues with the model of the previous range
+                    for byte_range in ranges:
+                        task = (self.__input, counting, self.__batch_size, byte_range, params, state, seed)
+                        state = _train_range(task) or state
+                else:
+                    tasks = [(self.__input, counting, self.__batch_size, byte_range, params, state, seed)
+                             for byte_range in ranges]
+                    state = _average([s for s in pool.map(_train_range, tasks) if s is not None]) or state
+            if pool is not None:
+                pool.close()
+        finally:
+            if pool is not None:
+                pool.terminate()
+
+        if state is None:
+            raise ValueError("Input file {} contains no labeled filters.".format(self.__input))
+
+        coef, intercept, _, _ = state
+        write_liblinear_model(self.__output, LinearModel(coef, intercept), SOLVER_TYPES[self.__loss])
+
+
+def _train_range(task):
+    """
+    learn on the filters of a byte range of a file starting from
+    a given state of the model
+
+    :param task: tuple (filename, counting, batch_size, byte_range, params, state, seed)
+    :return: state (coef, intercept, t, num_samples) or None if the range
+             contains no labeled filters
+    """
+    filename, counting, batch_size, byte_range, params, state, seed = task
+    clf = SGDClassifier(random_state=seed, **params)
+    # partial_fit does not shuffle the samples
+    rand = np.random.RandomState(seed)
+    if state is not None:
+        coef, intercept, t, _ = state
+        clf.classes_ = CLASSES
+        clf.coef_ = coef.reshape(1, -1).copy()
+        clf.intercept_ = np.array([intercept])
+        clf.t_ = t
+
+    num_samples = 0
+    for batch in read_filter_batches(filename, counting, batch_size, byte_range):
+        # filters of unlabeled orders are ignored
+        labeled = rand.permutation(np.flatnonzero(batch.labels != 0))
+        if len(labeled) == 0:
+            continue
+        X = batch.to_csr()[labeled]
+        clf.partial_fit(X, batch.labels[labeled], classes=CLASSES)
+        num_samples += len(labeled)
+
+    if getattr(clf, 'coef_', None) is None:
+        return None
+    return clf.coef_.ravel(), float(clf.intercept_[0]), clf.t_, num_samples
+
+
+def _average(states):
+    """
+    average models weighted by their number of samples
+
+    :param states: list of states (coef, intercept, t, num_samples)
+    :return: state or None
+    """
+    if not states:
+        return None
+    weights = np.array([s[3] for s in states], dtype=np.float64)
+    weights /= weights.sum()
+    coef = sum(w * s[0] for w, s in zip(weights, states))
+    intercept = sum(w * s[1] for w, s in zip(weights, states))
+    t = sum(w * s[2] for w, s in zip(weights, states))
+    return coef, intercept, t, int(sum(s[3] for s in states))
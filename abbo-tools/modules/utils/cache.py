@@ -0,0 +1,152 @@
+import os
+import re
+import hashlib
+import tempfile
+
+"""
+caching of objects derived from a source file (e.g. the weights of a
+model) in a file next to the source file. The name of the cache file
+contains the size and modification time of the source file and the
+hash of its content ('<source>.<size>-<mtime>.<hash><ext>'), such
+that the source file is only hashed if its size or modification time
+has changed. Only files with names of this form are removed as
+outdated caches.
+"""
+
+# number of hex digits of the source file hash used in the cache file name
+HASH_SIZE = 16
+
+# exceptions of the load functions indicating an invalid cache file
+LOAD_ERRORS = (IOError, ValueError, KeyError)
+
+
+def load_cached(source_file, ext, build, load, save):
+    """
+    returns the object built from a source file. The object is read
+    from the cache file of the source file, which is created if it
+    does not exist yet or if the source file has changed.
+
+    :param source_file: str
+    :param ext: str
+        extension of the cache file, e.g. '.npy'
+    :param build: function(source_file) returning the object
+    :param load: function(cache_file) returning the cached object
+    :param save: function(f, object) writing the object to a file object
+    :return: object
+    """
+    cache_file = find_cache_file(source_file, ext)
+    if cache_file is not None:
+        try:
+            return load(cache_file)
+        except LOAD_ERRORS:
+            pass
+
+    obj = build(source_file)
+    write_cache(source_file, ext, obj, save)
+    return obj
+
+
+def get_cache_file(source_file, ext):
+    """
+    returns name of the cache file of the current version of
+    the source file
+
+    :param source_file: str
+    :param ext: str
+    :return: str
+    """
+    return '{}.{}.{}{}'.format(source_file, _stat_key(source_file), _hash_file(source_file), ext)
+
+
+def find_cache_file(source_file, ext):
+    """
+    returns the existing cache file of the current version of the
+    source file or None. A cache file whose source file has been
+    touched without changing its content is renamed and reused.
+
+    :param source_file: str
+    :param ext: str
+    :return: str or None
+    """
+    caches = _list_cache_files(source_file, ext)
+    stat_key = _stat_key(source_file)
+    for name, (key, _) in caches.items():
+        if key == stat_key:
+            return name
+    if not caches:
+        return None
+
+    # size or modification time have changed
+    digest = _hash_file(source_file)
+    for name, (_, cache_digest) in caches.items():
+        if cache_digest == digest:
+            cache_file = '{}.{}.{}{}'.format(source_file, stat_key, digest, ext)
+            try:
+                os.rename(name, cache_file)
+            except OSError:
+                return name
+            return cache_file
+    return None
+
+
+def write_cache(source_file, ext, obj, save):
+    """
+    write object to the cache file of the source file and remove
+    outdated cache files of the source file. Nothing is cached if
+    the directory is not writable.
+
+    :param source_file: str
+    :param ext: str
+    :param obj: object
+    :param save: function(f, object)
+    :return: None
+    """
+    cache_file = get_cache_file(source_file, ext)
+    directory = os.path.dirname(os.path.abspath(cache_file))
+    tmp_file = None
+    try:
+        fd, tmp_file = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            save(f, obj)
+        os.rename(tmp_file, cache_file)
+    except (IOError, OSError):
+        if tmp_file is not None and os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        return
+
+    for name in _list_cache_files(source_file, ext):
+        if name != cache_file:
+            try:
+                os.remove(name)
+            except OSError:
+                pass
+
+
+def _list_cache_files(source_file, ext):
+    """
+    returns the cache files of all versions of the source file
+
+    :return: dict (cache file -> (stat key, hash))
+    """
+    directory = os.path.dirname(source_file)
+    pattern = re.compile(r'{}\.(\d+-\d+)\.([0-9a-f]{{{}}}){}$'.format(
+        re.escape(os.path.basename(source_file)), HASH_SIZE, re.escape(ext)))
+    caches = dict()
+    for name in os.listdir(directory or '.'):
+        match = pattern.match(name)
+        if match is not None:
+            caches[os.path.join(directory, name)] = match.groups()
+    return caches
+
+
+def _stat_key(source_file):
+    st = os.stat(source_file)
+    return '{}-{}'.format(st.st_size, int(st.st_mtime * 1000000))
+
+
+def _hash_file(source_file):
+    sha1 = hashlib.sha1()
+    with open(source_file, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha1.update(chunk)
+    return sha1.hexdigest()[:HASH_SIZE]
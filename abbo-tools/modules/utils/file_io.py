@@ -0,0 +1,198 @@
+import io
+import bz2
+import gzip
+import threading
+import Queue
+try:
+    import lzma
+except ImportError:
+    try:
+        from backports import lzma
+    except ImportError:  # xz compression is not available
+        lzma = None
+
+"""
+transparent access to compressed files. Files ending with .gz, .bz2 or
+.xz are compressed with gzip, bzip2 or xz (LZMA, requires Python 3 or
+backports.lzma), all other files are accessed directly. Compression of
+written files can run in a background thread, such that it overlaps
+with the computation of the data written next.
+"""
+
+# buffer size for reading and writing files
+BUFFER_SIZE = 1 << 20
+
+# compression levels (gzip uses the default level of the gzip tool)
+GZIP_LEVEL = 6
+BZ2_LEVEL = 9
+
+# number of buffers queued for the compression thread
+QUEUE_SIZE = 16
+
+EXTENSIONS = ('.gz', '.bz2', '.xz')
+
+# compress written files in a background thread by default
+_background_compression = True
+
+
+def set_background_compression(background):
+    """
+    set whether compressed files are written by a background thread
+
+    :param background: bool
+    :return: None
+    """
+    global _background_compression
+    _background_compression = background
+
+
+def is_compressed(filename):
+    """
+    checks whether a file is compressed, i.e. whether it has the
+    extension of a compression format
+
+    :param filename: str
+    :return: bool
+    """
+    return filename.endswith(EXTENSIONS)
+
+
+def strip_compression(filename):
+    """
+    returns file name without the extension of the compression format
+
+    :param filename: str
+    :return: str
+    """
+    for ext in EXTENSIONS:
+        if filename.endswith(ext):
+            return filename[:-len(ext)]
+    return filename
+
+
+def open_file(filename, mode='r', buffer_size=BUFFER_SIZE):
+    """
+    open a file for reading or writing. Compressed files are opened in
+    binary mode (i.e. without newline translation) and are buffered
+    with 'buffer_size' bytes. Unless disabled by
+    set_background_compression, the compression of written files
+    runs in a background thread.
+
+    :param filename: str
+    :param mode: str ('r', 'w' or 'a', optionally with 'b')
+    :param buffer_size: int
+    :return: file object
+    """
+    if not is_compressed(filename):
+        return open(filename, mode, buffer_size)
+
+    mode = mode.replace('b', '').replace('t', '')
+    if mode not in ('r', 'w', 'a'):
+        raise ValueError("Unsupported mode '{}' for compressed file {}.".format(mode, filename))
+
+    if filename.endswith('.gz'):
+        f = gzip.GzipFile(filename, mode + 'b', GZIP_LEVEL)
+    elif filename.endswith('.bz2'):
+        if mode == 'a':
+            raise ValueError("Appending to bzip2 compressed files is not supported.")
+        f = bz2.BZ2File(filename, mode, buffer_size, BZ2_LEVEL)
+    else:
+        if lzma is None:
+            raise ValueError("xz compressed files require the lzma module (backports.lzma).")
+        f = lzma.LZMAFile(filename, mode + 'b')
+
+    if mode != 'r' and _background_compression:
+        return BackgroundWriter(f, buffer_size)
+    if not isinstance(f, io.IOBase):
+        # BZ2File is buffered by itself
+        return f
+    return io.BufferedReader(f, buffer_size) if mode == 'r' else io.BufferedWriter(f, buffer_size)
+
+
+class BackgroundWriter(object):
+    """
+    file object which collects written data in buffers of
+    'buffer_size' bytes and passes them to a thread writing them to
+    the underlying (compressing) file. The compressors release the GIL,
+    hence compression runs in parallel to the writing thread.
+    """
+
+    def __init__(self, f, buffer_size=BUFFER_SIZE):
+        self.__file = f
+        self.__buffer_size = buffer_size
+        self.__chunks, self.__size = list(), 0
+        self.__queue = Queue.Queue(QUEUE_SIZE)
+        self.__error = None
+        self.__thread = threading.Thread(target=self.__write_chunks)
+        self.__thread.daemon = True
+        self.__thread.start()
+        self.closed = False
+
+    def write(self, data):
+        """
+        :param data: str
+        :return: None
+        """
+        self.__chunks.append(data)
+        self.__size += len(data)
+        if self.__size >= self.__buffer_size:
+            self.__flush_chunks()
+
+    def writelines(self, lines):
+        for line in lines:
+            self.write(line)
+
+    def flush(self):
+        """
+        pass the buffered data to the writing thread. The data is
+        written asynchronously.
+
+        :return: None
+        """
+        self.__flush_chunks()
+
+    def close(self):
+        """
+        write the remaining data and close the underlying file
+
+        :return: None
+        """
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self.__flush_chunks()
+            self.__queue.put(None)
+            self.__thread.join()
+            self.__check_error()
+        finally:
+            self.__file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __flush_chunks(self):
+        self.__check_error()
+        if self.__chunks:
+            self.__queue.put(b''.join(self.__chunks))
+            self.__chunks, self.__size = list(), 0
+
+    def __check_error(self):
+        if self.__error is not None:
+            raise self.__error
+
+    def __write_chunks(self):
+        while True:
+            data = self.__queue.get()
+            if data is None:
+                break
+            if self.__error is not None:
+                # discard remaining data after an error
+                continue
+            try:
+                self.__file.write(data)
+            except Exception as e:
+                self.__error = e
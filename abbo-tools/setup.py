@@ -24,7 +24,7 @@ setup(
     description="The ABBO Toolbox",
     license="GPLv3",
 
-    packages=find_packages(exclude=['tests']),
+    packages=find_packages(exclude=['tests', 'benchmarks']),
     package_data={'modules': ['generate/data/*.csv', 'predict/data/toy.model']},
     test_suite='tests',
     include_package_data=True,
@@ -0,0 +1,41 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+from benchmarks.fixtures import parse_size
+from benchmarks.run import run_benchmarks, compare_results
+from benchmarks.suite import BENCHMARKS
+
+
+class BenchmarksTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_sizes(self):
+        self.assertEqual(parse_size('small'), 1000)
+        self.assertEqual(parse_size('50'), 50)
+        self.assertRaises(ValueError, parse_size, 'tiny')
+
+    def test_run(self):
+        pattern = '^(hashing/murmur|filter/merge/bloom|convert/binary|predict/store)$'
+        results = run_benchmarks(['40'], self.tmp_dir, pattern, repeat=1)
+        self.assertEqual([r['name'] for r in results['results']],
+                         [b[0] for b in BENCHMARKS if b[0] in pattern])
+        for r in results['results']:
+            self.assertEqual(r['num_orders'], 40)
+            self.assertGreater(r['throughput'], 0.0)
+            self.assertGreaterEqual(r['peak_memory_increase_mb'], 0.0)
+        self.assertEqual(results['results'][-1]['num_items'], 40)
+        self.assertTrue(os.path.exists(os.path.join(self.tmp_dir, '40', 'done')))
+
+        # 20% slower than the baseline
+        baseline = {'results': [dict(r, throughput=r['throughput'] * 1.25) for r in results['results']]}
+        comparison = compare_results(results, baseline, tolerance=0.1)
+        self.assertEqual(len(comparison), 4)
+        self.assertTrue(all(regression for _, _, _, regression in comparison))
+        self.assertFalse(any(regression for _, _, _, regression in compare_results(results, baseline, 0.3)))
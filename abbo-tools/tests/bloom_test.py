@@ -3,6 +3,8 @@ import os
 import numpy as np
 
 from modules.pseudonymize.filter.bloom_factory import BloomFilter
+from modules.pseudonymize.filter.doublehash import calc_double_hash, calc_double_hashes, set_bits, \
+    increment_counters
 
 
 class MurmurBloomTestClass(unittest.TestCase):
@@ -33,6 +35,20 @@ class MurmurBloomTestClass(unittest.TestCase):
         self.assertTrue(self._bf0.contains('test'))
         self.assertFalse(self._bf0.contains('mimimi'))
 
+    def test_add_all(self):
+        words = ['test', 'dings', u'customer->M\xfcller', 'test']
+        for b in [self._bf0, self._bf1]:
+            b.set_num_hash_functions(4)
+            expected = BloomFilter.factory(self.bloom_type, b.size, self.key)
+            expected.set_num_hash_functions(4)
+            for word in words:
+                expected.add(word)
+            b.add_all(words)
+            self.assertEqual(b.to_bytes(), expected.to_bytes())
+            self.assertEqual(b.get_positions_all(words).tolist(), [b.get_positions(word) for word in words])
+        self._bf0.add_all([])
+        self.assertEqual(self._bf0.get_positions_all([]).shape, (0, 4))
+
     def test_add_to_file(self):
         # fill bloom filters
         self._bf0.add('test')
@@ -87,6 +103,18 @@ class MurmurBloomTestClass(unittest.TestCase):
         self.assertTrue(self._bf0.calc_similarity(self._bf1, 'simple') == 0.0)
         self.assertTrue(self._bf0.calc_similarity(self._bf2, 'simple') > 0.0)
 
+    def test_fold(self):
+        self._bf1.add('test')
+        self._bf1.add('dings')
+        bfa = self._bf1.to_numpy_array()
+
+        self._bf1.fold(1)
+        folded = self._bf1.to_numpy_array()
+        self.assertEqual(self._bf1.size, 24)
+        self.assertTrue((folded == (bfa[:24] ^ bfa[24:])).all())
+
+        self.assertRaises(ValueError, self._bf0.fold, 1)
+
 
 class CryptoBloomTestClass(MurmurBloomTestClass):
 
@@ -125,6 +153,19 @@ class CountMinSketchTestClass(unittest.TestCase):
         self.assertEqual(self._cm0.get_num_of_inserts('test2'), 1)
         self.assertEqual(self._cm0.get_num_of_inserts('mimimi'), 0)
 
+    def test_add_all(self):
+        words = ['test', 'dings', u'customer->M\xfcller', 'test']
+        self._cm0.set_num_hash_functions(3)
+        self._cm1 = BloomFilter.factory(self.bloom_type, 30, self.key)
+        self._cm1.set_num_hash_functions(3)
+        for word in words:
+            self._cm1.add(word)
+        self._cm0.add_all(words)
+        self.assertEqual(self._cm0.to_bytes(), self._cm1.to_bytes())
+        self.assertEqual(self._cm0.get_num_of_inserts('test'), 2)
+        self.assertEqual(self._cm0.get_positions_all(words).tolist(),
+                         [self._cm0.get_positions(word) for word in words])
+
     def test_add_to_file(self):
         # fill bloom filters
         self._cm0.add('test')
@@ -174,6 +215,10 @@ class CountMinSketchTestClass(unittest.TestCase):
         self.assertEqual(self._cm0.calc_similarity(self._cm1, 'simple'), 0.0)
         self.assertEqual(self._cm0.calc_similarity(self._cm2, 'simple'), 1.0)
 
+    def test_fold(self):
+        # folding is only defined for Bloom filters
+        self.assertFalse(hasattr(self._cm0, 'fold'))
+
 
 class CryptoCountMinSketchTestClass(CountMinSketchTestClass):
 
@@ -181,6 +226,49 @@ class CryptoCountMinSketchTestClass(CountMinSketchTestClass):
     key = "crypt_key"
 
 
+class DoubleHashKernelTestClass(unittest.TestCase):
+
+    def setUp(self):
+        random = np.random.RandomState(0)
+        self.hash1 = random.randint(0, 1 << 62, 100).astype(np.uint64) << np.uint64(2)
+        self.hash2 = random.randint(0, 1 << 62, 100).astype(np.uint64) << np.uint64(2)
+        # sums of hash values exceeding 64 bits
+        self.hash1[0] = self.hash2[0] = (1 << 64) - 1
+
+    def test_positions(self):
+        for num_bits in [24, 1000, 4001]:
+            positions = np.zeros((100, 5), dtype=np.int64)
+            calc_double_hashes(self.hash1, self.hash2, num_bits, 5, positions)
+            expected = [calc_double_hash(h1, h2, num_bits, 5)
+                        for h1, h2 in zip(self.hash1.tolist(), self.hash2.tolist())]
+            self.assertEqual(positions.tolist(), expected)
+
+    def test_set_bits(self):
+        positions = np.zeros((100, 3), dtype=np.int64)
+        calc_double_hashes(self.hash1, self.hash2, 1000, 3, positions)
+        bits = np.zeros(125, dtype=np.uint8)
+        set_bits(self.hash1, self.hash2, 1000, 3, bits)
+        unpacked = np.unpackbits(bits[:, None], axis=1)[:, ::-1].ravel()
+        self.assertEqual(np.flatnonzero(unpacked).tolist(), np.unique(positions).tolist())
+
+    def test_increment_counters(self):
+        positions = np.zeros((100, 3), dtype=np.int64)
+        calc_double_hashes(self.hash1, self.hash2, 1000, 3, positions)
+        counters = np.zeros((3, 1000), dtype=np.int16)
+        increment_counters(self.hash1, self.hash2, 1000, 3, counters)
+        for i in range(3):
+            self.assertEqual(counters[i].tolist(), np.bincount(positions[:, i], minlength=1000).tolist())
+
+    def test_invalid_arguments(self):
+        self.assertRaises(ValueError, calc_double_hashes, self.hash1, self.hash2[:10], 1000, 3,
+                          np.zeros((100, 3), dtype=np.int64))
+        self.assertRaises(ValueError, calc_double_hashes, self.hash1, self.hash2, 1000, 3,
+                          np.zeros((100, 2), dtype=np.int64))
+        self.assertRaises(ValueError, set_bits, self.hash1, self.hash2, 1000, 3, np.zeros(100, dtype=np.uint8))
+        self.assertRaises(ValueError, increment_counters, self.hash1, self.hash2, 1000, 3,
+                          np.zeros((2, 1000), dtype=np.int16))
+
+
 if __name__ == '__main__':
     unittest.main()
 
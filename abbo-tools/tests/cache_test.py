@@ -0,0 +1,67 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+from modules.utils import cache
+
+
+class CacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.source_file = os.path.join(self.tmp_dir, 'm.model')
+        self.write('weights 1')
+        self.num_builds = 0
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def write(self, content, mtime=None):
+        with open(self.source_file, 'w') as f:
+            f.write(content)
+        if mtime is not None:
+            os.utime(self.source_file, (mtime, mtime))
+
+    def build(self, source_file):
+        self.num_builds += 1
+        with open(source_file) as f:
+            return f.read()
+
+    def load(self):
+        return cache.load_cached(self.source_file, '.npy', self.build,
+                                 lambda cache_file: open(cache_file).read(), lambda f, obj: f.write(obj))
+
+    def test_cache(self):
+        self.assertEqual(self.load(), 'weights 1')
+        self.assertEqual(self.load(), 'weights 1')
+        self.assertEqual(self.num_builds, 1)
+        self.assertTrue(os.path.exists(cache.get_cache_file(self.source_file, '.npy')))
+
+        # touched without changing the content
+        os.utime(self.source_file, (1000000000, 1000000000))
+        self.assertEqual(self.load(), 'weights 1')
+        self.assertEqual(self.num_builds, 1)
+        self.assertTrue(os.path.exists(cache.get_cache_file(self.source_file, '.npy')))
+
+        # changed content with the same size
+        self.write('weights 2')
+        self.assertEqual(self.load(), 'weights 2')
+        self.assertEqual(self.num_builds, 2)
+        self.assertEqual(len([f for f in os.listdir(self.tmp_dir) if f.endswith('.npy')]), 1)
+
+    def test_keep_other_files(self):
+        other_files = ['m.model.weights_backup1.npy', 'm.model.0123456789abcdef.npy', 'm.model.npy']
+        for name in other_files:
+            open(os.path.join(self.tmp_dir, name), 'w').close()
+        self.load()
+        self.write('weights 2')
+        self.load()
+        names = os.listdir(self.tmp_dir)
+        for name in other_files:
+            self.assertIn(name, names)
+        self.assertEqual(len(names), len(other_files) + 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+import os
+import sys
+import subprocess
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# upper bound of the time needed to import the CLI in seconds, which is
+# generous since only argparse, simplejson and file_io are imported
+MAX_IMPORT_TIME = 0.3
+
+IMPORT_SCRIPT = """
+import sys
+import time
+start = time.time()
+import abbo_cli
+elapsed = time.time() - start
+heavy = [m for m in ('numpy', 'scipy', 'sklearn') if m in sys.modules]
+print(' '.join([repr(elapsed)] + heavy))
+"""
+
+
+class CommandLineInterfaceTest(unittest.TestCase):
+
+    def _run(self, *args):
+        return subprocess.check_output([sys.executable] + list(args), cwd=ROOT_DIR,
+                                       stderr=subprocess.STDOUT)
+
+    def _import_cli(self):
+        """
+        import the CLI in a fresh interpreter
+
+        :return: import time in seconds, list of heavy modules imported
+        """
+        output = self._run('-c', IMPORT_SCRIPT).decode('ascii').split()
+        return float(output[0]), output[1:]
+
+    def test_lazy_imports(self):
+        self.assertEqual(self._import_cli()[1], [])
+
+    def test_import_time(self):
+        # best of several runs to be robust against a busy machine
+        times = [self._import_cli()[0] for _ in range(3)]
+        self.assertLess(min(times), MAX_IMPORT_TIME)
+
+    def test_help(self):
+        output = self._run('abbo_cli.py', 'predict', '--help')
+        self.assertIn(b'--model_file', output)
+        # the filter type of orders is set with -t as for filters
+        self.assertIn(b'--filter_type', output)
+        self.assertNotIn(b'--bloom_filter_type', output)
+
+
+if __name__ == '__main__':
+    unittest.main()
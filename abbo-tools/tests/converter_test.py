@@ -0,0 +1,87 @@
+import unittest
+import os
+import numpy as np
+import scipy.sparse as sp
+from sklearn.datasets import load_svmlight_file
+
+from modules.convert.converter import LIBSVMConverter
+from modules.convert.formats import LIBSVMWriter, load_sparse_matrix, read_sparse_matrix_batches
+from modules.pseudonymize.filter.bloom_factory import BloomFilter
+from modules.pseudonymize.filter.filter_batch import FilterBatch
+
+
+class LIBSVMConverterTest(unittest.TestCase):
+
+    bloom_type = "murmur"
+
+    def setUp(self):
+        self._filters = list()
+        for i, words in enumerate([['test', 'dings'], [], ['test2', 'dings2', 'mimimi']]):
+            b = BloomFilter.factory(self.bloom_type, 64)
+            b.set_num_hash_functions(3)
+            for word in words:
+                b.add(word)
+            b.set_label(i % 2 == 0)
+            self._filters.append(b)
+
+        with open('test.dat', 'w') as f:
+            for b in self._filters:
+                b.add_to_file(f)
+
+    def tearDown(self):
+        for filename in ['test.dat', 'test.libsvm', 'test.npz']:
+            if os.path.exists(filename):
+                os.remove(filename)
+
+    def convert(self, output_file, output_format):
+        converter = LIBSVMConverter()
+        converter.set_input_file('test.dat')
+        converter.set_output_file(output_file)
+        converter.set_filter_type(self.bloom_type)
+        converter.set_output_format(output_format)
+        converter.set_batch_size(2)
+        converter.run()
+
+    def test_libsvm_lines(self):
+        self.convert('test.libsvm', 'libsvm')
+        with open('test.libsvm', 'r') as f:
+            lines = f.read().splitlines()
+        self.assertEqual(lines, [b.get_libsvm_str() for b in self._filters])
+
+    def test_libsvm_no_features(self):
+        counting = self.bloom_type in ('count', 'keyedcount')
+        data = np.zeros((2, 0), dtype=np.int16 if counting else np.uint8)
+        writer = LIBSVMWriter('test.libsvm')
+        writer.add_batch(FilterBatch(np.array([1, -1]), data, counting))
+        writer.close()
+        with open('test.libsvm', 'r') as f:
+            self.assertEqual(f.read().split(), ['1', '-1'])
+
+    def test_sparse_matrix(self):
+        self.convert('test.libsvm', 'libsvm')
+        self.convert('test.npz', 'npz')
+        X, y = load_sparse_matrix('test.npz')
+        X_libsvm, y_libsvm = load_svmlight_file('test.libsvm', n_features=X.shape[1], zero_based=False)
+
+        self.assertEqual(X.shape, (3, self._filters[0].size))
+        self.assertTrue((X.toarray() == X_libsvm.toarray()).all())
+        self.assertTrue((y == y_libsvm).all())
+        self.assertTrue(np.array_equal(y, [1, -1, 1]))
+
+    def test_sparse_matrix_batches(self):
+        self.convert('test.npz', 'npz')
+        X, y = load_sparse_matrix('test.npz')
+        batches = list(read_sparse_matrix_batches('test.npz', batch_size=2))
+
+        self.assertEqual([b[0].shape[0] for b in batches], [2, 1])
+        self.assertTrue(np.array_equal(sp.vstack([b[0] for b in batches]).toarray(), X.toarray()))
+        self.assertTrue(np.array_equal(np.concatenate([b[1] for b in batches]), y))
+
+
+class CountMinConverterTest(LIBSVMConverterTest):
+
+    bloom_type = "count"
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+import unittest
+import os
+import numpy as np
+import scipy.sparse as sp
+
+from modules.predict.explain import ElementMapping, OrderExplainer, top_k
+
+
+class ElementMappingTest(unittest.TestCase):
+
+    def setUp(self):
+        with open('test.map', 'w') as f:
+            f.write('decomposition_type:colored\nngram_len:2\nbin_sizes:{}\n')
+            f.write('customer->ab:[1L, 3L, 5L]\n')
+            f.write('time->12:30:[0L, 7L, 1L]\n')
+            f.write('cartItem->äx:[2L, 9L, 2L]\n')
+
+    def tearDown(self):
+        if os.path.exists('test.map'):
+            os.remove('test.map')
+
+    def test_read(self):
+        mapping = ElementMapping.read('test.map')
+        self.assertEqual(mapping.elements, ['customer->ab', 'time->12:30', 'cartItem->äx'])
+        self.assertTrue(np.array_equal(mapping.positions, [1, 3, 5, 0, 7, 1, 2, 9, 2]))
+        self.assertTrue(np.array_equal(mapping.offsets, [0, 3, 6, 9]))
+
+    def test_scores(self):
+        w = np.arange(8, dtype=np.float64)
+        scores = ElementMapping.read('test.map').scores(w)
+        # position 9 is unknown to the model
+        self.assertTrue(np.array_equal(scores, [9.0, 8.0, 4.0]))
+
+    def test_order_explainer(self):
+        w = np.arange(8, dtype=np.float64)
+        explainer = OrderExplainer(ElementMapping.read('test.map'), w)
+        X = sp.csr_matrix(np.array([[0, 1, 1, 1, 0, 1, 0, 0, 0, 1],
+                                    [1, 1, 1, 0, 0, 0, 0, 1, 0, 1],
+                                    [0, 0, 0, 0, 0, 0, 0, 0, 0, 0]]))
+
+        rows, element_ids, contributions = explainer.explain(X)
+        self.assertTrue(np.array_equal(rows, [0, 0, 1, 1]))
+        self.assertTrue(np.array_equal(element_ids, [0, 2, 1, 2]))
+        self.assertTrue(np.array_equal(contributions, [9.0, 2.0, 8.0, 2.0]))
+
+        rows, element_ids, contributions = explainer.explain(X[:, :8], k=1)
+        self.assertTrue(np.array_equal(rows, [0, 1]))
+        self.assertTrue(np.array_equal(element_ids, [0, 1]))
+
+    def test_top_k(self):
+        scores = np.array([0.5, -1.0, 2.0, 1.0, 0.0])
+        self.assertTrue(np.array_equal(top_k(scores, 2), [2, 3]))
+        self.assertTrue(np.array_equal(top_k(scores), [2, 3, 0, 4, 1]))
+        self.assertEqual(len(top_k(scores, 0)), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,4 +1,5 @@
 import unittest
+import numpy as np
 
 from modules.pseudonymize.feature_extractor import FeatureExtractor
 
@@ -149,6 +150,36 @@ class FeatureExtractorTest(unittest.TestCase):
         ngram_str = fe.get_colored_ngram_string(self.order)
         self.assertEqual(ngram_str, expr_str)
 
+    def test_positions(self):
+        for bloom_type in ['murmur', 'count']:
+            fe = FeatureExtractor()
+            fe.set_bloomfilter_size(100)
+            fe.set_bloomfilter_type(bloom_type)
+            fe.set_decomposition_type('colored')
+
+            x = fe.create_filter(self.order).to_numpy_array().ravel()
+            positions, values = fe.get_positions(self.order)
+            self.assertEqual(fe.num_features, len(x))
+            self.assertTrue(np.array_equal(positions, np.flatnonzero(x)))
+            self.assertTrue(np.array_equal(values, x[positions]))
+
+    def test_filter_batch(self):
+        orders = [self.order,
+                  dict(self.order, cartItems=self.order['cartItems'][:1], invoiceFraudLabel=True, iteration=1.0)]
+        for bloom_type in ['murmur', 'count']:
+            for decomposition in ['words', 'colored', 'ngrams']:
+                fe = FeatureExtractor()
+                fe.set_bloomfilter_size(100)
+                fe.set_bloomfilter_type(bloom_type)
+                fe.set_decomposition_type(decomposition)
+
+                cache = dict()
+                for _ in range(2):
+                    batch = fe.create_filter_batch(orders, cache)
+                    filters = [fe.create_filter(order) for order in orders]
+                    self.assertEqual(batch.labels.tolist(), [f.get_label() for f in filters])
+                    self.assertEqual([row.tobytes() for row in batch.data], [f.to_bytes() for f in filters])
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
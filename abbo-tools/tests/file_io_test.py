@@ -0,0 +1,54 @@
+import unittest
+import os
+import gzip
+import shutil
+import tempfile
+
+from modules.utils import file_io
+from modules.utils.file_io import open_file, is_compressed, strip_compression
+
+
+class FileIOTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.lines = ['{}\tline {}\n'.format(i, i * 7) for i in range(20000)]
+
+    def tearDown(self):
+        file_io.set_background_compression(True)
+        shutil.rmtree(self.tmp_dir)
+
+    def test_names(self):
+        self.assertTrue(is_compressed('orders.json.gz'))
+        self.assertFalse(is_compressed('orders.json'))
+        self.assertEqual(strip_compression('orders.json.bz2'), 'orders.json')
+        self.assertEqual(strip_compression('orders.json'), 'orders.json')
+
+    def test_round_trip(self):
+        for background in [True, False]:
+            file_io.set_background_compression(background)
+            for ext in ['', '.gz', '.bz2']:
+                filename = os.path.join(self.tmp_dir, 'test.txt' + ext)
+                with open_file(filename, 'w', buffer_size=1000) as f:
+                    for line in self.lines:
+                        f.write(line)
+                with open_file(filename, 'r') as f:
+                    self.assertEqual(list(f), self.lines)
+
+    def test_gzip(self):
+        # compressed files can be read by other tools
+        filename = os.path.join(self.tmp_dir, 'test.txt.gz')
+        with open_file(filename, 'w') as f:
+            f.write(''.join(self.lines))
+        with gzip.open(filename, 'rb') as f:
+            self.assertEqual(f.read(), ''.join(self.lines))
+        self.assertLess(os.path.getsize(filename), len(''.join(self.lines)))
+
+    def test_background_error(self):
+        f = open_file(os.path.join(self.tmp_dir, 'test.txt.gz'), 'w')
+        f.write(u'\xe4' * 10)
+        self.assertRaises(UnicodeEncodeError, f.close)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+import unittest
+import os
+import numpy as np
+
+from modules.pseudonymize.filter.bloom_factory import BloomFilter
+from modules.pseudonymize.filter.filter_batch import read_filter_batches, split_filter_file, detect_counting
+from modules.pseudonymize.filter.filter_store import FilterStoreWriter
+from modules.utils.file_io import open_file
+
+
+class FilterBatchTest(unittest.TestCase):
+
+    bloom_type = "murmur"
+    counting = False
+
+    def setUp(self):
+        self._filters = list()
+        for i in range(25):
+            b = BloomFilter.factory(self.bloom_type, 256)
+            b.set_num_hash_functions(3)
+            for j in range(i):
+                b.add('word{}'.format(j))
+            b.set_label(i % 3 == 0)
+            self._filters.append(b)
+
+        with open('test.dat', 'w') as f:
+            for b in self._filters:
+                b.add_to_file(f)
+
+        writer = FilterStoreWriter('test.bin')
+        for batch in read_filter_batches('test.dat', self.counting, batch_size=7):
+            writer.add_batch(batch)
+        writer.close()
+
+    def tearDown(self):
+        for filename in ['test.dat', 'test.bin', 'test.dat.gz', 'test.bin.bz2']:
+            if os.path.exists(filename):
+                os.remove(filename)
+
+    def read(self, filename, byte_range=None):
+        batches = list(read_filter_batches(filename, batch_size=4, byte_range=byte_range))
+        if not batches:
+            return np.zeros(0), np.zeros((0, 0))
+        labels = np.concatenate([batch.labels for batch in batches])
+        data = np.vstack([batch.to_numpy_array() for batch in batches])
+        return labels, data
+
+    def test_batches(self):
+        labels, data = self.read('test.dat')
+        self.assertTrue(np.array_equal(labels, [b.get_label() for b in self._filters]))
+        self.assertTrue(np.array_equal(data, np.hstack([b.to_numpy_array() for b in self._filters]).T))
+
+    def test_detect_counting(self):
+        self.assertEqual(detect_counting('test.dat'), self.counting)
+        self.assertEqual(detect_counting('test.bin'), self.counting)
+
+    def test_detect_sparse(self):
+        # the type of empty filters cannot be detected from their payloads
+        with open('test.dat', 'w') as f:
+            self._filters[0].add_to_file(f)
+        self.assertRaises(ValueError, detect_counting, 'test.dat')
+
+    def test_filter_store(self):
+        labels, data = self.read('test.dat')
+        store_labels, store_data = self.read('test.bin')
+        self.assertTrue(np.array_equal(labels, store_labels))
+        self.assertTrue(np.array_equal(data, store_data))
+
+    def test_byte_ranges(self):
+        for filename in ['test.dat', 'test.bin']:
+            labels, data = self.read(filename)
+            ranges = split_filter_file(filename, range_size=100)
+            self.assertTrue(len(ranges) > 1)
+
+            parts = [self.read(filename, byte_range) for byte_range in ranges]
+            self.assertTrue(np.array_equal(labels, np.concatenate([p[0] for p in parts])))
+            self.assertTrue(np.array_equal(data, np.vstack([p[1] for p in parts if len(p[0])])))
+
+    def test_compressed(self):
+        for filename, compressed in [('test.dat', 'test.dat.gz'), ('test.bin', 'test.bin.bz2')]:
+            with open(filename, 'rb') as f, open_file(compressed, 'wb') as fout:
+                fout.write(f.read())
+            self.assertEqual(detect_counting(compressed), self.counting)
+            # compressed files are not split
+            self.assertEqual(split_filter_file(compressed, range_size=100), [(0, None)])
+            labels, data = self.read(filename)
+            compressed_labels, compressed_data = self.read(compressed, (0, None))
+            self.assertTrue(np.array_equal(labels, compressed_labels))
+            self.assertTrue(np.array_equal(data, compressed_data))
+
+
+class CountMinBatchTest(FilterBatchTest):
+
+    bloom_type = "count"
+    counting = True
+
+    def test_detect_large_counters(self):
+        b = BloomFilter.factory(self.bloom_type, 256)
+        b.set_num_hash_functions(3)
+        for _ in range(2000):
+            b.add('word')
+        with open('test.dat', 'w') as f:
+            for _ in range(100):
+                b.add_to_file(f)
+        self.assertTrue(detect_counting('test.dat'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+import unittest
+import numpy as np
+
+from modules.generate.fraud import FraudRings, name_variants
+
+
+class FraudRingsTest(unittest.TestCase):
+
+    def test_name_variants(self):
+        random = np.random.RandomState(1)
+        variants = name_variants(u'Müller', 5, random)
+        self.assertEqual(len(variants), 5)
+        self.assertEqual(len(set(variants)), 5)
+        self.assertEqual(variants[0], u'Müller')
+        for variant in variants:
+            self.assertEqual(variant[0], u'M')
+            self.assertLessEqual(abs(len(variant) - len(u'Müller')), 1)
+        self.assertEqual(name_variants(u'A', 3, random), [u'A'])
+
+    def test_apply(self):
+        rings = FraudRings([['a1', 'a2'], ['b1']], np.array([[10, 11], [20, 21]]))
+        fields = {'label': np.array([False, True, True, False]),
+                  'offsets': np.array([0, 2, 3, 6, 7]),
+                  'articles': np.array([0, 1, 2, 3, 4, 5, 6])}
+        rings.apply(np.random.RandomState(1), fields)
+
+        self.assertEqual(fields['shipping_address'][0], None)
+        self.assertEqual(fields['shipping_address'][3], None)
+        self.assertEqual(fields['articles'][[0, 1, 6]].tolist(), [0, 1, 6])
+        for i, items in [(1, [2]), (2, [3, 4, 5])]:
+            ring = 0 if fields['shipping_address'][i] in ('a1', 'a2') else 1
+            self.assertIn(fields['shipping_address'][i], [['a1', 'a2'], ['b1']][ring])
+            self.assertTrue(set(fields['articles'][items]) <= {10 * (ring + 1), 10 * (ring + 1) + 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
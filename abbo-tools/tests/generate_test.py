@@ -0,0 +1,136 @@
+import unittest
+import os
+import shutil
+import tempfile
+import simplejson as json
+
+from modules.generate.data_generator import SampleDataGenerator
+from modules.generate.order import Order, SimpleOrder, Customer, Address, Article
+from modules.pseudonymize.feature_extractor import FeatureExtractor
+from modules.pseudonymize.filter.filter_batch import read_filter_batches
+
+
+class SampleDataGeneratorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def generate(self, name, num_orders=250, seed=1, **kwargs):
+        output = os.path.join(self.tmp_dir, name)
+        generator = SampleDataGenerator(output, seed)
+        generator.set_num_of_orders(num_orders)
+        generator.set_num_of_customers(kwargs.get('num_customers', 50))
+        generator.set_fraud_probability(kwargs.get('fraud_probability', 0.5))
+        generator.set_simple_mode(kwargs.get('simple', False))
+        generator.set_unique_customers(kwargs.get('unique_customers', False))
+        generator.set_fraud_rings(kwargs.get('fraud_rings', 0))
+        generator.set_num_shards(kwargs.get('num_shards', 1))
+        generator.set_num_jobs(kwargs.get('num_jobs', 1))
+        generator.set_shard_files(kwargs.get('shard_files', False))
+        if 'feature_extractor' in kwargs:
+            generator.set_filter_output(kwargs['feature_extractor'], kwargs.get('filter_format', 'text'))
+        generator.run()
+        if kwargs.get('shard_files', False):
+            return None
+        with open(output) as f:
+            return f.readlines()
+
+    def test_orders(self):
+        lines = self.generate('orders.json')
+        self.assertEqual(len(lines), 250)
+        for line in lines:
+            order = json.loads(line)
+            # orders are encoded as by json.dumps with sorted keys
+            self.assertEqual(json.dumps(order, sort_keys=True) + '\n', line)
+            self.assertGreater(len(order['cartItems']), 0)
+            self.assertEqual(order['billingAddress'], order['shippingAddress'])
+            grand_total = sum(float(item['price']) for item in order['cartItems'])
+            self.assertAlmostEqual(float(order['grandTotal']), grand_total, places=2)
+        self.assertEqual(len(set(json.loads(line)['id'] for line in lines)), 250)
+
+    def test_seed(self):
+        self.assertEqual(self.generate('a.json', seed=3), self.generate('b.json', seed=3))
+        self.assertNotEqual(self.generate('a.json', seed=3), self.generate('b.json', seed=4))
+
+    def test_shards(self):
+        lines = self.generate('a.json', num_shards=3)
+        self.assertEqual(len(lines), 250)
+        self.assertEqual(lines, self.generate('b.json', num_shards=3, num_jobs=2))
+
+        self.generate('c.json', num_shards=3, num_jobs=2, shard_files=True)
+        shards = list()
+        for i in range(3):
+            with open(os.path.join(self.tmp_dir, 'c-{:05d}-of-00003.json'.format(i))) as f:
+                shards.extend(f.readlines())
+        self.assertEqual(lines, shards)
+
+    def test_fraud_probability(self):
+        lines = self.generate('orders.json', fraud_probability=0.0)
+        self.assertFalse(any(json.loads(line)['invoiceFraudLabel'] for line in lines))
+
+    def test_fraud_rings(self):
+        lines = self.generate('orders.json', num_orders=500, fraud_rings=3)
+        orders = [json.loads(line) for line in lines]
+        fraud = [order for order in orders if order['invoiceFraudLabel']]
+        self.assertGreater(len(fraud), 0)
+        # fraudulent orders are shipped to the drop addresses of the rings
+        drop_addresses = set((o['shippingAddress']['street'], o['shippingAddress']['zip']) for o in fraud)
+        self.assertLessEqual(len(drop_addresses), 3 * 2)
+        self.assertLessEqual(len(set(item['articleSimpleSKU'] for o in fraud for item in o['cartItems'])), 3 * 2)
+        for order in orders:
+            if not order['invoiceFraudLabel']:
+                self.assertEqual(order['shippingAddress'], order['billingAddress'])
+        # the rings are shared by all shards
+        self.assertEqual(self.generate('a.json', num_orders=500, fraud_rings=3, num_shards=2),
+                         self.generate('b.json', num_orders=500, fraud_rings=3, num_shards=2, num_jobs=2))
+
+    def test_filters(self):
+        fe = FeatureExtractor()
+        fe.set_bloomfilter_size(256)
+        fe.set_decomposition_type('colored')
+        self.generate('orders.json', fraud_rings=3, num_shards=2)
+        fe.set_input(os.path.join(self.tmp_dir, 'orders.json'))
+        fe.set_output(os.path.join(self.tmp_dir, 'orders.dat'))
+        fe.run()
+        with open(os.path.join(self.tmp_dir, 'orders.dat')) as f:
+            expected = f.readlines()
+
+        # filters are identical to those of the pseudonymized orders
+        self.assertEqual(self.generate('filters.dat', fraud_rings=3, num_shards=2, feature_extractor=fe),
+                         expected)
+        self.assertEqual(self.generate('filters.dat', fraud_rings=3, num_shards=2, num_jobs=2,
+                                       feature_extractor=fe), expected)
+        self.generate('filters.bin', fraud_rings=3, num_shards=2, num_jobs=2, feature_extractor=fe,
+                      filter_format='binary')
+        batches = list(read_filter_batches(os.path.join(self.tmp_dir, 'filters.bin')))
+        self.assertEqual(sum(len(batch) for batch in batches), 250)
+        self.assertEqual(list(read_filter_batches(os.path.join(self.tmp_dir, 'filters.dat')))[0].data.tolist(),
+                         batches[0].data.tolist())
+
+    def test_simple_mode(self):
+        lines = self.generate('orders.json', num_orders=50, simple=True, unique_customers=True)
+        orders = [json.loads(line) for line in lines]
+        self.assertTrue(all(order.keys() == ['billingAddress'] for order in orders))
+        self.assertEqual(len(set(json.dumps(order, sort_keys=True) for order in orders)), 50)
+        self.assertRaises(ValueError, self.generate, 'orders.json', simple=True, fraud_rings=3)
+
+    def test_records(self):
+        address = Address(u'Max', u'Mustermann', u'Hauptstr. 1', '10115', u'Berlin')
+        customer = Customer(u'Max', u'Mustermann', u'max@example.com', 'm')
+        customer.set_address(address)
+        order = Order(1, customer, address, address, 10.5, 2, 3.0, False, True)
+        order.add_cart_item(Article('A-1', 1.25))
+        order.add_cart_item(Article('A-2', 2.5))
+        self.assertEqual(order.json_encode(['grandTotal', 'customer']),
+                         {'grandTotal': '3.75', 'customer': customer.json_encode()})
+        self.assertEqual(SimpleOrder(address).json_encode(), {'billingAddress': address.json_encode()})
+        # records have no attribute dictionaries
+        for record in [order, SimpleOrder(address), customer, address, Article('A-1', 1.25)]:
+            self.assertFalse(hasattr(record, '__dict__'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+from modules.hardening.hardening import HardeningModule
+from modules.pseudonymize.filter.bloom_factory import BloomFilter
+
+
+class HardeningTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.input_file = os.path.join(self.tmp_dir, 'filters.dat')
+        self.output_file = os.path.join(self.tmp_dir, 'harden.dat')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def write_filters(self, filter_type):
+        with open(self.input_file, 'w') as f:
+            for i in range(4):
+                b = BloomFilter.factory(filter_type, 64, 'key')
+                b.set_num_hash_functions(3)
+                b.add('word{}'.format(i))
+                b.set_label(i % 2 == 0)
+                b.add_to_file(f)
+
+    def harden(self, filter_type, fold_level):
+        hardening = HardeningModule()
+        hardening.set_input(self.input_file)
+        hardening.set_output(self.output_file)
+        hardening.set_filter_type(filter_type)
+        hardening.set_folding_level(fold_level)
+        hardening.run()
+
+    def test_fold(self):
+        self.write_filters('murmur')
+        self.harden('murmur', 2)
+        with open(self.output_file) as f:
+            lines = f.readlines()
+        self.assertEqual(len(lines), 4)
+        for line in lines:
+            b = BloomFilter.factory('murmur', 0)
+            b.read_from_line(line)
+            self.assertEqual(b.size, 16)
+
+    def test_fold_count_min(self):
+        # folding is not supported for Count-Min sketches
+        for filter_type in ['count', 'keyedcount']:
+            self.write_filters(filter_type)
+            self.assertRaises(ValueError, self.harden, filter_type, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import unittest
+import numpy as np
+from sklearn.metrics import roc_auc_score, confusion_matrix
+
+from modules.predict.metrics import MetricsAccumulator
+
+
+class MetricsAccumulatorTest(unittest.TestCase):
+
+    def setUp(self):
+        rand = np.random.RandomState(42)
+        self.labels = rand.choice([-1, 0, 1], 1000, p=[0.6, 0.1, 0.3])
+        self.scores = rand.randn(1000) + self.labels
+        self.labeled = self.labels != 0
+
+    def accumulate(self, batch_size, thresholds=(0.0,)):
+        metrics = MetricsAccumulator(thresholds)
+        for i in range(0, len(self.scores), batch_size):
+            metrics.update(self.scores[i:i + batch_size], self.labels[i:i + batch_size])
+        return metrics.to_dict()
+
+    def test_batches(self):
+        self.assertEqual(self.accumulate(1000), self.accumulate(7))
+
+    def test_auc(self):
+        expected = roc_auc_score(self.labels[self.labeled], self.scores[self.labeled])
+        self.assertAlmostEqual(self.accumulate(100)['auc'], expected, places=4)
+
+    def test_auc_scale(self):
+        # e.g. models trained by SGD have tiny scores
+        expected = roc_auc_score(self.labels[self.labeled], self.scores[self.labeled])
+        for scale in [1e-13, 1e-5, 1e5, 1e13]:
+            metrics = MetricsAccumulator()
+            for i in range(0, len(self.scores), 100):
+                metrics.update(self.scores[i:i + 100] * scale, self.labels[i:i + 100])
+            self.assertAlmostEqual(metrics.auc(), expected, places=4)
+
+    def test_confusion_matrix(self):
+        result = self.accumulate(100)
+        y, s = self.labels[self.labeled], self.scores[self.labeled]
+        (tn, fp), (fn, tp) = confusion_matrix(y, np.where(s > 0, 1, -1)).tolist()
+        self.assertEqual(result['confusion_matrix'], {'true_positives': tp, 'false_positives': fp,
+                                                      'true_negatives': tn, 'false_negatives': fn})
+        self.assertEqual(result['num_orders'], np.sum(self.labeled))
+        self.assertAlmostEqual(result['accuracy'], float(tp + tn) / np.sum(self.labeled))
+
+    def test_thresholds(self):
+        result = self.accumulate(100, thresholds=[1.0, -0.5, 0.0])
+        self.assertEqual([t['threshold'] for t in result['thresholds']], [-0.5, 0.0, 1.0])
+        y, s = self.labels[self.labeled], self.scores[self.labeled]
+        for t in result['thresholds']:
+            tp = np.sum((s > t['threshold']) & (y == 1))
+            fp = np.sum((s > t['threshold']) & (y == -1))
+            self.assertEqual((t['true_positives'], t['false_positives']), (tp, fp))
+            self.assertAlmostEqual(t['precision'], float(tp) / (tp + fp))
+            self.assertAlmostEqual(t['recall'], float(tp) / np.sum(y == 1))
+
+    def test_single_class(self):
+        metrics = MetricsAccumulator()
+        metrics.update(np.array([0.5, -0.5]), np.array([1, 1]))
+        self.assertIsNone(metrics.auc())
+        self.assertEqual(metrics.to_dict()['confusion_matrix']['false_negatives'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
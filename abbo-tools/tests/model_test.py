@@ -0,0 +1,79 @@
+import unittest
+import os
+import shutil
+import tempfile
+import numpy as np
+
+from modules.predict.model import LinearModel, load_liblinear_model, write_liblinear_model, stack_models, \
+    get_cache_file
+
+MODEL = """solver_type L2R_L2LOSS_SVC_DUAL
+nr_class 2
+label {}
+nr_feature 3
+bias {}
+w
+0.5 
+-0.25 
+0.125 
+{}"""
+
+
+class LIBLINEARModelTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.model_file = os.path.join(self.tmp_dir, 'test.model')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def write(self, labels='1 -1', bias=-1, bias_weight=''):
+        with open(self.model_file, 'w') as f:
+            f.write(MODEL.format(labels, bias, bias_weight))
+
+    def test_header(self):
+        self.write()
+        model = load_liblinear_model(self.model_file, use_cache=False)
+        self.assertTrue(np.array_equal(model.w, [0.5, -0.25, 0.125]))
+        self.assertEqual(model.intercept, 0.0)
+
+        self.write(labels='-1 1', bias=2, bias_weight='0.75 \n')
+        model = load_liblinear_model(self.model_file, use_cache=False)
+        self.assertTrue(np.array_equal(model.w, [-0.5, 0.25, -0.125]))
+        self.assertEqual(model.intercept, -1.5)
+
+        self.write(bias=2)
+        self.assertRaises(ValueError, load_liblinear_model, self.model_file, False)
+
+    def test_write(self):
+        model = LinearModel(np.array([0.1, -2.0 / 3, 1e-20]), intercept=0.25)
+        write_liblinear_model(self.model_file, model)
+        loaded = load_liblinear_model(self.model_file, use_cache=False)
+        self.assertTrue(np.array_equal(loaded.w, model.w))
+        self.assertEqual(loaded.intercept, 0.25)
+
+    def test_stack(self):
+        models = [LinearModel(np.array([0.5, -0.25, 0.125]), 1.0), LinearModel(np.array([2.0, 3.0]))]
+        stacked = stack_models(models)
+        self.assertTrue(np.array_equal(stacked.w, [[0.5, 2.0], [-0.25, 3.0], [0.125, 0.0]]))
+        self.assertTrue(np.array_equal(stacked.intercept, [1.0, 0.0]))
+        self.assertEqual(stacked.num_features, 3)
+
+    def test_cache(self):
+        self.write()
+        cache_file = get_cache_file(self.model_file)
+        load_liblinear_model(self.model_file)
+        self.assertTrue(os.path.exists(cache_file))
+        self.assertTrue(np.array_equal(load_liblinear_model(self.model_file).w, [0.5, -0.25, 0.125]))
+
+        # changed model invalidates the cache
+        self.write(labels='-1 1')
+        model = load_liblinear_model(self.model_file)
+        self.assertTrue(np.array_equal(model.w, [-0.5, 0.25, -0.125]))
+        self.assertFalse(os.path.exists(cache_file))
+        self.assertTrue(os.path.exists(get_cache_file(self.model_file)))
+
+
+if __name__ == '__main__':
+    unittest.main()
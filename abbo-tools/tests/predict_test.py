@@ -0,0 +1,65 @@
+import unittest
+import os
+import shutil
+import tempfile
+import numpy as np
+
+from modules.predict.model import LinearModel, write_liblinear_model
+from modules.predict.predict import PredictionModule
+from modules.pseudonymize.filter.bloom_factory import BloomFilter
+
+
+class PredictionModuleTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.input_file = os.path.join(self.tmp_dir, 'filters.dat')
+        self.output_file = os.path.join(self.tmp_dir, 'results.csv')
+        self.filters = list()
+        with open(self.input_file, 'w') as f:
+            for i in range(5):
+                b = BloomFilter.factory('murmur', 64)
+                b.set_num_hash_functions(3)
+                b.add('word{}'.format(i))
+                b.set_label(i % 2 == 0)
+                b.add_to_file(f)
+                self.filters.append(b)
+
+        rand = np.random.RandomState(42)
+        self.models = list()
+        for i in range(2):
+            model_file = os.path.join(self.tmp_dir, 'm{}.model'.format(i))
+            write_liblinear_model(model_file, LinearModel(rand.randn(64), intercept=0.5))
+            self.models.append(model_file)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def predict(self, model_files):
+        prediction_module = PredictionModule()
+        prediction_module.set_input(self.input_file)
+        prediction_module.set_output(self.output_file)
+        prediction_module.set_models(model_files)
+        prediction_module.set_model_cache(False)
+        prediction_module.set_filter_type('murmur')
+        prediction_module.run()
+        with open(self.output_file) as f:
+            lines = f.read().splitlines()
+        return lines[0], [[float(value) for value in line.split(',')] for line in lines[1:]]
+
+    def test_results(self):
+        header, rows = self.predict(self.models[:1])
+        self.assertEqual(header, 'label,score')
+
+        # the columns of the first model do not change with further models
+        multi_header, multi_rows = self.predict(self.models)
+        self.assertEqual(multi_header, 'label,score,label_2,score_2')
+        self.assertEqual(len(multi_rows), len(self.filters))
+        for row, multi_row in zip(rows, multi_rows):
+            self.assertEqual(row, multi_row[:2])
+            for label, score in [multi_row[:2], multi_row[2:]]:
+                self.assertEqual(label, 1.0 if score > 0 else -1.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+import unittest
+import os
+import shutil
+import tempfile
+import numpy as np
+
+from modules.generate.sampler import AliasSampler, load_sampler, get_cache_file
+
+
+class AliasSamplerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.csv_file = os.path.join(self.tmp_dir, 'names.csv')
+        self.write(u'name,frequency\nMüller,50\nSchmidt,30\nSchneider,15\nFischer,5\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def write(self, content):
+        with open(self.csv_file, 'w') as f:
+            f.write(content.encode('utf-8'))
+
+    def test_probabilities(self):
+        frequencies = np.random.RandomState(42).randint(1, 1000, 500).astype(np.float64)
+        sampler = AliasSampler.from_frequencies([str(i) for i in range(500)], frequencies)
+        self.assertTrue(np.allclose(sampler.probabilities(), frequencies / frequencies.sum()))
+
+    def test_sample(self):
+        sampler = load_sampler(self.csv_file, use_cache=False)
+        names = sampler.sample(np.random.RandomState(1), 100000)
+        self.assertEqual(set(names), {u'Müller', u'Schmidt', u'Schneider', u'Fischer'})
+        self.assertAlmostEqual(names.count(u'Müller') / 100000.0, 0.5, places=2)
+        self.assertAlmostEqual(names.count(u'Fischer') / 100000.0, 0.05, places=2)
+
+    def test_cache(self):
+        sampler = load_sampler(self.csv_file)
+        cache_file = get_cache_file(self.csv_file)
+        self.assertTrue(os.path.exists(cache_file))
+        cached = load_sampler(self.csv_file)
+        self.assertEqual(cached.names.tolist(), sampler.names.tolist())
+        self.assertTrue(np.array_equal(cached.prob, sampler.prob))
+        self.assertTrue(np.array_equal(cached.alias, sampler.alias))
+
+        # cache is rebuilt if the distribution changes
+        self.write(u'name,frequency\nMeyer,1\n')
+        self.assertEqual(load_sampler(self.csv_file).names.tolist(), [u'Meyer'])
+        self.assertFalse(os.path.exists(cache_file))
+        self.assertEqual(len([f for f in os.listdir(self.tmp_dir) if f.endswith('.npz')]), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+import numpy as np
+
+from modules.pseudonymize.filter.filter_batch import FilterBatch
+from modules.predict.scorer import FilterScorer
+
+
+class FilterScorerTest(unittest.TestCase):
+
+    def setUp(self):
+        rand = np.random.RandomState(42)
+        self.labels = rand.choice([-1, 1], 20)
+        self.w = rand.randn(40)
+
+    def test_bloom_filters(self):
+        data = np.random.RandomState(1).randint(0, 256, size=(20, 5)).astype(np.uint8)
+        batch = FilterBatch(self.labels, data)
+        scores = FilterScorer(self.w).score(batch)
+        self.assertTrue(np.allclose(scores, batch.to_csr().dot(self.w)))
+
+    def test_model_size(self):
+        data = np.random.RandomState(1).randint(0, 256, size=(20, 6)).astype(np.uint8)
+        batch = FilterBatch(self.labels, data)
+        scorer = FilterScorer(self.w[:30])
+        w = np.concatenate([self.w[:30], np.zeros(18)])
+        self.assertTrue(np.allclose(scorer.score(batch), batch.to_csr().dot(w)))
+
+        batch = FilterBatch(self.labels, data[:, :3])
+        self.assertTrue(np.allclose(scorer.score(batch), batch.to_csr().dot(self.w[:24])))
+
+    def test_count_min(self):
+        data = np.random.RandomState(1).randint(0, 5, size=(20, 40)).astype(np.int16)
+        batch = FilterBatch(self.labels, data, counting=True)
+        scores = FilterScorer(self.w).score(batch)
+        self.assertTrue(np.allclose(scores, data.dot(self.w)))
+
+    def test_multiple_models(self):
+        W = np.column_stack([self.w, -self.w, np.arange(40.0)])
+        data = np.random.RandomState(1).randint(0, 256, size=(20, 6)).astype(np.uint8)
+        batch = FilterBatch(self.labels, data)
+        scores = FilterScorer(W).score(batch)
+        self.assertEqual(scores.shape, (20, 3))
+        for i in range(3):
+            self.assertTrue(np.allclose(scores[:, i], FilterScorer(W[:, i]).score(batch)))
+
+        data = np.random.RandomState(1).randint(0, 5, size=(20, 40)).astype(np.int16)
+        batch = FilterBatch(self.labels, data, counting=True)
+        self.assertTrue(np.allclose(FilterScorer(W).score(batch), data.dot(W)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,149 @@
+import unittest
+import os
+import socket
+import shutil
+import tempfile
+import numpy as np
+import simplejson
+
+from modules.pseudonymize.feature_extractor import FeatureExtractor
+from modules.predict.model import LinearModel
+from modules.serve import server
+from modules.serve.loadgen import LoadGenerator
+from modules.serve.server import ScoringServer, ScoringService, MicroBatcher, _handle_payload, _file_id, _is_stale
+
+TOY_MODEL = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(server.__file__))),
+                         'predict', 'data', 'toy.model')
+
+
+class ScoringServiceTest(unittest.TestCase):
+
+    bloom_type = "murmur"
+    num_features = 128
+
+    def setUp(self):
+        self.orders = [{'billingAddress': {'firstName': 'bfname{}'.format(i), 'lastName': 'blname',
+                                           'street': 'bstreet name', 'zip': 'bzip'},
+                        'customer': {'firstName': 'cfname', 'lastName': 'clname{}'.format(i % 3),
+                                     'email': 'dings@dangs.com', 'gender': 'f'},
+                        'iteration': i}
+                       for i in range(10)]
+        self.fe = FeatureExtractor()
+        self.fe.set_bloomfilter_size(128)
+        self.fe.set_bloomfilter_type(self.bloom_type)
+        self.model = LinearModel(np.random.RandomState(42).randn(self.num_features), intercept=0.5)
+
+        self.batcher = MicroBatcher(ScoringService(self.fe, self.model), max_batch_size=4)
+        self.batcher.start()
+
+    def tearDown(self):
+        self.batcher.stop()
+        self.batcher.join()
+
+    def expected_score(self, order):
+        x = self.fe.create_filter(order).to_numpy_array().ravel()
+        return np.dot(x, self.model.w) + self.model.intercept
+
+    def test_scores(self):
+        results = self.batcher.submit(self.orders)
+        for order, result in zip(self.orders, results):
+            self.assertAlmostEqual(result['score'], self.expected_score(order))
+            self.assertEqual(result['label'], 1 if result['score'] > 0 else -1)
+
+    def test_payload(self):
+        response, success = _handle_payload(self.batcher, simplejson.dumps(self.orders[0]))
+        self.assertTrue(success)
+        self.assertAlmostEqual(simplejson.loads(response)['score'], self.expected_score(self.orders[0]))
+
+        response, success = _handle_payload(self.batcher, simplejson.dumps([self.orders[1], 42]))
+        self.assertFalse(success)
+        results = simplejson.loads(response)
+        self.assertAlmostEqual(results[0]['score'], self.expected_score(self.orders[1]))
+        self.assertTrue('error' in results[1])
+
+        self.assertFalse(_handle_payload(self.batcher, '{')[1])
+
+
+class CountMinScoringServiceTest(ScoringServiceTest):
+
+    bloom_type = "count"
+    num_features = 3 * 128
+
+
+class ScoringServerSocketTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.server = ScoringServer()
+        self.server.set_feature_extractor(FeatureExtractor())
+        self.server.set_model(TOY_MODEL, use_cache=False)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_keep_file(self):
+        # a regular file given by mistake is not deleted
+        filename = os.path.join(self.tmp_dir, 'model.txt')
+        with open(filename, 'w') as f:
+            f.write('weights')
+        self.server.set_socket(filename)
+        self.assertRaises(ValueError, self.server.run)
+        with open(filename) as f:
+            self.assertEqual(f.read(), 'weights')
+
+    def test_socket_in_use(self):
+        filename = os.path.join(self.tmp_dir, 'server.sock')
+        s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        s.bind(filename)
+        s.listen(1)
+        self.server.set_socket(filename)
+        self.assertRaises(ValueError, self.server.run)
+        self.assertTrue(os.path.exists(filename))
+
+        # nobody listens on the socket anymore
+        s.close()
+        self.assertTrue(_is_stale(filename))
+
+    def test_file_id(self):
+        filename = os.path.join(self.tmp_dir, 'server.sock')
+        self.assertIsNone(_file_id(filename))
+        s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        s.bind(filename)
+        self.assertEqual(_file_id(filename), (os.lstat(filename).st_dev, os.lstat(filename).st_ino))
+        s.close()
+        os.remove(filename)
+        open(filename, 'w').close()
+        self.assertIsNone(_file_id(filename))
+
+
+class LoadGeneratorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.input_file = os.path.join(self.tmp_dir, 'orders.json')
+        with open(self.input_file, 'w') as f:
+            f.write('{"iteration": 1}\n')
+        self.loadgen = LoadGenerator()
+        self.loadgen.set_input(self.input_file)
+        self.loadgen.set_concurrency(2)
+        self.loadgen.set_num_requests(10)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_no_server(self):
+        # all requests fail if the server is not running
+        self.loadgen.set_socket(os.path.join(self.tmp_dir, 'server.sock'))
+        self.assertEqual(self.loadgen.run(), 10)
+
+        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        s.bind(('127.0.0.1', 0))
+        port = s.getsockname()[1]
+        s.close()
+        self.loadgen.set_socket(None)
+        self.loadgen.set_address('127.0.0.1', port)
+        self.assertEqual(self.loadgen.run(), 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
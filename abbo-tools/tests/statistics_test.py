@@ -0,0 +1,42 @@
+import unittest
+import numpy as np
+
+from modules.pseudonymize.filter.filter_batch import FilterBatch
+from modules.stats.statistics import FilterStatistics
+
+
+class FilterStatisticsTest(unittest.TestCase):
+
+    def setUp(self):
+        rand = np.random.RandomState(42)
+        self.labels = rand.choice([-1, 1], 50)
+        self.data = rand.randint(0, 256, size=(50, 4)).astype(np.uint8)
+
+    def test_bit_counts(self):
+        stats = FilterStatistics()
+        stats.add_batch(FilterBatch(self.labels[:20], self.data[:20]))
+        other = FilterStatistics()
+        other.add_batch(FilterBatch(self.labels[20:], self.data[20:]))
+        stats.merge(other)
+
+        bits = FilterBatch(self.labels, self.data).to_numpy_array()
+        self.assertTrue(np.array_equal(stats.bit_counts[0], bits[self.labels == -1].sum(axis=0)))
+        self.assertTrue(np.array_equal(stats.bit_counts[2], bits[self.labels == 1].sum(axis=0)))
+        self.assertTrue(np.array_equal(stats.fill_counts.sum(axis=0),
+                                       np.bincount(bits.sum(axis=1).astype(np.int64), minlength=33)))
+
+        summary = stats.summary()
+        self.assertEqual(summary['num_filters'], 50)
+        self.assertEqual(summary['num_features'], 32)
+        self.assertAlmostEqual(summary['fill_level']['mean'], 100.0 * bits.mean())
+
+    def test_count_min(self):
+        data = np.array([[0, 2, 1], [0, 0, 3]], dtype=np.int16)
+        stats = FilterStatistics()
+        stats.add_batch(FilterBatch(np.array([1, 0]), data, counting=True))
+        self.assertTrue(np.array_equal(stats.bit_counts.sum(axis=0), [0, 1, 2]))
+        self.assertEqual(stats.summary()['filter_type'], 'count')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+import os
+import numpy as np
+
+from modules.pseudonymize.filter.bloom_factory import BloomFilter
+from modules.pseudonymize.filter.filter_batch import read_filter_batches
+from modules.predict.model import load_liblinear_model
+from modules.predict.scorer import FilterScorer
+from modules.train.trainer import TrainingModule
+
+
+class TrainingModuleTest(unittest.TestCase):
+
+    bloom_type = "murmur"
+
+    def setUp(self):
+        rand = np.random.RandomState(42)
+        with open('test.dat', 'w') as f:
+            for i in range(300):
+                b = BloomFilter.factory(self.bloom_type, 256)
+                b.set_num_hash_functions(3)
+                for j in rand.choice(100, 10, replace=False):
+                    b.add('word{}'.format(j))
+                # fraudulent orders contain a specific word
+                fraud = i % 2 == 0
+                if fraud:
+                    b.add('fraud')
+                b.set_label(fraud if i % 10 else None)
+                b.add_to_file(f)
+
+    def tearDown(self):
+        for filename in ['test.dat', 'test.model']:
+            if os.path.exists(filename):
+                os.remove(filename)
+
+    def train(self, **kwargs):
+        trainer = TrainingModule()
+        trainer.set_input('test.dat')
+        trainer.set_output('test.model')
+        trainer.set_batch_size(50)
+        trainer.set_seed(kwargs.get('seed', 1))
+        trainer.set_bias(kwargs.get('bias', False))
+        trainer.set_loss(kwargs.get('loss', 'hinge'))
+        trainer.run()
+        return load_liblinear_model('test.model', use_cache=False)
+
+    def accuracy(self, model):
+        batch = list(read_filter_batches('test.dat', batch_size=1000))[0]
+        labeled = batch.labels != 0
+        scores = FilterScorer(model.w).score(batch) + model.intercept
+        return np.mean(np.where(scores > 0, 1, -1)[labeled] == batch.labels[labeled])
+
+    def test_train(self):
+        model = self.train()
+        self.assertEqual(model.num_features, 256 if self.bloom_type == 'murmur' else 768)
+        self.assertEqual(model.intercept, 0.0)
+        self.assertGreater(self.accuracy(model), 0.95)
+
+    def test_seed(self):
+        # the filters of each batch are shuffled
+        self.assertTrue(np.array_equal(self.train().w, self.train().w))
+        self.assertFalse(np.array_equal(self.train().w, self.train(seed=2).w))
+
+    def test_bias(self):
+        model = self.train(bias=True, loss='log')
+        with open('test.model') as f:
+            self.assertTrue('bias 1\n' in f.readlines())
+        self.assertGreater(self.accuracy(model), 0.95)
+
+
+class CountMinTrainingModuleTest(TrainingModuleTest):
+
+    bloom_type = "count"
+
+
+if __name__ == '__main__':
+    unittest.main()